@@ -1,44 +1,79 @@
+import argparse
+import atexit
 import os
 
 from dotenv import load_dotenv
-from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared._httpx_utils import create_mcp_http_client
 from strands import Agent
-from strands.tools.mcp import MCPClient
+
+from cognito_auth import create_auth
+from session_pool import StrandsClientPool
+from tool_cache import ToolCache
+from tracing import AgentTracer, Tracer, add_profile_argument
 
 PROMPT = "LangGraphにおけるMCPの実装方法 (python) について調べて. "
 
+# Keeps the MCP session started by the first run warm for later runs in this process,
+# such as repeated `main()` calls from a notebook, until the interpreter exits, and the
+# tool list on disk for later processes.
+client_pool = StrandsClientPool(tool_cache=ToolCache())
+atexit.register(client_pool.close)
+
 
-def get_mcp_endpoint(agent_arn: str, region: str = "us-west-2") -> str:
+def get_mcp_endpoint(agent_arn: str, region: str | None = None) -> str:
+    # arn:aws:bedrock-agentcore:<region>:<account>:runtime/<id>
+    region = region or agent_arn.split(":")[3]
     encoded_arn = agent_arn.replace(":", "%3A").replace("/", "%2F")
     return f"https://bedrock-agentcore.{region}.amazonaws.com/runtimes/{encoded_arn}/invocations?qualifier=DEFAULT"
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a Strands agent with the tools of the remote MCP server."
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
     load_dotenv()
     agent_arn = os.getenv("AGENT_ARN")
     bearer_token = os.getenv("COGNITO_ACCESS_TOKEN")
     mcp_endpoint = get_mcp_endpoint(agent_arn)
+    # Signs in with COGNITO_USERNAME and refreshes the token when configured,
+    # otherwise sends the static COGNITO_ACCESS_TOKEN.
+    auth = create_auth()
     headers = {
-        "authorization": f"Bearer {bearer_token}",
         # "Content-Type": "application/json",
         # "Accept": "application/json, text/event-stream",
     }
+    if auth is None:
+        headers["authorization"] = f"Bearer {bearer_token}"
 
-    mcp_client = MCPClient(
-        lambda: streamablehttp_client(
-            mcp_endpoint,
-            headers=headers,
-            timeout=300,
-        )
-    )
-
+    # With --profile, the HTTP requests (with their connection phases and a traceparent
+    # header that joins the server spans to the trace), model turns and tool calls are
+    # traced too.
+    tracer = Tracer()
     try:
-        with mcp_client:
-            tools = mcp_client.list_tools_sync()
-            agent = Agent(tools=tools)
+        with tracer.span("run"):
+            with tracer.span("connect"):
+                _, tools = client_pool.get(
+                    mcp_endpoint,
+                    headers=headers,
+                    timeout=300,
+                    agent_arn=agent_arn,
+                    auth=auth,
+                    httpx_client_factory=tracer.http_client_factory
+                    if args.profile
+                    else create_mcp_http_client,
+                )
+            agent = Agent(
+                tools=tools, hooks=[AgentTracer(tracer)] if args.profile else None
+            )
             agent(PROMPT)
     except Exception as e:
         raise RuntimeError(f"Failed to connect to MCP server or execute agent: {e}")
+    finally:
+        if args.profile:
+            tracer.print_waterfall()
+            tracer.write(args.profile)
 
 
 if __name__ == "__main__":
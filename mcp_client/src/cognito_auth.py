@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable, Generator
+from pathlib import Path
+
+import httpx
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "mcp_client" / "cognito"
+
+
+class CognitoTokenProvider:
+    """Access tokens of a Cognito user, cached on disk and refreshed before expiry.
+
+    Tokens are stored in a file only the current user can read (mode 0600) and reused
+    across runs. When fewer than `refresh_margin` seconds are left, the token is renewed
+    with REFRESH_TOKEN_AUTH in the background while the current one keeps being used;
+    only when fewer than `min_validity` seconds are left does the caller wait for it.
+    Concurrent refreshes are coalesced into one Cognito call. USER_PASSWORD_AUTH is used
+    when there is no usable refresh token.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        username: str,
+        password: str | None = None,
+        region: str = "us-west-2",
+        cache_dir: str | Path | None = None,
+        refresh_margin: float = 300,
+        min_validity: float = 60,
+        endpoint_url: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        import boto3
+        from botocore import UNSIGNED
+        from botocore.config import Config
+
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.refresh_margin = refresh_margin
+        self.min_validity = min_validity
+        self.clock = clock
+        # InitiateAuth is a public API, so no AWS credentials are needed.
+        self._client = boto3.client(
+            "cognito-idp",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            config=Config(signature_version=UNSIGNED),
+        )
+        user_hash = hashlib.sha256(f"{client_id}:{username}".encode()).hexdigest()[:16]
+        self.cache_path = Path(cache_dir or DEFAULT_CACHE_DIR) / f"{user_hash}.json"
+        self._tokens = self._load()
+        self._lock = threading.Lock()
+        self._background: threading.Thread | None = None
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        self.cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._tokens, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _remaining(self) -> float:
+        if not self._tokens.get("access_token"):
+            return 0.0
+        return self._tokens.get("expires_at", 0) - self.clock()
+
+    def _authenticate(self) -> None:
+        refresh_token = self._tokens.get("refresh_token")
+        response = None
+        if refresh_token:
+            try:
+                response = self._client.initiate_auth(
+                    ClientId=self.client_id,
+                    AuthFlow="REFRESH_TOKEN_AUTH",
+                    AuthParameters={"REFRESH_TOKEN": refresh_token},
+                )
+            except self._client.exceptions.NotAuthorizedException:
+                # The refresh token expired or was revoked; sign in again below.
+                if not self.password:
+                    raise
+        if response is None:
+            if not self.password:
+                raise RuntimeError(
+                    "No valid refresh token is cached and no password is configured."
+                )
+            response = self._client.initiate_auth(
+                ClientId=self.client_id,
+                AuthFlow="USER_PASSWORD_AUTH",
+                AuthParameters={"USERNAME": self.username, "PASSWORD": self.password},
+            )
+            refresh_token = None
+        result = response["AuthenticationResult"]
+        self._tokens = {
+            "access_token": result["AccessToken"],
+            "expires_at": self.clock() + result["ExpiresIn"],
+            # REFRESH_TOKEN_AUTH does not return a new refresh token.
+            "refresh_token": result.get("RefreshToken") or refresh_token,
+        }
+        self._save()
+
+    def _refresh(self, force: bool = False) -> None:
+        with self._lock:
+            # Another caller may have refreshed while this one waited for the lock.
+            if force or self._remaining() < self.refresh_margin:
+                self._authenticate()
+
+    def _refresh_in_background(self) -> None:
+        if self._background is not None and self._background.is_alive():
+            return
+
+        def run() -> None:
+            try:
+                self._refresh()
+            except Exception:
+                # The next call refreshes in the foreground and surfaces the error.
+                pass
+
+        self._background = threading.Thread(target=run, daemon=True)
+        self._background.start()
+
+    def token(self) -> str:
+        """Return a valid access token, refreshing it if needed.
+
+        Returns:
+            str: The access token.
+        """
+        remaining = self._remaining()
+        if remaining < self.min_validity:
+            self._refresh()
+        elif remaining < self.refresh_margin:
+            self._refresh_in_background()
+        return self._tokens["access_token"]
+
+    async def atoken(self) -> str:
+        """Return a valid access token without blocking the event loop.
+
+        Returns:
+            str: The access token.
+        """
+        if self._remaining() < self.min_validity:
+            await asyncio.to_thread(self._refresh)
+        return self.token()
+
+    def invalidate(self, token: str) -> None:
+        """Renew the token after the server rejected `token`, unless already renewed."""
+        with self._lock:
+            if self._tokens.get("access_token") == token:
+                self._authenticate()
+
+
+class CognitoAuth(httpx.Auth):
+    """httpx authentication that sends the provider's token and retries once on 401."""
+
+    def __init__(self, provider: CognitoTokenProvider) -> None:
+        self.provider = provider
+
+    def sync_auth_flow(
+        self, request: httpx.Request
+    ) -> Generator[httpx.Request, httpx.Response, None]:
+        token = self.provider.token()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401:
+            self.provider.invalidate(token)
+            request.headers["Authorization"] = f"Bearer {self.provider.token()}"
+            yield request
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await self.provider.atoken()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401:
+            await asyncio.to_thread(self.provider.invalidate, token)
+            request.headers["Authorization"] = f"Bearer {await self.provider.atoken()}"
+            yield request
+
+
+def create_token_provider() -> CognitoTokenProvider | None:
+    """Create the token provider configured by environment variables.
+
+    Environment variables:
+        COGNITO_CLIENT_ID: Cognito app client ID.
+        COGNITO_USERNAME: Cognito user name.
+        COGNITO_PASSWORD: Password, used when no valid refresh token is cached.
+        COGNITO_REGION: Region of the user pool (default: us-west-2).
+        COGNITO_ENDPOINT_URL: Cognito endpoint, e.g. a local stub (default: AWS).
+        COGNITO_TOKEN_CACHE_DIR: Directory of the token cache
+            (default: ~/.cache/mcp_client/cognito).
+        COGNITO_REFRESH_MARGIN: Seconds before expiry to refresh in the background
+            (default: 300).
+
+    Returns:
+        CognitoTokenProvider | None: The provider, or None when the client ID or user
+            name is not set.
+    """
+    client_id = os.getenv("COGNITO_CLIENT_ID")
+    username = os.getenv("COGNITO_USERNAME")
+    if not (client_id and username):
+        return None
+    return CognitoTokenProvider(
+        client_id=client_id,
+        username=username,
+        password=os.getenv("COGNITO_PASSWORD"),
+        region=os.getenv("COGNITO_REGION", "us-west-2"),
+        cache_dir=os.getenv("COGNITO_TOKEN_CACHE_DIR"),
+        refresh_margin=float(os.getenv("COGNITO_REFRESH_MARGIN", "300")),
+        endpoint_url=os.getenv("COGNITO_ENDPOINT_URL"),
+    )
+
+
+def create_auth() -> CognitoAuth | None:
+    """Create `CognitoAuth` for the provider configured by environment variables.
+
+    Returns:
+        CognitoAuth | None: The authentication, or None when Cognito sign-in is not
+            configured and a static COGNITO_ACCESS_TOKEN is expected instead.
+    """
+    provider = create_token_provider()
+    return CognitoAuth(provider) if provider is not None else None
@@ -0,0 +1,441 @@
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any
+
+import httpx
+from dotenv import load_dotenv
+from mcp.types import CallToolResult, Tool
+
+from cognito_auth import create_auth
+from mcp_client_remote import get_mcp_endpoint
+from session_pool import SessionPool
+
+# Stats key of the health-check pings, used to rank endpoints where a tool has not
+# been called yet.
+PING = "ping"
+QUESTION = "LangGraphにおけるMCPの実装方法 (python) について調べて. "
+# Tool errors of a server turning a call away, which another endpoint may accept.
+REJECTIONS = ("overloaded", "quota_exceeded")
+
+
+def rejection(result: CallToolResult) -> str | None:
+    """Return why an endpoint turned a tool call away, or None if it did not.
+
+    The server reports overload and exceeded quotas as tool errors whose text ends
+    with a JSON object such as `{"error": "overloaded", ...}`.
+    """
+    if not result.isError:
+        return None
+    for content in result.content:
+        text = getattr(content, "text", "")
+        start = text.find("{")
+        if start < 0:
+            continue
+        try:
+            error = json.loads(text[start:])
+        except ValueError:
+            continue
+        if isinstance(error, dict) and error.get("error") in REJECTIONS:
+            return error["error"]
+    return None
+
+
+class RejectedError(Exception):
+    """Raised when an endpoint turned a tool call away; keeps its error result."""
+
+    def __init__(self, reason: str, result: CallToolResult) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.result = result
+
+
+class LatencyStats:
+    """Rolling window of call latencies and outcomes."""
+
+    def __init__(self, window: int = 100) -> None:
+        self._calls: deque[tuple[float, bool]] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool) -> None:
+        self._calls.append((latency, ok))
+
+    @property
+    def samples(self) -> int:
+        return len(self._calls)
+
+    def percentile(self, q: float) -> float | None:
+        latencies = sorted(latency for latency, ok in self._calls if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+    def error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(not ok for _, ok in self._calls) / len(self._calls)
+
+    def consecutive_failures(self) -> int:
+        failures = 0
+        for _, ok in reversed(self._calls):
+            if ok:
+                break
+            failures += 1
+        return failures
+
+
+class Endpoint:
+    """One MCP endpoint with its session pool and live statistics."""
+
+    def __init__(self, url: str, pool: SessionPool, window: int = 100) -> None:
+        self.url = url
+        self.pool = pool
+        self.window = window
+        self.started = False
+        # Outcomes of all calls and pings, for health.
+        self.outcomes = LatencyStats(window)
+        # Latencies per tool name and of pings, for ranking.
+        self.latencies: dict[str, LatencyStats] = {}
+        self.wins = 0
+
+    def record(self, key: str, latency: float, ok: bool) -> None:
+        self.latencies.setdefault(key, LatencyStats(self.window)).record(latency, ok)
+        self.outcomes.record(latency, ok)
+
+    def latency(self, key: str, min_samples: int) -> float | None:
+        stats = self.latencies.get(key)
+        if stats is None or stats.samples < min_samples:
+            return None
+        return stats.percentile(0.5)
+
+
+def endpoint_url(spec: str) -> str:
+    """Turn an agent runtime ARN into its MCP endpoint; URLs are returned unchanged."""
+    if spec.startswith(("http://", "https://")):
+        return spec
+    return get_mcp_endpoint(spec)
+
+
+class EndpointRouter:
+    """Sends tool calls to the fastest healthy of several MCP endpoints.
+
+    Each endpoint, e.g. a copy of the server in another region, keeps a session pool and
+    rolling statistics of its calls and of periodic pings. Endpoints are ranked by their
+    median latency for the tool being called, estimated from ping latency until the
+    tool has been called there `min_samples` times. An endpoint is demoted when its
+    error rate exceeds `max_error_rate` or its last `min_samples` calls and pings
+    failed; demoted endpoints are still tried as a last resort, and pings keep
+    measuring them so that they are promoted again once they recover.
+
+    A call that fails on one endpoint fails over to the next one. A call the server
+    turns away as overloaded or over quota counts as failed as well, both for failover
+    and for health. With `race` > 1 the call is sent to that many endpoints at once and
+    the first result wins; the others are cancelled on the client, although their
+    servers finish the work.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        headers: dict[str, str] | None = None,
+        auth: httpx.Auth | None = None,
+        race: int = 1,
+        failover: bool = True,
+        window: int = 100,
+        min_samples: int = 3,
+        max_error_rate: float = 0.5,
+        explore: float = 0.05,
+        probe_interval: float = 15,
+        probe_timeout: float = 5,
+        **pool_kwargs: Any,
+    ) -> None:
+        if not urls:
+            raise ValueError("At least one MCP endpoint is required.")
+        self.race = race
+        self.failover = failover
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.explore = explore
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.endpoints = [
+            Endpoint(url, SessionPool(url, headers, auth, **pool_kwargs), window)
+            for url in urls
+        ]
+        self._prober: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "EndpointRouter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Warm up all endpoints and start pinging them in the background.
+
+        Endpoints that cannot be reached are demoted instead of failing the start, as
+        long as at least one endpoint is reachable.
+        """
+        await self.probe()
+        if not any(endpoint.started for endpoint in self.endpoints):
+            raise ConnectionError("None of the MCP endpoints is reachable.")
+        if self._prober is None:
+            self._prober = asyncio.create_task(self._probe_periodically())
+
+    async def _probe(self, endpoint: Endpoint) -> None:
+        if endpoint.pool.saturated:
+            # Busy with calls, whose outcomes are recorded anyway.
+            return
+        started_at = time.monotonic()
+        try:
+            async with asyncio.timeout(self.probe_timeout):
+                if not endpoint.started:
+                    await endpoint.pool.start()
+                    endpoint.started = True
+                async with endpoint.pool.session() as session:
+                    started_at = time.monotonic()
+                    await session.send_ping()
+        except Exception:
+            endpoint.record(PING, time.monotonic() - started_at, False)
+            return
+        endpoint.record(PING, time.monotonic() - started_at, True)
+
+    async def probe(self) -> None:
+        """Ping all endpoints once and record their latency."""
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+
+    async def _probe_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe()
+
+    def is_healthy(self, endpoint: Endpoint) -> bool:
+        outcomes = endpoint.outcomes
+        if outcomes.consecutive_failures() >= self.min_samples:
+            return False
+        return (
+            outcomes.samples < self.min_samples
+            or outcomes.error_rate() <= self.max_error_rate
+        )
+
+    def estimate(self, endpoint: Endpoint, tool: str) -> float:
+        """Expected latency of a call of `tool` on `endpoint` in seconds.
+
+        Endpoints where the tool has not been called `min_samples` times are estimated
+        as their ping latency plus the shortest time the tool took on the server side
+        of any measured endpoint.
+        """
+        latency = endpoint.latency(tool, self.min_samples)
+        if latency is not None:
+            return latency
+        ping = endpoint.latency(PING, 1)
+        if ping is None:
+            return math.inf
+        server_times = [
+            tool_latency - other_ping
+            for other in self.endpoints
+            if (tool_latency := other.latency(tool, self.min_samples)) is not None
+            and (other_ping := other.latency(PING, 1)) is not None
+        ]
+        return ping + max(0.0, min(server_times, default=0.0))
+
+    def rank(self, tool: str) -> list[Endpoint]:
+        """Order the endpoints to try for a call of `tool`.
+
+        A fraction `explore` of the calls puts a random healthy endpoint first, so that
+        the latencies of endpoints that are not currently the fastest stay up to date.
+
+        Args:
+            tool: Tool name.
+
+        Returns:
+            list[Endpoint]: Healthy endpoints fastest first, followed by demoted ones.
+        """
+        healthy = sorted(
+            (endpoint for endpoint in self.endpoints if self.is_healthy(endpoint)),
+            key=lambda endpoint: self.estimate(endpoint, tool),
+        )
+        unhealthy = sorted(
+            (endpoint for endpoint in self.endpoints if not self.is_healthy(endpoint)),
+            key=lambda endpoint: endpoint.outcomes.error_rate(),
+        )
+        if len(healthy) > 1 and random.random() < self.explore:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + unhealthy
+
+    async def _call(
+        self,
+        endpoint: Endpoint,
+        name: str,
+        arguments: dict[str, Any] | None,
+        read_timeout_seconds: timedelta | None,
+    ) -> CallToolResult:
+        started_at = time.monotonic()
+        try:
+            result = await endpoint.pool.call_tool(
+                name, arguments, read_timeout_seconds=read_timeout_seconds
+            )
+        except asyncio.CancelledError:
+            # Lost a race: no outcome to record, the winner's latency is recorded.
+            raise
+        except Exception:
+            endpoint.record(name, time.monotonic() - started_at, False)
+            raise
+        reason = rejection(result)
+        endpoint.record(name, time.monotonic() - started_at, reason is None)
+        if reason is not None:
+            raise RejectedError(reason, result)
+        return result
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: dict[str, Any] | None = None,
+        read_timeout_seconds: timedelta | None = None,
+        race: int | None = None,
+    ) -> CallToolResult:
+        """Call a tool on the best endpoints, failing over when a call fails.
+
+        Args:
+            name (str): Tool name.
+            arguments (dict[str, Any] | None): Tool arguments.
+            read_timeout_seconds (timedelta | None): Read timeout of this call.
+            race (int | None): Number of endpoints to call at once (default: `race`
+                of the router).
+
+        Returns:
+            CallToolResult: The first successful result or, if every endpoint turned
+                the call away, the error result of the last one.
+        """
+        plan = deque(self.rank(name))
+        width = min(race or self.race, len(plan))
+        if not self.failover:
+            plan = deque(list(plan)[:width])
+        running: dict[asyncio.Task, Endpoint] = {}
+        error: Exception | None = None
+        try:
+            while plan or running:
+                while plan and len(running) < width:
+                    endpoint = plan.popleft()
+                    task = asyncio.create_task(
+                        self._call(endpoint, name, arguments, read_timeout_seconds)
+                    )
+                    running[task] = endpoint
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    endpoint = running.pop(task)
+                    if task.exception() is None:
+                        endpoint.wins += 1
+                        return task.result()
+                    error = task.exception()
+            if isinstance(error, RejectedError):
+                return error.result
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def list_tools(self) -> list[Tool]:
+        """List the tools of the best endpoint, failing over when it is unreachable."""
+        error: Exception | None = None
+        for endpoint in self.rank(PING):
+            try:
+                return await endpoint.pool.list_tools()
+            except Exception as e:
+                error = e
+        raise error
+
+    def snapshot(self) -> dict:
+        return {
+            endpoint.url: {
+                "healthy": self.is_healthy(endpoint),
+                "error_rate": endpoint.outcomes.error_rate(),
+                "wins": endpoint.wins,
+                "p50": {
+                    key: stats.percentile(0.5)
+                    for key, stats in endpoint.latencies.items()
+                },
+            }
+            for endpoint in self.endpoints
+        }
+
+    async def close(self) -> None:
+        """Stop the pings and close the session pools of all endpoints."""
+        if self._prober is not None:
+            self._prober.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._prober
+            self._prober = None
+        await asyncio.gather(*(endpoint.pool.close() for endpoint in self.endpoints))
+
+
+def create_endpoint_router(
+    headers: dict[str, str] | None = None, auth: httpx.Auth | None = None
+) -> EndpointRouter:
+    """Create the endpoint router configured by environment variables.
+
+    Environment variables:
+        MCP_ENDPOINTS: Comma-separated agent runtime ARNs or MCP endpoint URLs
+            (default: AGENT_ARN).
+        ROUTER_RACE: Number of endpoints each call is sent to at once (default: 1).
+        ROUTER_FAILOVER: Whether to try the next endpoint when a call fails
+            (default: 1).
+        ROUTER_PROBE_INTERVAL: Seconds between pings of each endpoint (default: 15).
+        ROUTER_MAX_ERROR_RATE: Error rate above which an endpoint is demoted
+            (default: 0.5).
+
+    Returns:
+        EndpointRouter: The router.
+    """
+    specs = os.getenv("MCP_ENDPOINTS") or os.getenv("AGENT_ARN") or ""
+    return EndpointRouter(
+        [endpoint_url(spec.strip()) for spec in specs.split(",") if spec.strip()],
+        headers=headers,
+        auth=auth,
+        race=int(os.getenv("ROUTER_RACE", "1")),
+        failover=os.getenv("ROUTER_FAILOVER", "1") == "1",
+        probe_interval=float(os.getenv("ROUTER_PROBE_INTERVAL", "15")),
+        max_error_rate=float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5")),
+    )
+
+
+async def main():
+    load_dotenv()
+    bearer_token = os.getenv("COGNITO_ACCESS_TOKEN")
+    auth = create_auth()
+    if not (
+        (os.getenv("MCP_ENDPOINTS") or os.getenv("AGENT_ARN"))
+        and (auth or bearer_token)
+    ):
+        raise ValueError(
+            "Required environment variables MCP_ENDPOINTS (or AGENT_ARN) and"
+            " COGNITO_ACCESS_TOKEN (or COGNITO_CLIENT_ID and COGNITO_USERNAME)"
+            " are not set."
+        )
+    headers = {} if auth else {"authorization": f"Bearer {bearer_token}"}
+    question = sys.argv[1] if len(sys.argv) > 1 else QUESTION
+
+    async with create_endpoint_router(headers, auth) as router:
+        result = await router.call_tool(
+            "openai_o3_web_search",
+            {"question": question},
+            read_timeout_seconds=timedelta(seconds=300),
+        )
+        for content in result.content:
+            print(getattr(content, "text", content))
+        for url, stats in router.snapshot().items():
+            print(f"\n{url}\n  {stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
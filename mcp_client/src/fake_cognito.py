@@ -0,0 +1,82 @@
+"""Local stand-in for the Cognito InitiateAuth API, for testing token refresh.
+
+    uv run src/fake_cognito.py --expires-in 120
+    COGNITO_ENDPOINT_URL=http://127.0.0.1:9229 uv run src/agent.py
+
+Accepts any user and password and issues short-lived tokens, so refreshes can be
+observed without waiting an hour. GET /stats returns the number of calls per flow.
+"""
+
+import argparse
+import itertools
+import json
+import secrets
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def create_handler(expires_in: int) -> type[BaseHTTPRequestHandler]:
+    token_ids = itertools.count()
+    refresh_tokens: set[str] = set()
+    stats = {"USER_PASSWORD_AUTH": 0, "REFRESH_TOKEN_AUTH": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/x-amz-json-1.1")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            self._send(200, stats)
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            flow = body.get("AuthFlow")
+            params = body.get("AuthParameters", {})
+            result = {
+                "AccessToken": f"access-{next(token_ids)}",
+                "ExpiresIn": expires_in,
+                "TokenType": "Bearer",
+            }
+            if flow == "USER_PASSWORD_AUTH":
+                result["RefreshToken"] = secrets.token_hex(16)
+                refresh_tokens.add(result["RefreshToken"])
+            elif flow != "REFRESH_TOKEN_AUTH" or (
+                params.get("REFRESH_TOKEN") not in refresh_tokens
+            ):
+                self._send(
+                    400,
+                    {
+                        "__type": "NotAuthorizedException",
+                        "message": "Invalid Refresh Token",
+                    },
+                )
+                return
+            stats[flow] += 1
+            self._send(200, {"AuthenticationResult": result, "ChallengeParameters": {}})
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=9229)
+    parser.add_argument(
+        "--expires-in", type=int, default=3600, help="Token lifetime (s)"
+    )
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), create_handler(args.expires_in)
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
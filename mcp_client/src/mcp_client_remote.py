@@ -1,21 +1,39 @@
+import argparse
 import asyncio
 import os
 import sys
 
+import httpx
 from dotenv import load_dotenv
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared._httpx_utils import McpHttpClientFactory, create_mcp_http_client
 
+from cognito_auth import create_auth
+from tracing import Tracer, add_profile_argument
 
-def get_mcp_endpoint(agent_arn: str, region: str = "us-west-2") -> str:
+
+def get_mcp_endpoint(agent_arn: str, region: str | None = None) -> str:
+    # arn:aws:bedrock-agentcore:<region>:<account>:runtime/<id>
+    region = region or agent_arn.split(":")[3]
     encoded_arn = agent_arn.replace(":", "%3A").replace("/", "%2F")
     return f"https://bedrock-agentcore.{region}.amazonaws.com/runtimes/{encoded_arn}/invocations?qualifier=DEFAULT"
 
 
-async def connect_to_server(mcp_endpoint: str, headers: dict) -> None:
+async def connect_to_server(
+    mcp_endpoint: str,
+    headers: dict,
+    auth: httpx.Auth | None = None,
+    httpx_client_factory: McpHttpClientFactory = create_mcp_http_client,
+) -> None:
     try:
         async with streamablehttp_client(
-            mcp_endpoint, headers, timeout=120, terminate_on_close=False
+            mcp_endpoint,
+            headers,
+            timeout=120,
+            terminate_on_close=False,
+            auth=auth,
+            httpx_client_factory=httpx_client_factory,
         ) as (
             read_stream,
             write_stream,
@@ -49,23 +67,41 @@ async def connect_to_server(mcp_endpoint: str, headers: dict) -> None:
 
 
 async def main():
+    parser = argparse.ArgumentParser(description="List the tools of the MCP server.")
+    add_profile_argument(parser)
+    args = parser.parse_args()
     load_dotenv()
     agent_arn = os.getenv("AGENT_ARN")
     bearer_token = os.getenv("COGNITO_ACCESS_TOKEN")
-    if not (agent_arn and bearer_token):
+    auth = create_auth()
+    if not (agent_arn and (auth or bearer_token)):
         raise ValueError(
-            "Required environment variables AGENT_ARN and COGNITO_ACCESS_TOKEN are not set."
+            "Required environment variables AGENT_ARN and COGNITO_ACCESS_TOKEN"
+            " (or COGNITO_CLIENT_ID and COGNITO_USERNAME) are not set."
         )
 
     mcp_endpoint = get_mcp_endpoint(agent_arn)
     headers = {
-        "authorization": f"Bearer {bearer_token}",
         "Content-Type": "application/json",
         "Accept": "application/json, text/event-stream",
     }
+    if auth is None:
+        headers["authorization"] = f"Bearer {bearer_token}"
 
     print(f"\nConnect to: {mcp_endpoint}")
-    await connect_to_server(mcp_endpoint, headers)
+    tracer = Tracer()
+    try:
+        with tracer.span("run"):
+            await connect_to_server(
+                mcp_endpoint,
+                headers,
+                auth,
+                tracer.http_client_factory if args.profile else create_mcp_http_client,
+            )
+    finally:
+        if args.profile:
+            tracer.print_waterfall()
+            tracer.write(args.profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,532 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+import httpx
+from mcp import ClientSession, McpError
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared._httpx_utils import McpHttpClientFactory, create_mcp_http_client
+from mcp.shared.session import RequestResponder
+from mcp.types import (
+    CONNECTION_CLOSED,
+    CallToolResult,
+    InitializeResult,
+    ServerNotification,
+    ServerRequest,
+    Tool,
+    ToolListChangedNotification,
+)
+
+from tool_cache import ToolCache, tools_version
+
+# Errors of the connection itself, after which a pooled session is discarded.
+CONNECTION_ERRORS = (httpx.TransportError, ConnectionError)
+# Error code the streamable-http client reports when the server answers 404 because the
+# server-side session expired.
+SESSION_TERMINATED = 32600
+# Other McpErrors, such as invalid params or a read timeout, are answered by a session
+# that is still usable.
+BROKEN_SESSION_CODES = (SESSION_TERMINATED, CONNECTION_CLOSED)
+
+
+class SessionClosedError(ConnectionError):
+    """The connection of a pooled session was lost while a request was waiting on it."""
+
+
+def is_broken(error: Exception) -> bool:
+    """Whether a session whose request failed with `error` must be replaced."""
+    if isinstance(error, McpError):
+        return error.error.code in BROKEN_SESSION_CODES
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a call failed before the server ran it, so it is safe to send again."""
+    if isinstance(error, McpError):
+        return error.error.code == SESSION_TERMINATED
+    return isinstance(error, httpx.ConnectError | ConnectionRefusedError)
+
+
+class PooledSession:
+    """One initialized MCP session, owned by a background task.
+
+    The transport and the session are entered and exited in the same task, as anyio
+    requires, and stay open until `close` is called or the connection fails.
+    """
+
+    def __init__(self) -> None:
+        self.session: ClientSession | None = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self._closed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def open(
+        self,
+        url: str,
+        headers: dict[str, str] | None,
+        auth: httpx.Auth | None,
+        timeout: float,
+        on_ready: Callable[[ClientSession, InitializeResult], Awaitable[None]],
+        message_handler: Callable[..., Awaitable[None]],
+        httpx_client_factory: McpHttpClientFactory = create_mcp_http_client,
+    ) -> None:
+        ready: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+        async def run() -> None:
+            try:
+                async with streamablehttp_client(
+                    url,
+                    headers,
+                    timeout=timeout,
+                    auth=auth,
+                    terminate_on_close=False,
+                    httpx_client_factory=httpx_client_factory,
+                ) as (read_stream, write_stream, _):
+                    async with ClientSession(
+                        read_stream, write_stream, message_handler=message_handler
+                    ) as session:
+                        await on_ready(session, await session.initialize())
+                        self.session = session
+                        ready.set_result(None)
+                        await self._closed.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+            finally:
+                self.session = None
+
+        self._task = asyncio.create_task(run())
+        await ready
+
+    async def ping(self, timeout: float) -> bool:
+        if self.session is None or not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+        except (asyncio.TimeoutError, McpError, *CONNECTION_ERRORS):
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    async def close(self) -> None:
+        self._closed.set()
+        if self._task is not None:
+            with contextlib.suppress(Exception):
+                await self._task
+
+
+class SessionPool:
+    """A pool of warm, initialized MCP sessions for one endpoint.
+
+    Sessions are opened ahead of time, handed out one caller at a time, and returned
+    for reuse, so calls skip the connection setup, `initialize` and `list_tools` round
+    trips. Sessions that were idle for a while are pinged before use, sessions idle
+    for longer than `max_idle` are closed (keeping `min_size` warm), and sessions that
+    fail or whose server-side session expired are replaced.
+
+    With a `tool_cache`, the tools are available from the cache before any session is
+    opened, and `tools/list` is only called when the tool-set version the server
+    advertises in `initialize` differs from the cached one or the server sends a
+    tool-list-changed notification.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        auth: httpx.Auth | None = None,
+        tool_cache: ToolCache | None = None,
+        agent_arn: str | None = None,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_idle: float = 300,
+        health_check_interval: float = 30,
+        health_check_timeout: float = 5,
+        timeout: float = 120,
+        httpx_client_factory: McpHttpClientFactory = create_mcp_http_client,
+    ) -> None:
+        self.url = url
+        self.headers = headers
+        self.auth = auth
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.timeout = timeout
+        self.httpx_client_factory = httpx_client_factory
+        self.tool_cache = tool_cache
+        self.agent_arn = agent_arn
+        self.tools: list[Tool] = []
+        self.tools_version: str | None = None
+        self._tools_lock = asyncio.Lock()
+        if tool_cache is not None and (cached := tool_cache.get(url, agent_arn)):
+            self.tools = cached.tools
+            self.tools_version = cached.version
+        self._idle: deque[PooledSession] = deque()
+        self._slots = asyncio.Semaphore(max_size)
+        self._reaper: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "SessionPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    @property
+    def saturated(self) -> bool:
+        """Whether all `max_size` sessions are in use."""
+        return self._slots.locked()
+
+    async def start(self) -> None:
+        """Open `min_size` sessions and start evicting idle ones in the background."""
+        sessions = await asyncio.gather(*(self._open() for _ in range(self.min_size)))
+        self._idle.extend(sessions)
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def _open(self) -> PooledSession:
+        pooled = PooledSession()
+        await pooled.open(
+            self.url,
+            self.headers,
+            self.auth,
+            self.timeout,
+            on_ready=self._revalidate_tools,
+            message_handler=self._handle_message,
+            httpx_client_factory=self.httpx_client_factory,
+        )
+        return pooled
+
+    async def _revalidate_tools(
+        self, session: ClientSession, result: InitializeResult
+    ) -> None:
+        async with self._tools_lock:
+            version = result.serverInfo.version
+            if self.tools and self.tools_version == version:
+                return
+            self.tools = (await session.list_tools()).tools
+            self.tools_version = version
+            if self.tool_cache is not None:
+                self.tool_cache.put(self.url, self.agent_arn, version, self.tools)
+
+    async def _handle_message(
+        self,
+        message: RequestResponder[ServerRequest, Any] | ServerNotification | Exception,
+    ) -> None:
+        if isinstance(message, ServerNotification) and isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            self.tools_version = None
+            if self.tool_cache is not None:
+                self.tool_cache.invalidate(self.url, self.agent_arn)
+
+    async def _checkout(self) -> PooledSession:
+        while self._idle:
+            pooled = self._idle.pop()
+            now = time.monotonic()
+            if not pooled.alive or now - pooled.last_used > self.max_idle:
+                await pooled.close()
+                continue
+            if now - pooled.last_checked > self.health_check_interval and not (
+                await pooled.ping(self.health_check_timeout)
+            ):
+                await pooled.close()
+                continue
+            return pooled
+        return await self._open()
+
+    @contextlib.asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """Borrow a session for the duration of the `async with` block.
+
+        A session whose call failed because the connection or the server-side session
+        is gone is closed instead of being returned to the pool. If the connection of the session is lost
+        while the block runs, the block is cancelled and `SessionClosedError` raised.
+        """
+        async with self._slots:
+            pooled = await self._checkout()
+            caller = asyncio.current_task()
+            holding, lost, broken = True, False, False
+
+            def on_lost(_: asyncio.Task) -> None:
+                # mcp does not fail requests that are waiting for a response when the
+                # transport dies, so they would otherwise wait for their read timeout.
+                nonlocal lost
+                if holding:
+                    lost = True
+                    caller.cancel()
+
+            pooled._task.add_done_callback(on_lost)
+            try:
+                yield pooled.session
+            except asyncio.CancelledError:
+                if lost and caller.uncancel() == 0:
+                    raise SessionClosedError(
+                        "The connection to the MCP server was lost."
+                    ) from None
+                raise
+            except (McpError, *CONNECTION_ERRORS) as e:
+                broken = is_broken(e)
+                raise
+            finally:
+                holding = False
+                pooled._task.remove_done_callback(on_lost)
+                if broken or not pooled.alive:
+                    await pooled.close()
+                else:
+                    pooled.last_used = pooled.last_checked = time.monotonic()
+                    self._idle.append(pooled)
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: dict[str, Any] | None = None,
+        read_timeout_seconds: timedelta | None = None,
+    ) -> CallToolResult:
+        """Call a tool on a pooled session, retrying once if its server session expired.
+
+        Args:
+            name (str): Tool name.
+            arguments (dict[str, Any] | None): Tool arguments.
+            read_timeout_seconds (timedelta | None): Read timeout of this call.
+
+        Returns:
+            CallToolResult: The tool result.
+        """
+        for attempt in range(2):
+            try:
+                async with self.session() as session:
+                    return await session.call_tool(
+                        name, arguments, read_timeout_seconds=read_timeout_seconds
+                    )
+            except (McpError, *CONNECTION_ERRORS) as e:
+                if attempt == 1 or not is_retryable(e):
+                    raise
+        raise AssertionError("unreachable")
+
+    async def list_tools(self) -> list[Tool]:
+        """Return the cached tools, listing them again only when they may be stale."""
+        if not self.tools or self.tools_version is None:
+            async with self.session() as session:
+                tools = (await session.list_tools()).tools
+            async with self._tools_lock:
+                self.tools = tools
+                self.tools_version = tools_version(tools)
+                if self.tool_cache is not None:
+                    self.tool_cache.put(
+                        self.url, self.agent_arn, self.tools_version, tools
+                    )
+        return self.tools
+
+    async def _reap(self) -> None:
+        interval = min(self.health_check_interval, self.max_idle)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            kept: deque[PooledSession] = deque()
+            # Sessions are appended when returned, so the oldest idle ones come first.
+            while self._idle:
+                pooled = self._idle.popleft()
+                expired = now - pooled.last_used > self.max_idle
+                if not pooled.alive or (
+                    expired and len(kept) + len(self._idle) >= self.min_size
+                ):
+                    await pooled.close()
+                    continue
+                if expired or now - pooled.last_checked > self.health_check_interval:
+                    # Keep the warm sessions warm; replace the ones that stopped answering.
+                    if not await pooled.ping(self.health_check_timeout):
+                        await pooled.close()
+                        continue
+                    pooled.last_used = now
+                kept.append(pooled)
+            self._idle.extend(kept)
+
+    async def close(self) -> None:
+        """Close all idle sessions and stop the background eviction."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reaper
+            self._reaper = None
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class SyncSessionPool:
+    """Runs a SessionPool on a background event loop for synchronous callers."""
+
+    def __init__(self, url: str, **kwargs: Any) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.pool: SessionPool = self._run(self._create(url, kwargs))
+
+    async def _create(self, url: str, kwargs: dict[str, Any]) -> SessionPool:
+        pool = SessionPool(url, **kwargs)
+        await pool.start()
+        return pool
+
+    def _run(self, coro: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def __enter__(self) -> "SyncSessionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def call_tool(
+        self,
+        name: str,
+        arguments: dict[str, Any] | None = None,
+        read_timeout_seconds: timedelta | None = None,
+    ) -> CallToolResult:
+        return self._run(self.pool.call_tool(name, arguments, read_timeout_seconds))
+
+    def list_tools(self) -> list[Tool]:
+        return self._run(self.pool.list_tools())
+
+    def close(self) -> None:
+        self._run(self.pool.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class StrandsClientPool:
+    """Keeps one started Strands `MCPClient` per endpoint warm across agent runs.
+
+    `MCPClient` owns its session on a background thread, so instead of opening and
+    initializing a new one for every run, `get` returns the client started by an earlier
+    run, checks it with `list_tools_sync` when it was idle for a while, restarts it when
+    the session is gone, and stops clients idle for longer than `max_idle`.
+
+    With a `tool_cache`, a new client gets its tools from the cache right away and lists
+    them again in the background, updating the cache for the next run if they changed.
+    """
+
+    def __init__(
+        self,
+        health_check_interval: float = 30,
+        max_idle: float = 300,
+        tool_cache: ToolCache | None = None,
+    ) -> None:
+        self.health_check_interval = health_check_interval
+        self.max_idle = max_idle
+        self.tool_cache = tool_cache
+        self._clients: dict[str, Any] = {}
+        self._tools: dict[str, list] = {}
+        self._last_used: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        timeout: float = 300,
+        agent_arn: str | None = None,
+        auth: httpx.Auth | None = None,
+        httpx_client_factory: McpHttpClientFactory = create_mcp_http_client,
+    ) -> tuple[Any, list]:
+        """Return a started `MCPClient` for `url` and its tools.
+
+        Args:
+            url (str): MCP endpoint.
+            headers (dict[str, str] | None): HTTP headers, e.g. the authorization header.
+            timeout (float): HTTP timeout in seconds.
+            agent_arn (str | None): Agent runtime ARN, part of the tool cache key.
+            auth (httpx.Auth | None): HTTP authentication, e.g. `CognitoAuth`.
+            httpx_client_factory (McpHttpClientFactory): Creates the HTTP client of a
+                new `MCPClient`, e.g. `Tracer.http_client_factory`.
+
+        Returns:
+            tuple[MCPClient, list[MCPAgentTool]]: The client and the tools for an Agent.
+        """
+        from strands.tools.mcp import MCPClient
+
+        with self._lock:
+            self._evict_idle(keep=url)
+            client = self._clients.get(url)
+            now = time.monotonic()
+            if client is not None and (
+                now - self._last_used[url] > self.health_check_interval
+            ):
+                try:
+                    self._tools[url] = client.list_tools_sync()
+                except Exception:
+                    self._stop(url)
+                    client = None
+            if client is None:
+                client = MCPClient(
+                    lambda: streamablehttp_client(
+                        url,
+                        headers=headers,
+                        timeout=timeout,
+                        auth=auth,
+                        httpx_client_factory=httpx_client_factory,
+                    )
+                )
+                client.start()
+                self._clients[url] = client
+                self._tools[url] = self._load_tools(client, url, agent_arn)
+            self._last_used[url] = now
+            return client, self._tools[url]
+
+    def _load_tools(self, client: Any, url: str, agent_arn: str | None) -> list:
+        from strands.tools.mcp import MCPAgentTool
+
+        cached = self.tool_cache and self.tool_cache.get(url, agent_arn)
+        if not cached:
+            tools = client.list_tools_sync()
+            if self.tool_cache is not None:
+                mcp_tools = [tool.mcp_tool for tool in tools]
+                self.tool_cache.put(url, agent_arn, tools_version(mcp_tools), mcp_tools)
+            return tools
+
+        def revalidate() -> None:
+            try:
+                tools = client.list_tools_sync()
+            except Exception:
+                return
+            mcp_tools = [tool.mcp_tool for tool in tools]
+            version = tools_version(mcp_tools)
+            if version != cached.version:
+                self.tool_cache.put(url, agent_arn, version, mcp_tools)
+                with self._lock:
+                    if self._clients.get(url) is client:
+                        self._tools[url] = tools
+
+        threading.Thread(target=revalidate, daemon=True).start()
+        return [MCPAgentTool(tool, client) for tool in cached.tools]
+
+    def _stop(self, url: str) -> None:
+        client = self._clients.pop(url)
+        self._tools.pop(url, None)
+        self._last_used.pop(url, None)
+        with contextlib.suppress(Exception):
+            client.stop(None, None, None)
+
+    def _evict_idle(self, keep: str) -> None:
+        now = time.monotonic()
+        for url, last_used in list(self._last_used.items()):
+            if url != keep and now - last_used > self.max_idle:
+                self._stop(url)
+
+    def close(self) -> None:
+        with self._lock:
+            for url in list(self._clients):
+                self._stop(url)
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared._httpx_utils import create_mcp_http_client
+from mcp.types import CallToolResult, LoggingMessageNotificationParams
+
+from cognito_auth import create_auth
+from mcp_client_remote import get_mcp_endpoint
+from tracing import Tracer, add_profile_argument
+
+OUTPUT_TEXT_LOGGER = "openai_o3_web_search.output_text"
+QUESTION = "LangGraphにおけるMCPの実装方法 (python) について調べて. "
+
+
+class StreamRenderer:
+    """Renders progress notifications and partial output text of a tool call as they arrive."""
+
+    def __init__(self, out=sys.stdout, err=sys.stderr) -> None:
+        self.out = out
+        self.err = err
+        self.chunks: list[str] = []
+
+    @property
+    def streamed(self) -> str:
+        """The output text streamed so far."""
+        return "".join(self.chunks)
+
+    async def on_progress(
+        self, progress: float, total: float | None, message: str | None
+    ) -> None:
+        if message and not message.startswith("Received"):
+            print(f"\n⏳ {message}", file=self.err, flush=True)
+
+    async def on_log(self, params: LoggingMessageNotificationParams) -> None:
+        if params.logger == OUTPUT_TEXT_LOGGER:
+            self.chunks.append(params.data)
+            print(params.data, end="", file=self.out, flush=True)
+
+
+async def call_tool_streaming(
+    session: ClientSession,
+    renderer: StreamRenderer,
+    name: str,
+    arguments: dict,
+    read_timeout_seconds: timedelta | None = None,
+) -> CallToolResult:
+    """Call a tool and render its progress and partial output while it runs.
+
+    The session must have been created with `logging_callback=renderer.on_log`. The
+    final result is printed as well, except for text that was already streamed in full:
+    a call that joined a shared search late only streams the rest of it, and a shaped
+    or compressed result differs from the raw text.
+
+    Args:
+        session: An initialized MCP client session.
+        renderer: Renders the notifications of the call.
+        name: The tool name.
+        arguments: The tool arguments.
+        read_timeout_seconds: Timeout for the whole tool call.
+
+    Returns:
+        CallToolResult: The final tool result.
+    """
+    result = await session.call_tool(
+        name,
+        arguments,
+        read_timeout_seconds=read_timeout_seconds,
+        progress_callback=renderer.on_progress,
+    )
+    streamed = renderer.streamed
+    if streamed:
+        print(file=renderer.out)
+    for content in result.content:
+        text = getattr(content, "text", None)
+        if streamed and text == streamed:
+            continue
+        print(content if text is None else text, file=renderer.out)
+    print(file=renderer.out)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Stream the progress and answer of a web search."
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    load_dotenv()
+    agent_arn = os.getenv("AGENT_ARN")
+    bearer_token = os.getenv("COGNITO_ACCESS_TOKEN")
+    auth = create_auth()
+    if not (agent_arn and (auth or bearer_token)):
+        raise ValueError(
+            "Required environment variables AGENT_ARN and COGNITO_ACCESS_TOKEN"
+            " (or COGNITO_CLIENT_ID and COGNITO_USERNAME) are not set."
+        )
+
+    mcp_endpoint = get_mcp_endpoint(agent_arn)
+    headers = {} if auth else {"authorization": f"Bearer {bearer_token}"}
+    renderer = StreamRenderer()
+    tracer = Tracer()
+
+    try:
+        with tracer.span("run"):
+            async with streamablehttp_client(
+                mcp_endpoint,
+                headers,
+                timeout=120,
+                terminate_on_close=False,
+                auth=auth,
+                httpx_client_factory=tracer.http_client_factory
+                if args.profile
+                else create_mcp_http_client,
+            ) as (
+                read_stream,
+                write_stream,
+                _,
+            ):
+                async with ClientSession(
+                    read_stream, write_stream, logging_callback=renderer.on_log
+                ) as session:
+                    await session.initialize()
+                    await call_tool_streaming(
+                        session,
+                        renderer,
+                        "openai_o3_web_search",
+                        {"question": QUESTION},
+                        read_timeout_seconds=timedelta(seconds=300),
+                    )
+    finally:
+        if args.profile:
+            tracer.print_waterfall()
+            tracer.write(args.profile)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
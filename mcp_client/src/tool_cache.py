@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from mcp.types import Tool
+
+DEFAULT_PATH = Path.home() / ".cache" / "mcp_client" / "tools.json"
+
+
+@dataclass
+class CachedTools:
+    version: str
+    tools: list[Tool]
+    fetched_at: float
+
+
+def tools_version(tools: list[Tool]) -> str:
+    """Hash tool definitions the same way the server computes its tool-set version.
+
+    Args:
+        tools (list[Tool]): Tool definitions.
+
+    Returns:
+        str: The tool-set version.
+    """
+    definitions = [
+        tool.model_dump(mode="json", exclude_none=True)
+        for tool in sorted(tools, key=lambda tool: tool.name)
+    ]
+    payload = json.dumps(definitions, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class ToolCache:
+    """Tool definitions per endpoint and agent ARN, persisted to a JSON file.
+
+    Entries are stored with the tool-set version the server advertises as its version
+    in the `initialize` result, so a client that already ran `initialize` can tell
+    whether its cached tools are current without calling `tools/list`.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path or os.getenv("MCP_TOOL_CACHE_PATH", DEFAULT_PATH))
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(endpoint: str, agent_arn: str | None = None) -> str:
+        return f"{agent_arn or ''} {endpoint}"
+
+    def get(self, endpoint: str, agent_arn: str | None = None) -> CachedTools | None:
+        entry = self._entries.get(self.key(endpoint, agent_arn))
+        if entry is None:
+            return None
+        try:
+            tools = [Tool.model_validate(tool) for tool in entry["tools"]]
+        except ValueError:
+            return None
+        return CachedTools(entry["version"], tools, entry["fetched_at"])
+
+    def put(
+        self,
+        endpoint: str,
+        agent_arn: str | None,
+        version: str,
+        tools: list[Tool],
+    ) -> None:
+        with self._lock:
+            self._entries[self.key(endpoint, agent_arn)] = {
+                "version": version,
+                "fetched_at": time.time(),
+                "tools": [
+                    tool.model_dump(mode="json", exclude_none=True) for tool in tools
+                ],
+            }
+            self._save()
+
+    def invalidate(self, endpoint: str, agent_arn: str | None = None) -> None:
+        with self._lock:
+            if self._entries.pop(self.key(endpoint, agent_arn), None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that a concurrent reader never sees a
+        # partially written cache.
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False))
+        os.replace(tmp_path, self.path)
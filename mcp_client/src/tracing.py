@@ -0,0 +1,511 @@
+import argparse
+import contextlib
+import contextvars
+import json
+import secrets
+import socket
+import sys
+import threading
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import anyio
+import httpcore
+import httpx
+
+# httpcore trace events that become phases of an HTTP request span. Connecting is
+# timed by TracingNetworkBackend, which separates the DNS lookup from the TCP connect.
+HTTP_PHASES = {
+    "start_tls": "tls",
+    "send_request_headers": "send headers",
+    "send_request_body": "send body",
+    "receive_response_headers": "wait",
+    "receive_response_body": "receive",
+}
+WATERFALL_WIDTH = 40
+# httpcore errors, which TracingTransport raises as the httpx errors of the same name.
+HTTPCORE_ERRORS = (
+    httpcore.TimeoutException,
+    httpcore.NetworkError,
+    httpcore.ProtocolError,
+    httpcore.ProxyError,
+    httpcore.UnsupportedProtocol,
+)
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start: float
+    end: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Tracer:
+    """Collects the spans of one client run under a single W3C trace ID.
+
+    Spans nest under the span that is current in the calling task. Work done on other
+    threads or in tasks started earlier, such as the Strands `MCPClient` thread and the
+    streamable HTTP writer task, has no current span, so it nests under the innermost
+    open scope: a span opened with `span`, or started with `scope=True`.
+    """
+
+    def __init__(self) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.started_at = time.time()
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+        self._open: list[Span] = []
+        self._lock = threading.Lock()
+
+    def _parent(self) -> Span | None:
+        span = _current_span.get()
+        if span is not None and span.end is None:
+            return span
+        with self._lock:
+            return self._open[-1] if self._open else None
+
+    def start(
+        self,
+        name: str,
+        parent: Span | None = None,
+        scope: bool = False,
+        **attributes: Any,
+    ) -> Span:
+        """Start a span that is ended explicitly with `finish`."""
+        parent = parent or self._parent()
+        span = Span(
+            name,
+            secrets.token_hex(8),
+            parent.span_id if parent else None,
+            time.perf_counter(),
+            attributes=attributes,
+        )
+        with self._lock:
+            self.spans.append(span)
+            if scope:
+                self._open.append(span)
+        return span
+
+    def finish(self, span: Span, error: BaseException | None = None) -> None:
+        if span.end is not None:
+            return
+        span.end = time.perf_counter()
+        if error is not None:
+            span.attributes["error"] = type(error).__name__
+        with self._lock:
+            if span in self._open:
+                self._open.remove(span)
+
+    def discard(self, span: Span) -> None:
+        with self._lock:
+            self.spans.remove(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the block as a span that is current for the code it runs."""
+        span = self.start(name, scope=True, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.finish(span, e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def traceparent(self, span: Span) -> str:
+        return f"00-{self.trace_id}-{span.span_id}-01"
+
+    def http_client_factory(
+        self,
+        headers: dict[str, str] | None = None,
+        timeout: httpx.Timeout | None = None,
+        auth: httpx.Auth | None = None,
+    ) -> httpx.AsyncClient:
+        """Create a traced client, for `httpx_client_factory` of streamablehttp_client.
+
+        Mirrors the defaults of mcp's `create_mcp_http_client`.
+        """
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout or httpx.Timeout(30.0),
+            auth=TracedAuth(self, auth) if auth is not None else None,
+            follow_redirects=True,
+            transport=TracingTransport(self),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "start_ms": round((span.start - self._origin) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    "attributes": span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def print_waterfall(self, file: Any = sys.stdout) -> None:
+        """Print every span as a bar on a shared time axis, children under parents."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        if not spans:
+            return
+        origin = spans[0].start
+        total = max(span.start + span.duration for span in spans) - origin
+        children: dict[str | None, list[Span]] = {}
+        ids = {span.span_id for span in spans}
+        for span in spans:
+            parent_id = span.parent_id if span.parent_id in ids else None
+            children.setdefault(parent_id, []).append(span)
+
+        print(f"\ntrace {self.trace_id}  {total * 1000:.1f} ms", file=file)
+        scale = WATERFALL_WIDTH / total if total else 0
+
+        def show(span: Span, depth: int) -> None:
+            offset = span.start - origin
+            begin = min(WATERFALL_WIDTH - 1, int(offset * scale))
+            width = max(1, round(span.duration * scale))
+            bar = " " * begin + "█" * min(width, WATERFALL_WIDTH - begin)
+            label = ("  " * depth + span.name)[:48]
+            sizes = "".join(
+                f"  {key}={span.attributes[key]}"
+                for key in ("request_bytes", "response_bytes", "status")
+                if key in span.attributes
+            )
+            print(
+                f"{offset * 1000:9.1f} {span.duration * 1000:9.1f} ms  {label:<48} "
+                f"|{bar:<{WATERFALL_WIDTH}}|{sizes}",
+                file=file,
+            )
+            for child in children.get(span.span_id, []):
+                show(child, depth + 1)
+
+        for span in children.get(None, []):
+            show(span, 0)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="trace.json",
+        metavar="TRACE_JSON",
+        help="Print a waterfall of the run and write its trace (default: trace.json)",
+    )
+
+
+def rpc_label(request: httpx.Request) -> str:
+    """Name an MCP HTTP request after the JSON-RPC messages it carries."""
+    if request.method != "POST":
+        return {"GET": "stream", "DELETE": "terminate"}.get(request.method, "")
+    try:
+        payload = json.loads(request.content)
+    except ValueError:
+        return ""
+    labels = []
+    for message in payload if isinstance(payload, list) else [payload]:
+        method = message.get("method") if isinstance(message, dict) else None
+        if method == "tools/call":
+            method = f"tools/call {message.get('params', {}).get('name', '')}"
+        labels.append(method or "response")
+    return ", ".join(labels)
+
+
+@contextlib.contextmanager
+def httpx_errors(request: httpx.Request) -> Iterator[None]:
+    """Raise httpcore errors as the httpx errors of the same name, as httpx does."""
+    try:
+        yield
+    except HTTPCORE_ERRORS as e:
+        error = getattr(httpx, type(e).__name__, httpx.TransportError)
+        raise error(str(e), request=request) from e
+
+
+class TracedStream(httpx.AsyncByteStream):
+    """Counts the bytes of a response body and ends its spans when it is closed."""
+
+    def __init__(
+        self,
+        stream: Any,
+        request: httpx.Request,
+        tracer: Tracer,
+        span: Span,
+        phases: dict[str, Span],
+    ) -> None:
+        self._stream = stream
+        self._request = request
+        self._tracer = tracer
+        self._span = span
+        self._phases = phases
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with httpx_errors(self._request):
+            async for chunk in self._stream:
+                self._span.attributes["response_bytes"] += len(chunk)
+                yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            with httpx_errors(self._request):
+                await self._stream.aclose()
+        finally:
+            # A stream closed before its end, like an SSE stream, leaves "receive" open.
+            for phase in list(self._phases.values()):
+                self._tracer.finish(phase)
+            self._tracer.finish(self._span)
+
+
+class TracingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Times the DNS lookup and the TCP connect of new connections separately."""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, tracer: Tracer) -> None:
+        self._backend = backend
+        self._tracer = tracer
+
+    async def connect_tcp(
+        self, host: str, port: int, **kwargs: Any
+    ) -> httpcore.AsyncNetworkStream:
+        # The request span is current in the task that opens the connection.
+        request_span = _current_span.get()
+        span = self._tracer.start("dns", parent=request_span, host=host)
+        try:
+            addresses = await anyio.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except BaseException as e:
+            self._tracer.finish(span, e)
+            raise
+        address = span.attributes["address"] = addresses[0][4][0]
+        self._tracer.finish(span)
+        # TLS still verifies and sends the host name, which httpcore passes separately.
+        span = self._tracer.start("connect", parent=request_span, address=address)
+        try:
+            return await self._backend.connect_tcp(address, port, **kwargs)
+        except BaseException as e:
+            self._tracer.finish(span, e)
+            raise
+        finally:
+            self._tracer.finish(span)
+
+    async def connect_unix_socket(
+        self, path: str, **kwargs: Any
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, **kwargs)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Records a span per HTTP request with its phases and payload sizes.
+
+    Each request carries a `traceparent` header naming its span, so the server's spans
+    join the client trace.
+
+    httpx has no option for the network backend of its connection pool, so requests
+    are sent over an httpcore pool of our own, with the limits httpx uses by default.
+    """
+
+    def __init__(self, tracer: Tracer) -> None:
+        self._tracer = tracer
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=5.0,
+            network_backend=TracingNetworkBackend(httpcore.AnyIOBackend(), tracer),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        label = rpc_label(request)
+        span = self._tracer.start(
+            f"{request.method} {label}".strip(),
+            host=request.url.host,
+            request_bytes=len(request.content),
+            response_bytes=0,
+        )
+        request.headers["traceparent"] = self._tracer.traceparent(span)
+        phases: dict[str, Span] = {}
+
+        async def trace(event: str, info: dict) -> None:
+            _, _, event = event.partition(".")
+            phase, _, stage = event.rpartition(".")
+            if phase not in HTTP_PHASES:
+                return
+            if stage == "started":
+                phases[phase] = self._tracer.start(HTTP_PHASES[phase], parent=span)
+            elif phase in phases:
+                self._tracer.finish(phases.pop(phase), info.get("exception"))
+
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions={**request.extensions, "trace": trace},
+        )
+        token = _current_span.set(span)
+        try:
+            with httpx_errors(request):
+                response = await self._pool.handle_async_request(core_request)
+        except BaseException as e:
+            for phase in phases.values():
+                self._tracer.finish(phase, e)
+            self._tracer.finish(span, e)
+            raise
+        finally:
+            _current_span.reset(token)
+        span.attributes["status"] = response.status
+        return httpx.Response(
+            response.status,
+            headers=response.headers,
+            stream=TracedStream(response.stream, request, self._tracer, span, phases),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class TracedAuth(httpx.Auth):
+    """Times an httpx.Auth, such as getting a Cognito token, as "auth" spans."""
+
+    def __init__(self, tracer: Tracer, auth: httpx.Auth) -> None:
+        self._tracer = tracer
+        self._auth = auth
+        self.requires_request_body = auth.requires_request_body
+        self.requires_response_body = auth.requires_response_body
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        flow = self._auth.async_auth_flow(request)
+        request = await self._step(flow.__anext__())
+        while True:
+            response = yield request
+            try:
+                # Only traced when the flow sends the request again, e.g. after a 401.
+                request = await self._step(
+                    flow.asend(response), status=response.status_code
+                )
+            except StopAsyncIteration:
+                return
+
+    async def _step(
+        self, step: Awaitable[httpx.Request], **attributes: Any
+    ) -> httpx.Request:
+        span = self._tracer.start("auth", **attributes)
+        try:
+            return await step
+        except StopAsyncIteration:
+            self._tracer.discard(span)
+            raise
+        except BaseException as e:
+            self._tracer.finish(span, e)
+            raise
+        finally:
+            self._tracer.finish(span)
+
+
+class AgentTracer:
+    """Strands hook provider that records agent invocations, model turns and tool calls.
+
+    Pass it to `Agent(hooks=[...])`. Tool calls made by the agent through `MCPClient`
+    nest their HTTP requests under the tool span.
+    """
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+        self._invocation: Span | None = None
+        self._turn: Span | None = None
+        self._turns = 0
+        self._tools: dict[str, Span] = {}
+
+    def register_hooks(self, registry: Any, **kwargs: Any) -> None:
+        from strands.hooks import AfterInvocationEvent, BeforeInvocationEvent
+
+        try:
+            from strands.hooks import (
+                AfterModelInvocationEvent,
+                AfterToolInvocationEvent,
+                BeforeModelInvocationEvent,
+                BeforeToolInvocationEvent,
+            )
+        except ImportError:
+            # Experimental in strands-agents 1.0.
+            from strands.experimental.hooks import (
+                AfterModelInvocationEvent,
+                AfterToolInvocationEvent,
+                BeforeModelInvocationEvent,
+                BeforeToolInvocationEvent,
+            )
+
+        registry.add_callback(BeforeInvocationEvent, self._before_invocation)
+        registry.add_callback(AfterInvocationEvent, self._after_invocation)
+        registry.add_callback(BeforeModelInvocationEvent, self._before_model)
+        registry.add_callback(AfterModelInvocationEvent, self._after_model)
+        registry.add_callback(BeforeToolInvocationEvent, self._before_tool)
+        registry.add_callback(AfterToolInvocationEvent, self._after_tool)
+
+    def _before_invocation(self, event: Any) -> None:
+        self._turns = 0
+        self._invocation = self.tracer.start("agent", scope=True)
+
+    def _after_invocation(self, event: Any) -> None:
+        if self._invocation is not None:
+            self._invocation.attributes["turns"] = self._turns
+            self.tracer.finish(self._invocation)
+
+    def _before_model(self, event: Any) -> None:
+        self._turns += 1
+        self._turn = self.tracer.start(
+            f"llm turn {self._turns}", parent=self._invocation, scope=True
+        )
+
+    def _after_model(self, event: Any) -> None:
+        if self._turn is None:
+            return
+        if event.stop_response is not None:
+            self._turn.attributes["stop_reason"] = event.stop_response.stop_reason
+        self.tracer.finish(self._turn, event.exception)
+
+    def _before_tool(self, event: Any) -> None:
+        self._tools[event.tool_use["toolUseId"]] = self.tracer.start(
+            f"tool {event.tool_use['name']}", parent=self._invocation, scope=True
+        )
+
+    def _after_tool(self, event: Any) -> None:
+        span = self._tools.pop(event.tool_use["toolUseId"], None)
+        if span is None:
+            return
+        span.attributes["status"] = event.result.get("status")
+        span.attributes["result_bytes"] = len(json.dumps(event.result, default=str))
+        self.tracer.finish(span, event.exception)
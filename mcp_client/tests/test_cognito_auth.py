@@ -0,0 +1,194 @@
+import stat
+import threading
+from http.server import ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from cognito_auth import CognitoAuth, CognitoTokenProvider
+from fake_cognito import create_handler
+
+EXPIRES_IN = 3600
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def aws_credentials(monkeypatch):
+    # Unsigned requests still need a region and must not pick up a real profile.
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+
+@pytest.fixture(scope="module")
+def cognito_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(EXPIRES_IN))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def calls(cognito_url):
+    """Return the number of Cognito calls per flow made during the test."""
+    before = httpx.get(cognito_url).json()
+
+    def count() -> dict[str, int]:
+        after = httpx.get(cognito_url).json()
+        return {flow: after[flow] - before[flow] for flow in after}
+
+    return count
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def make_provider(cognito_url, tmp_path, clock):
+    def make(password: str | None = "MyPassword123!") -> CognitoTokenProvider:
+        return CognitoTokenProvider(
+            "client-id",
+            "testuser",
+            password,
+            cache_dir=tmp_path,
+            endpoint_url=cognito_url,
+            clock=clock,
+        )
+
+    return make
+
+
+def test_signs_in_once_and_caches_tokens_on_disk(make_provider, calls):
+    provider = make_provider()
+    token = provider.token()
+
+    assert provider.token() == token
+    assert calls() == {"USER_PASSWORD_AUTH": 1, "REFRESH_TOKEN_AUTH": 0}
+    assert stat.S_IMODE(provider.cache_path.stat().st_mode) == 0o600
+    assert make_provider(password=None).token() == token
+    assert calls()["USER_PASSWORD_AUTH"] == 1
+
+
+def test_refreshes_in_background_before_expiry(make_provider, calls, clock):
+    provider = make_provider()
+    token = provider.token()
+    clock.advance(EXPIRES_IN - 200)
+
+    assert provider.token() == token
+    provider._background.join()
+    assert provider.token() != token
+    assert calls() == {"USER_PASSWORD_AUTH": 1, "REFRESH_TOKEN_AUTH": 1}
+
+
+def test_refreshes_in_foreground_when_nearly_expired(make_provider, calls, clock):
+    provider = make_provider()
+    token = provider.token()
+    clock.advance(EXPIRES_IN - 30)
+
+    assert provider.token() != token
+    assert calls() == {"USER_PASSWORD_AUTH": 1, "REFRESH_TOKEN_AUTH": 1}
+
+
+def test_concurrent_refreshes_share_one_call(make_provider, calls, clock):
+    provider = make_provider()
+    provider.token()
+    clock.advance(EXPIRES_IN)
+    tokens = []
+    threads = [
+        threading.Thread(target=lambda: tokens.append(provider.token()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(tokens)) == 1
+    assert calls()["REFRESH_TOKEN_AUTH"] == 1
+
+
+async def test_atoken_refreshes_without_blocking(make_provider, calls, clock):
+    provider = make_provider()
+    token = await provider.atoken()
+    clock.advance(EXPIRES_IN)
+
+    assert await provider.atoken() != token
+    assert calls() == {"USER_PASSWORD_AUTH": 1, "REFRESH_TOKEN_AUTH": 1}
+
+
+def test_invalid_refresh_token_falls_back_to_password(make_provider, calls, clock):
+    provider = make_provider()
+    provider._tokens = {"access_token": "old", "expires_at": 0, "refresh_token": "bad"}
+
+    assert provider.token() != "old"
+    assert calls() == {"USER_PASSWORD_AUTH": 1, "REFRESH_TOKEN_AUTH": 0}
+
+
+def test_invalid_refresh_token_without_password_raises(make_provider):
+    provider = make_provider(password=None)
+    provider._tokens = {"access_token": "old", "expires_at": 0, "refresh_token": "bad"}
+
+    with pytest.raises(provider._client.exceptions.NotAuthorizedException):
+        provider.token()
+
+
+def test_no_refresh_token_and_no_password_raises(make_provider):
+    with pytest.raises(RuntimeError, match="no password is configured"):
+        make_provider(password=None).token()
+
+
+def test_invalidate_only_renews_the_current_token(make_provider, calls):
+    provider = make_provider()
+    token = provider.token()
+
+    provider.invalidate("a token that was already replaced")
+    assert provider.token() == token
+    provider.invalidate(token)
+    assert provider.token() != token
+    assert calls()["REFRESH_TOKEN_AUTH"] == 1
+
+
+def rejecting_first_token(provider: CognitoTokenProvider):
+    rejected = provider.token()
+    seen = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["Authorization"])
+        status = (
+            401 if request.headers["Authorization"] == f"Bearer {rejected}" else 200
+        )
+        return httpx.Response(status)
+
+    return httpx.MockTransport(handle), seen
+
+
+def test_auth_retries_once_with_a_new_token_on_401(make_provider):
+    provider = make_provider()
+    transport, seen = rejecting_first_token(provider)
+
+    with httpx.Client(auth=CognitoAuth(provider), transport=transport) as client:
+        assert client.get("https://mcp.test/mcp").status_code == 200
+    assert len(seen) == 2 and seen[0] != seen[1]
+
+
+async def test_async_auth_retries_once_with_a_new_token_on_401(make_provider):
+    provider = make_provider()
+    transport, seen = rejecting_first_token(provider)
+
+    async with httpx.AsyncClient(
+        auth=CognitoAuth(provider), transport=transport
+    ) as client:
+        assert (await client.get("https://mcp.test/mcp")).status_code == 200
+    assert len(seen) == 2 and seen[0] != seen[1]
@@ -0,0 +1,222 @@
+import asyncio
+import contextlib
+import json
+
+import httpx
+import pytest
+from mcp.types import CallToolResult, TextContent, Tool
+
+import endpoint_router
+from endpoint_router import PING, EndpointRouter, rejection
+
+URLS = ["https://tokyo.example.com/mcp", "https://oregon.example.com/mcp"]
+TOOL = "openai_o3_web_search"
+
+
+def text_result(text: str, is_error: bool = False) -> CallToolResult:
+    return CallToolResult(
+        content=[TextContent(type="text", text=text)], isError=is_error
+    )
+
+
+def rejected(reason: str) -> CallToolResult:
+    payload = json.dumps({"error": reason, "retry_after": 30})
+    return text_result(f"Error executing tool {TOOL}: {payload}", is_error=True)
+
+
+class FakePool:
+    """A session pool of one endpoint answering `results` in turn, then its URL."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.results: list[CallToolResult | Exception] = []
+        self.reachable = True
+        self.release = asyncio.Event()
+        self.release.set()
+        self.calls = 0
+        self.cancelled = 0
+        self.closed = False
+        self.saturated = False
+
+    async def start(self) -> None:
+        await self.send_ping()
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        yield self
+
+    async def send_ping(self) -> None:
+        if not self.reachable:
+            raise httpx.ConnectError("connection refused")
+
+    async def call_tool(self, name, arguments=None, read_timeout_seconds=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.results:
+            result = self.results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return text_result(self.url)
+
+    async def list_tools(self) -> list[Tool]:
+        await self.send_ping()
+        return [Tool(name=TOOL, inputSchema={"type": "object"})]
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def pools(monkeypatch) -> dict[str, FakePool]:
+    pools = {url: FakePool(url) for url in URLS}
+    monkeypatch.setattr(
+        endpoint_router, "SessionPool", lambda url, headers, auth, **kwargs: pools[url]
+    )
+    return pools
+
+
+@pytest.fixture
+def router(pools) -> EndpointRouter:
+    # Without statistics, endpoints are tried in the given order.
+    return EndpointRouter(URLS, min_samples=3, explore=0)
+
+
+def urls(router: EndpointRouter, tool: str = TOOL) -> list[str]:
+    return [endpoint.url for endpoint in router.rank(tool)]
+
+
+def record(router: EndpointRouter, url: str, key: str, *latencies: float) -> None:
+    endpoint = next(endpoint for endpoint in router.endpoints if endpoint.url == url)
+    for latency in latencies:
+        endpoint.record(key, latency, True)
+
+
+@pytest.mark.parametrize(
+    ("result", "reason"),
+    [
+        (rejected("overloaded"), "overloaded"),
+        (rejected("quota_exceeded"), "quota_exceeded"),
+        (rejected("invalid_question"), None),
+        (text_result('{"error": "overloaded"}'), None),
+        (text_result("Error executing tool: timed out {", is_error=True), None),
+    ],
+)
+def test_rejection(result, reason):
+    assert rejection(result) == reason
+
+
+def test_ranks_by_tool_latency(router):
+    record(router, URLS[0], TOOL, 9, 10, 11)
+    record(router, URLS[1], TOOL, 4, 5, 6)
+
+    assert urls(router) == [URLS[1], URLS[0]]
+    assert router.estimate(router.endpoints[1], TOOL) == 5
+
+
+def test_estimates_unmeasured_tool_from_ping(router):
+    # Tokyo: 1 s ping, 10 s calls, so the server takes 9 s; Oregon pings in 0.1 s.
+    record(router, URLS[0], PING, 1)
+    record(router, URLS[0], TOOL, 10, 10, 10)
+    record(router, URLS[1], PING, 0.1)
+
+    assert router.estimate(router.endpoints[1], TOOL) == pytest.approx(9.1)
+    assert urls(router) == [URLS[1], URLS[0]]
+    assert urls(router, "other_tool") == [URLS[1], URLS[0]]
+
+
+async def test_fails_over_and_demotes_failing_endpoint(router, pools):
+    pools[URLS[0]].results = [httpx.ConnectError("connection refused")] * 3
+
+    results = [(await router.call_tool(TOOL)).content[0].text for _ in range(4)]
+
+    assert results == [URLS[1]] * 4
+    assert pools[URLS[0]].calls == 3
+    assert urls(router) == [URLS[1], URLS[0]]
+    assert router.snapshot()[URLS[0]]["healthy"] is False
+
+
+async def test_raises_last_error_when_every_endpoint_fails(router, pools):
+    pools[URLS[0]].results = [httpx.ConnectError("tokyo")]
+    pools[URLS[1]].results = [httpx.ConnectError("oregon")]
+
+    with pytest.raises(httpx.ConnectError, match="oregon"):
+        await router.call_tool(TOOL)
+
+
+async def test_overloaded_endpoint_fails_over(router, pools):
+    pools[URLS[0]].results = [rejected("overloaded")]
+
+    result = await router.call_tool(TOOL)
+
+    assert result.content[0].text == URLS[1]
+    assert router.snapshot()[URLS[0]]["error_rate"] == 1
+
+
+async def test_returns_rejection_when_every_endpoint_turns_call_away(router, pools):
+    pools[URLS[0]].results = [rejected("overloaded")]
+    pools[URLS[1]].results = [rejected("quota_exceeded")]
+
+    result = await router.call_tool(TOOL)
+
+    assert result.isError
+    assert rejection(result) == "quota_exceeded"
+
+
+async def test_without_failover_only_best_endpoint_is_called(pools):
+    router = EndpointRouter(URLS, failover=False, explore=0)
+    pools[URLS[0]].results = [rejected("overloaded")]
+
+    result = await router.call_tool(TOOL)
+
+    assert rejection(result) == "overloaded"
+    assert pools[URLS[1]].calls == 0
+
+
+async def test_race_cancels_the_loser(router, pools):
+    pools[URLS[0]].release.clear()
+
+    result = await router.call_tool(TOOL, race=2)
+
+    assert result.content[0].text == URLS[1]
+    assert (pools[URLS[0]].calls, pools[URLS[0]].cancelled) == (1, 1)
+    snapshot = router.snapshot()
+    assert (snapshot[URLS[0]]["wins"], snapshot[URLS[1]]["wins"]) == (0, 1)
+    # The loser was cancelled, not failed.
+    assert snapshot[URLS[0]]["error_rate"] == 0
+    assert TOOL not in snapshot[URLS[0]]["p50"]
+
+
+async def test_race_waits_for_the_other_endpoint_after_a_failure(router, pools):
+    pools[URLS[0]].results = [httpx.ConnectError("connection refused")]
+
+    result = await router.call_tool(TOOL, race=2)
+
+    assert result.content[0].text == URLS[1]
+
+
+async def test_start_demotes_unreachable_endpoints(router, pools):
+    pools[URLS[0]].reachable = False
+
+    async with router:
+        assert [endpoint.started for endpoint in router.endpoints] == [False, True]
+        assert urls(router, PING)[0] == URLS[1]
+        assert await router.list_tools()
+    assert all(pool.closed for pool in pools.values())
+
+
+async def test_start_fails_when_no_endpoint_is_reachable(router, pools):
+    for pool in pools.values():
+        pool.reachable = False
+
+    with pytest.raises(ConnectionError):
+        await router.start()
+
+
+def test_requires_an_endpoint():
+    with pytest.raises(ValueError):
+        EndpointRouter([])
@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+
+import httpx
+import pytest
+from mcp import McpError
+from mcp.types import (
+    CONNECTION_CLOSED,
+    INVALID_PARAMS,
+    CallToolResult,
+    ErrorData,
+    Implementation,
+    InitializeResult,
+    ListToolsResult,
+    ServerCapabilities,
+    ServerNotification,
+    TextContent,
+    Tool,
+    ToolListChangedNotification,
+)
+
+import session_pool
+from session_pool import (
+    SESSION_TERMINATED,
+    SessionClosedError,
+    SessionPool,
+    SyncSessionPool,
+)
+from tool_cache import ToolCache, tools_version
+
+URL = "https://mcp.example.com/mcp"
+TOOLS = [Tool(name="web_search", inputSchema={"type": "object"})]
+
+
+def mcp_error(code: int) -> McpError:
+    return McpError(ErrorData(code=code, message=f"error {code}"))
+
+
+class FakeSession:
+    """An initialized MCP session answering from a `FakeServer`."""
+
+    def __init__(self, server: "FakeServer", message_handler) -> None:
+        self.server = server
+        self.message_handler = message_handler
+        self.number = len(server.sessions)
+        self.closed = False
+        self.task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "FakeSession":
+        # The pool enters the session in the task that owns its connection.
+        self.task = asyncio.current_task()
+        self.server.sessions.append(self)
+        return self
+
+    def drop(self) -> None:
+        """Lose the connection, as when the transport fails."""
+        self.task.cancel()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.closed = True
+
+    async def initialize(self) -> InitializeResult:
+        return InitializeResult(
+            protocolVersion="2025-06-18",
+            capabilities=ServerCapabilities(),
+            serverInfo=Implementation(name="fake", version=self.server.version),
+        )
+
+    async def list_tools(self) -> ListToolsResult:
+        self.server.list_calls += 1
+        return ListToolsResult(tools=self.server.tools)
+
+    async def send_ping(self) -> None:
+        if self.server.ping_error is not None:
+            raise self.server.ping_error
+
+    async def call_tool(self, name, arguments=None, read_timeout_seconds=None):
+        if self.server.errors:
+            raise self.server.errors.pop(0)
+        await self.server.hold.wait()
+        return CallToolResult(
+            content=[TextContent(type="text", text=f"{name} on {self.number}")]
+        )
+
+
+class FakeServer:
+    def __init__(self) -> None:
+        self.tools = TOOLS
+        self.version = tools_version(TOOLS)
+        self.sessions: list[FakeSession] = []
+        self.errors: list[Exception] = []
+        self.ping_error: Exception | None = None
+        self.list_calls = 0
+        self.hold = asyncio.Event()
+        self.hold.set()
+
+    @property
+    def open_sessions(self) -> list[int]:
+        return [session.number for session in self.sessions if not session.closed]
+
+
+@pytest.fixture
+def server(monkeypatch) -> FakeServer:
+    server = FakeServer()
+
+    @contextlib.asynccontextmanager
+    async def transport(*args, **kwargs):
+        try:
+            yield None, None, None
+        except asyncio.CancelledError:
+            # Like streamablehttp_client, whose task group cancels the session and
+            # raises the error of the failed connection.
+            raise httpx.RemoteProtocolError("connection lost") from None
+
+    monkeypatch.setattr(session_pool, "streamablehttp_client", transport)
+    monkeypatch.setattr(
+        session_pool,
+        "ClientSession",
+        lambda read, write, message_handler: FakeSession(server, message_handler),
+    )
+    return server
+
+
+async def settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def call(pool: SessionPool) -> str:
+    result = await pool.call_tool("web_search", {"question": "MCP"})
+    return result.content[0].text
+
+
+async def test_reuses_sessions(server):
+    async with SessionPool(URL, min_size=2) as pool:
+        results = [await call(pool), await call(pool)]
+
+        assert results == ["web_search on 1", "web_search on 1"]
+        assert server.open_sessions == [0, 1]
+        # Only the first session lists the tools; the second sees the same version.
+        assert await pool.list_tools() == TOOLS
+        assert server.list_calls == 1
+    assert server.open_sessions == []
+
+
+async def test_limits_sessions_in_use(server):
+    server.hold.clear()
+    async with SessionPool(URL, min_size=1, max_size=2) as pool:
+        calls = [asyncio.create_task(call(pool)) for _ in range(3)]
+        await settle()
+
+        assert pool.saturated
+        assert len(server.sessions) == 2
+        server.hold.set()
+        await asyncio.gather(*calls)
+    assert len(server.sessions) == 2
+
+
+async def test_keeps_session_after_ordinary_mcp_error(server):
+    server.errors = [mcp_error(INVALID_PARAMS)]
+    async with SessionPool(URL) as pool:
+        with pytest.raises(McpError):
+            await call(pool)
+
+        assert await call(pool) == "web_search on 0"
+        assert server.open_sessions == [0]
+
+
+async def test_retries_once_when_server_session_expired(server):
+    server.errors = [mcp_error(SESSION_TERMINATED)]
+    async with SessionPool(URL) as pool:
+        assert await call(pool) == "web_search on 1"
+        assert server.open_sessions == [1]
+
+        server.errors = [mcp_error(SESSION_TERMINATED)] * 2
+        with pytest.raises(McpError):
+            await call(pool)
+        assert server.open_sessions == []
+
+
+@pytest.mark.parametrize(
+    "error",
+    [mcp_error(CONNECTION_CLOSED), httpx.ReadError("connection reset")],
+)
+async def test_replaces_broken_session_without_retrying(server, error):
+    server.errors = [error]
+    async with SessionPool(URL) as pool:
+        with pytest.raises(type(error)):
+            await call(pool)
+
+        assert server.open_sessions == []
+        assert await call(pool) == "web_search on 1"
+
+
+async def test_retries_when_connecting_failed(server):
+    server.errors = [httpx.ConnectError("connection refused")]
+    async with SessionPool(URL) as pool:
+        assert await call(pool) == "web_search on 1"
+
+
+async def test_replaces_idle_session_that_does_not_answer_ping(server):
+    async with SessionPool(URL, health_check_interval=-1) as pool:
+        assert await call(pool) == "web_search on 0"
+        server.ping_error = mcp_error(CONNECTION_CLOSED)
+
+        assert await call(pool) == "web_search on 1"
+        assert server.open_sessions == [1]
+
+
+async def test_raises_when_connection_is_lost_during_call(server):
+    server.hold.clear()
+    async with SessionPool(URL) as pool:
+        task = asyncio.create_task(call(pool))
+        await settle()
+        server.sessions[0].drop()
+
+        with pytest.raises(SessionClosedError):
+            await task
+        server.hold.set()
+        assert await call(pool) == "web_search on 1"
+
+
+async def test_skips_list_tools_when_cached_version_matches(server, tmp_path):
+    cache = ToolCache(tmp_path / "tools.json")
+    cache.put(URL, "arn", server.version, TOOLS)
+
+    async with SessionPool(URL, tool_cache=cache, agent_arn="arn") as pool:
+        assert await pool.list_tools() == TOOLS
+    assert server.list_calls == 0
+
+    server.tools = [*TOOLS, Tool(name="get_job", inputSchema={"type": "object"})]
+    server.version = tools_version(server.tools)
+    async with SessionPool(URL, tool_cache=cache, agent_arn="arn") as pool:
+        assert await pool.list_tools() == server.tools
+    assert server.list_calls == 1
+    assert cache.get(URL, "arn").version == server.version
+
+
+async def test_tool_list_changed_notification_invalidates_tools(server, tmp_path):
+    cache = ToolCache(tmp_path / "tools.json")
+    async with SessionPool(URL, tool_cache=cache) as pool:
+        assert server.list_calls == 1
+        server.tools = [Tool(name="get_job", inputSchema={"type": "object"})]
+        await server.sessions[0].message_handler(
+            ServerNotification(
+                ToolListChangedNotification(method="notifications/tools/list_changed")
+            )
+        )
+
+        assert cache.get(URL) is None
+        assert await pool.list_tools() == server.tools
+        assert cache.get(URL).version == tools_version(server.tools)
+
+
+def test_sync_pool(server):
+    with SyncSessionPool(URL, min_size=1) as pool:
+        results = [pool.call_tool("web_search").content[0].text for _ in range(2)]
+
+        assert results == ["web_search on 0", "web_search on 0"]
+        assert pool.list_tools() == TOOLS
+    assert server.open_sessions == []
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from mcp.types import CallToolResult, LoggingMessageNotificationParams, TextContent
+
+from streaming import OUTPUT_TEXT_LOGGER, StreamRenderer, call_tool_streaming
+
+ANSWER = "MCP is a protocol. It connects tools to models."
+
+
+class FakeSession:
+    """Streams `chunks` as output text log notifications, then returns `content`."""
+
+    def __init__(self, renderer: StreamRenderer, chunks: list[str], content: list[str]):
+        self.renderer = renderer
+        self.chunks = chunks
+        self.content = content
+
+    async def call_tool(self, name, arguments, read_timeout_seconds, progress_callback):
+        await progress_callback(1, None, "Searching the web")
+        for chunk in self.chunks:
+            await self.renderer.on_log(
+                LoggingMessageNotificationParams(
+                    level="info", logger=OUTPUT_TEXT_LOGGER, data=chunk
+                )
+            )
+        return CallToolResult(
+            content=[TextContent(type="text", text=text) for text in self.content]
+        )
+
+
+@pytest.mark.parametrize(
+    ("chunks", "content", "printed"),
+    [
+        # Streamed in full: only the notes after the answer are printed again.
+        (
+            ["MCP is a protocol. ", "It connects tools to models."],
+            [ANSWER, "thread_id: abc"],
+            f"{ANSWER}\nthread_id: abc\n\n",
+        ),
+        # Joined a shared search late: the full answer follows the streamed rest.
+        (
+            ["It connects tools to models."],
+            [ANSWER],
+            f"It connects tools to models.\n{ANSWER}\n\n",
+        ),
+        # A shaped result differs from the raw text and is printed.
+        (
+            [ANSWER],
+            ['{"answer":"MCP is a protocol.","confidence":0.3}'],
+            f'{ANSWER}\n{{"answer":"MCP is a protocol.","confidence":0.3}}\n\n',
+        ),
+        # Nothing streamed, e.g. a cached answer.
+        ([], [ANSWER], f"{ANSWER}\n\n"),
+    ],
+)
+async def test_final_result_is_printed_unless_streamed_in_full(
+    chunks, content, printed
+):
+    out, err = io.StringIO(), io.StringIO()
+    renderer = StreamRenderer(out, err)
+
+    await call_tool_streaming(
+        FakeSession(renderer, chunks, content), renderer, "search", {}
+    )
+
+    assert out.getvalue() == printed
+    assert "Searching the web" in err.getvalue()
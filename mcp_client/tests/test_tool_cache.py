@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from mcp.types import Tool, ToolAnnotations
+
+from tool_cache import ToolCache, tools_version
+
+URL = "https://mcp.example.com/mcp"
+SEARCH = Tool(
+    name="web_search",
+    description="Search the web.",
+    inputSchema={"type": "object", "properties": {"question": {"type": "string"}}},
+    annotations=ToolAnnotations(readOnlyHint=True),
+)
+GET_JOB = Tool(name="get_job", inputSchema={"type": "object"})
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "cache" / "tools.json"
+
+
+def test_key_separates_agents_and_endpoints(path):
+    cache = ToolCache(path)
+    cache.put(URL, "arn-a", "v1", [SEARCH])
+    cache.put(URL, None, "v2", [GET_JOB])
+
+    assert ToolCache.key(URL, "arn-a") != ToolCache.key(URL)
+    assert cache.get(URL, "arn-a").tools == [SEARCH]
+    assert cache.get(URL).tools == [GET_JOB]
+    assert cache.get(URL, "arn-b") is None
+    assert cache.get("https://other.example.com/mcp", "arn-a") is None
+
+
+def test_round_trips_through_disk(path):
+    ToolCache(path).put(URL, "arn", "v1", [SEARCH, GET_JOB])
+
+    cached = ToolCache(path).get(URL, "arn")
+
+    assert cached.version == "v1"
+    assert cached.tools == [SEARCH, GET_JOB]
+    assert cached.fetched_at > 0
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_invalidate_removes_entry_on_disk(path):
+    cache = ToolCache(path)
+    cache.put(URL, "arn", "v1", [SEARCH])
+    cache.put(URL, None, "v1", [SEARCH])
+
+    cache.invalidate(URL, "arn")
+    cache.invalidate(URL, "unknown")
+
+    assert cache.get(URL, "arn") is None
+    assert ToolCache(path).get(URL, "arn") is None
+    assert ToolCache(path).get(URL) is not None
+
+
+@pytest.mark.parametrize("content", ["", "not json", json.dumps({})])
+def test_unreadable_or_empty_file_is_an_empty_cache(path, content):
+    path.parent.mkdir()
+    path.write_text(content)
+
+    assert ToolCache(path).get(URL) is None
+
+
+def test_invalid_entry_is_a_miss(path):
+    path.parent.mkdir()
+    entry = {"version": "v1", "fetched_at": 0, "tools": [{"name": "web_search"}]}
+    path.write_text(json.dumps({ToolCache.key(URL): entry}))
+
+    assert ToolCache(path).get(URL) is None
+
+
+def test_path_from_environment(path, monkeypatch):
+    monkeypatch.setenv("MCP_TOOL_CACHE_PATH", str(path))
+    ToolCache().put(URL, None, "v1", [SEARCH])
+
+    assert ToolCache(path).get(URL).version == "v1"
+
+
+def test_version_ignores_order_and_changes_with_definitions():
+    version = tools_version([SEARCH, GET_JOB])
+
+    assert len(version) == 16
+    assert tools_version([GET_JOB, SEARCH]) == version
+    assert tools_version([SEARCH]) != version
+    described = GET_JOB.model_copy(update={"description": "Get a job."})
+    assert tools_version([SEARCH, described]) != version
+
+
+def test_version_survives_json_round_trip():
+    tools = [
+        Tool.model_validate(json.loads(tool.model_dump_json()))
+        for tool in [SEARCH, GET_JOB]
+    ]
+
+    assert tools_version(tools) == tools_version([SEARCH, GET_JOB])
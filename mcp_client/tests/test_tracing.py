@@ -0,0 +1,219 @@
+import json
+import re
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from tracing import TracedAuth, Tracer, TracingTransport, rpc_label
+
+TRACEPARENT = re.compile(r"00-[0-9a-f]{32}-[0-9a-f]{16}-01")
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Answers with the traceparent header the request carried."""
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"traceparent": self.headers["traceparent"]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # By host name, so that the request resolves it.
+    yield f"http://localhost:{server.server_port}/mcp"
+    server.shutdown()
+
+
+def spans(tracer: Tracer) -> dict[str, dict]:
+    """Spans by name, with their parent's name."""
+    by_id = {span.span_id: span for span in tracer.spans}
+    return {
+        span.name: {
+            "parent": by_id[span.parent_id].name if span.parent_id else None,
+            **span.attributes,
+        }
+        for span in tracer.spans
+    }
+
+
+def post(messages) -> httpx.Request:
+    return httpx.Request("POST", "https://mcp.example.com/mcp", json=messages)
+
+
+@pytest.mark.parametrize(
+    ("request_", "label"),
+    [
+        (post({"jsonrpc": "2.0", "id": 1, "method": "initialize"}), "initialize"),
+        (
+            post(
+                {
+                    "jsonrpc": "2.0",
+                    "id": 2,
+                    "method": "tools/call",
+                    "params": {"name": "openai_o3_web_search"},
+                }
+            ),
+            "tools/call openai_o3_web_search",
+        ),
+        (
+            post(
+                [
+                    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                    {"jsonrpc": "2.0", "id": 3, "result": {}},
+                ]
+            ),
+            "notifications/initialized, response",
+        ),
+        (httpx.Request("GET", "https://mcp.example.com/mcp"), "stream"),
+        (httpx.Request("DELETE", "https://mcp.example.com/mcp"), "terminate"),
+        (httpx.Request("POST", "https://mcp.example.com/mcp", content=b"{"), ""),
+    ],
+)
+def test_rpc_label(request_, label):
+    assert rpc_label(request_) == label
+
+
+def test_spans_nest_under_current_span():
+    tracer = Tracer()
+    with tracer.span("run") as run:
+        with tracer.span("connect", endpoint="tokyo"):
+            pass
+        call = tracer.start("tool")
+        tracer.finish(call, TimeoutError())
+
+    assert spans(tracer) == {
+        "run": {"parent": None},
+        "connect": {"parent": "run", "endpoint": "tokyo"},
+        "tool": {"parent": "run", "error": "TimeoutError"},
+    }
+    assert run.end is not None and run.duration >= call.duration
+
+
+def test_other_threads_nest_under_innermost_scope():
+    tracer = Tracer()
+    scope = tracer.start("invocation", scope=True)
+    thread = threading.Thread(target=lambda: tracer.finish(tracer.start("model")))
+    thread.start()
+    thread.join()
+    tracer.finish(scope)
+    tracer.finish(tracer.start("after"))
+
+    assert spans(tracer)["model"]["parent"] == "invocation"
+    assert spans(tracer)["after"]["parent"] is None
+
+
+def test_traceparent_format():
+    tracer = Tracer()
+    span = tracer.start("run")
+    traceparent = tracer.traceparent(span)
+
+    assert TRACEPARENT.fullmatch(traceparent)
+    assert traceparent.split("-")[1:3] == [tracer.trace_id, span.span_id]
+
+
+def test_writes_trace(tmp_path):
+    tracer = Tracer()
+    with tracer.span("run"):
+        pass
+    tracer.write(str(tmp_path / "trace.json"))
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert trace["trace_id"] == tracer.trace_id
+    assert [span["name"] for span in trace["spans"]] == ["run"]
+
+
+async def test_transport_records_phases_and_sends_traceparent(server_url):
+    tracer = Tracer()
+    message = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+    async with tracer.http_client_factory() as client:
+        with tracer.span("run"):
+            response = await client.post(server_url, json=message)
+            body = response.json()
+
+    recorded = spans(tracer)
+    request = next(span for span in tracer.spans if span.name == "POST tools/list")
+    assert body["traceparent"] == tracer.traceparent(request)
+    assert recorded["POST tools/list"] == {
+        "parent": "run",
+        "host": "localhost",
+        "request_bytes": len(json.dumps(message, separators=(",", ":"))),
+        "response_bytes": len(response.content),
+        "status": 200,
+    }
+    for phase in ["dns", "connect", "send headers", "send body", "wait", "receive"]:
+        assert recorded[phase]["parent"] == "POST tools/list", phase
+    assert recorded["dns"]["address"] in ("127.0.0.1", "::1")
+    assert all(span.end is not None for span in tracer.spans)
+
+
+async def test_transport_raises_httpx_errors():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    tracer = Tracer()
+    transport = TracingTransport(tracer)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get(f"http://127.0.0.1:{port}/mcp")
+
+    assert spans(tracer)["GET stream"]["error"] == "ConnectError"
+    assert spans(tracer)["connect"]["error"] == "ConnectError"
+
+
+class RefreshingAuth(httpx.Auth):
+    """Sends a stale token first and a fresh one after a 401."""
+
+    def auth_flow(self, request):
+        request.headers["authorization"] = "Bearer stale"
+        response = yield request
+        if response.status_code == 401:
+            request.headers["authorization"] = "Bearer fresh"
+            yield request
+
+
+async def test_traced_auth_times_each_step():
+    def handler(request: httpx.Request) -> httpx.Response:
+        fresh = request.headers["authorization"] == "Bearer fresh"
+        return httpx.Response(200 if fresh else 401)
+
+    tracer = Tracer()
+    auth = TracedAuth(tracer, RefreshingAuth())
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), auth=auth
+    ) as client:
+        with tracer.span("run"):
+            response = await client.get("https://mcp.example.com/mcp")
+
+    assert response.status_code == 200
+    assert [(span.name, span.attributes) for span in tracer.spans] == [
+        ("run", {}),
+        ("auth", {}),
+        ("auth", {"status": 401}),
+    ]
+    assert all(span.parent_id == tracer.spans[0].span_id for span in tracer.spans[1:])
+
+
+async def test_traced_auth_without_retry_records_one_span():
+    tracer = Tracer()
+    auth = TracedAuth(tracer, RefreshingAuth())
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200)), auth=auth
+    ) as client:
+        await client.get("https://mcp.example.com/mcp")
+
+    assert [span.name for span in tracer.spans] == ["auth"]
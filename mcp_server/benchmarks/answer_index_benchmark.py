@@ -0,0 +1,180 @@
+"""Measure lookup latency of the past-answer index at a realistic size.
+
+Fills a fresh SQLite index with synthetic Japanese answers that cite URLs, then runs
+lookups through AnswerIndex.search and reports latency percentiles, the insert rate
+and the database size. Question lookups rephrase a stored question and also report
+how often that answer is among the results.
+
+    uv run python -m benchmarks.answer_index_benchmark --answers 100000 --queries 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from src.answer_index import AnswerIndex
+from src.backends import BackendAnswer, Citation
+from src.router import LatencyStats
+
+TOPICS = [
+    "Python",
+    "Rust",
+    "TypeScript",
+    "Kubernetes",
+    "PostgreSQL",
+    "Bedrock",
+    "AgentCore",
+    "Lambda",
+    "DynamoDB",
+    "Terraform",
+    "React",
+    "FastAPI",
+    "OpenTelemetry",
+    "Redis",
+    "SQLite",
+    "Docker",
+    "GraphQL",
+    "WebAssembly",
+    "PyTorch",
+    "Transformer",
+]
+PHRASES = [
+    "の最新バージョン",
+    "のリリース日",
+    "の主な変更点",
+    "のパフォーマンス改善",
+    "の既知の不具合",
+    "の移行手順",
+    "のセキュリティ修正",
+    "の料金体系",
+    "の設定方法",
+    "のベストプラクティス",
+]
+KATAKANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+
+
+def feature_names(rng: random.Random, count: int = 2000) -> list[str]:
+    """Made-up product and feature names, the rarer words answers are found by."""
+    return [
+        "".join(rng.choice(KATAKANA) for _ in range(rng.randint(3, 6)))
+        for _ in range(count)
+    ]
+
+
+def synthetic_answer(
+    rng: random.Random, features: list[str], answer_chars: int
+) -> tuple[str, BackendAnswer]:
+    topic = rng.choice(TOPICS)
+    names = rng.sample(features, 5)
+    question = f"{topic}の{names[0]}{rng.choice(PHRASES)}は？"
+    sentences = []
+    while sum(map(len, sentences)) < answer_chars:
+        sentences.append(
+            f"{topic}の{rng.choice(names)}{rng.choice(PHRASES)}はバージョン"
+            f"{rng.randrange(100)}で{rng.choice(names)}に対応しました。"
+        )
+    citations = [
+        Citation(f"https://{topic.lower()}.example.com/docs/{name}")
+        for name in names[: rng.randint(1, 4)]
+    ]
+    return question, BackendAnswer("".join(sentences), citations=citations)
+
+
+def summarize(latencies: list[float]) -> dict:
+    stats = LatencyStats(len(latencies))
+    for latency in latencies:
+        stats.record(latency, True)
+    return {
+        f"p{round(q * 100)}_ms": round(stats.percentile(q) * 1000, 2)
+        for q in (0.5, 0.95, 0.99)
+    } | {"max_ms": round(max(latencies) * 1000, 2)}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--answers", type=int, default=100000)
+    parser.add_argument("--answer-chars", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=5, help="Results per lookup")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    features = feature_names(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "answers.db")
+        index = AnswerIndex(path)
+        now = time.time()
+        questions = []
+        started_at = time.perf_counter()
+        for start in range(0, args.answers, 1000):
+            rows = []
+            for i in range(start, min(start + 1000, args.answers)):
+                question, answer = synthetic_answer(rng, features, args.answer_chars)
+                rows.append(index.row(question, "openai:o3", answer, now - i))
+                if i % 100 == 0:
+                    questions.append(question)
+            index._add(rows)
+        insert_seconds = time.perf_counter() - started_at
+
+        queries = {
+            "keyword": lambda: (f"{rng.choice(TOPICS)} {rng.choice(features)}", None),
+            "question": lambda: (
+                (question := rng.choice(questions)).replace("は？", "を教えて"),
+                question,
+            ),
+            "generic": lambda: (f"{rng.choice(TOPICS)}{rng.choice(PHRASES)}", None),
+            "url": lambda: (f"{rng.choice(TOPICS).lower()}.example.com", None),
+        }
+        results = {}
+        for kind, make_query in queries.items():
+            latencies = []
+            matched = found = 0
+            for _ in range(args.queries):
+                query, expected = make_query()
+                query_started_at = time.perf_counter()
+                answers = await index.search(query, args.limit)
+                latencies.append(time.perf_counter() - query_started_at)
+                matched += bool(answers)
+                found += any(answer.question == expected for answer in answers)
+            results[kind] = summarize(latencies) | {
+                "matched": f"{matched}/{args.queries}"
+            }
+            if kind == "question":
+                results[kind]["found_asked"] = f"{found}/{args.queries}"
+
+        write_latencies = []
+        for _ in range(200):
+            question, answer = synthetic_answer(rng, features, args.answer_chars)
+            write_started_at = time.perf_counter()
+            await index.add(question, "openai:o3", answer)
+            write_latencies.append(time.perf_counter() - write_started_at)
+        await index.close()
+        size = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory)
+        )
+
+    print(
+        json.dumps(
+            {
+                "answers": args.answers,
+                "insert_rate_per_s": round(args.answers / insert_seconds),
+                "db_size_mb": round(size / 2**20, 1),
+                "lookups": results,
+                "single_insert": summarize(write_latencies),
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
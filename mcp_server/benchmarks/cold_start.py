@@ -0,0 +1,88 @@
+"""Measure the time from starting the server process to its first `initialize` response.
+
+uv run python -m benchmarks.cold_start --runs 5
+uv run python -m benchmarks.cold_start --runs 5 -- opentelemetry-instrument python -m src.serve
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from src.router import LatencyStats
+from src.startup import INITIALIZE_REQUEST
+
+
+async def time_to_initialize(command: list[str], port: int, timeout: float) -> float:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "benchmark"),
+        "FASTMCP_PORT": str(port),
+        "SERVER_WORKERS": os.getenv("SERVER_WORKERS", "1"),
+    }
+    started_at = time.perf_counter()
+    server = subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        async with httpx.AsyncClient() as client:
+            while time.perf_counter() - started_at < timeout:
+                try:
+                    response = await client.post(
+                        f"http://127.0.0.1:{port}/mcp",
+                        json=INITIALIZE_REQUEST,
+                        headers={"Accept": "application/json, text/event-stream"},
+                    )
+                    if response.status_code == 200:
+                        return time.perf_counter() - started_at
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.01)
+        raise RuntimeError(f"No initialize response within {timeout} seconds.")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument(
+        "command",
+        nargs="*",
+        help="Server command (default: python -m src.serve)",
+    )
+    args = parser.parse_args()
+    command = args.command or [sys.executable, "-m", "src.serve"]
+
+    latencies = [
+        await time_to_initialize(command, args.port, args.timeout)
+        for _ in range(args.runs)
+    ]
+    stats = LatencyStats(len(latencies))
+    for latency in latencies:
+        stats.record(latency, True)
+    results = {
+        "command": command,
+        "runs": [round(latency, 3) for latency in latencies],
+        "p50": round(stats.percentile(0.50), 3),
+        "max": round(max(latencies), 3),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
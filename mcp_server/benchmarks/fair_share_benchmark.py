@@ -0,0 +1,127 @@
+"""Simulate skewed multi-tenant load with and without per-caller fair sharing.
+
+One runaway caller keeps many searches in flight back to back while a few light callers
+send occasional searches. The upstream is simulated with a fixed number of slots and a
+log-normal service time. The same load runs once through a plain FIFO semaphore, as
+without FAIR_SHARE, and once through FairScheduler. For each caller, the benchmark
+reports completed and rejected calls and the p50/p95 time spent waiting for a slot.
+
+    uv run python -m benchmarks.fair_share_benchmark --duration 20 --capacity 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+from collections.abc import Callable
+
+from src.fair_share import FairScheduler, QuotaExceededError
+from src.rate_limit import OverloadedError
+from src.router import LatencyStats
+
+HEAVY = "runaway"
+
+
+class CallerResult:
+    def __init__(self) -> None:
+        self.completed = 0
+        self.rejected = 0
+        self.waits: list[float] = []
+
+    def summary(self) -> dict:
+        stats = LatencyStats(max(1, len(self.waits)))
+        for wait in self.waits:
+            stats.record(wait, True)
+        p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+        return {
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_p50_s": round(p50, 3) if p50 is not None else None,
+            "wait_p95_s": round(p95, 3) if p95 is not None else None,
+        }
+
+
+async def run_load(
+    slot: Callable[[str], contextlib.AbstractAsyncContextManager[None]],
+    args: argparse.Namespace,
+) -> dict[str, dict]:
+    rng = random.Random(args.seed)
+    results: dict[str, CallerResult] = {}
+    deadline = time.monotonic() + args.duration
+
+    async def call(caller: str) -> float:
+        """Make one upstream call and return how long to back off afterwards."""
+        result = results.setdefault(caller, CallerResult())
+        queued_at = time.monotonic()
+        try:
+            async with slot(caller):
+                result.waits.append(time.monotonic() - queued_at)
+                await asyncio.sleep(rng.lognormvariate(0, 0.3) * args.service_time)
+        except (QuotaExceededError, OverloadedError) as e:
+            result.rejected += 1
+            return e.retry_after
+        result.completed += 1
+        return 0.0
+
+    async def heavy_worker() -> None:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(await call(HEAVY))
+
+    async def light_caller(caller: str) -> None:
+        calls = []
+        while (now := time.monotonic()) < deadline:
+            calls.append(asyncio.create_task(call(caller)))
+            await asyncio.sleep(min(rng.expovariate(args.light_rate), deadline - now))
+        await asyncio.gather(*calls)
+
+    await asyncio.gather(
+        *(heavy_worker() for _ in range(args.heavy_concurrency)),
+        *(light_caller(f"light-{i}") for i in range(args.light_callers)),
+    )
+    return {caller: result.summary() for caller, result in sorted(results.items())}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per run")
+    parser.add_argument("--capacity", type=int, default=8, help="Upstream slots")
+    parser.add_argument("--service-time", type=float, default=0.2)
+    parser.add_argument("--heavy-concurrency", type=int, default=40)
+    parser.add_argument("--light-callers", type=int, default=5)
+    parser.add_argument(
+        "--light-rate", type=float, default=1.0, help="Calls per second per caller"
+    )
+    parser.add_argument("--caller-concurrency", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    semaphore = asyncio.Semaphore(args.capacity)
+
+    @contextlib.asynccontextmanager
+    async def fifo_slot(caller: str):
+        async with semaphore:
+            yield
+
+    scheduler = FairScheduler(
+        lambda: args.capacity,
+        max_concurrency=args.caller_concurrency,
+        max_wait=args.max_wait,
+    )
+    results = {
+        "fifo": await run_load(fifo_slot, args),
+        "fair_share": await run_load(scheduler.slot, args),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+"""Local stand-in for the OpenAI Responses API with a configurable latency distribution.
+
+Point the server at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any OPENAI_API_KEY.
+Requests with `previous_response_id` must name a response it returned earlier; GET /stats
+lists the IDs that follow-up requests were chained to.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+CITATION_URL = "https://example.com/?utm_source=openai"
+CITATION_LINK = f"[example.com]({CITATION_URL})"
+
+
+class LatencyModel:
+    """Log-normal latency around a median, with an occasional much slower tail request."""
+
+    def __init__(
+        self,
+        median: float,
+        sigma: float,
+        tail_probability: float,
+        tail_latency: float,
+    ) -> None:
+        self.median = median
+        self.sigma = sigma
+        self.tail_probability = tail_probability
+        self.tail_latency = tail_latency
+
+    def sample(self) -> float:
+        if random.random() < self.tail_probability:
+            return self.tail_latency * random.uniform(0.8, 1.2)
+        return random.lognormvariate(0, self.sigma) * self.median
+
+
+def build_response(response_id: str, body: dict, text: str) -> dict:
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": time.time(),
+        "model": body.get("model"),
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": body.get("tools", []),
+        "output": [
+            {"type": "web_search_call", "id": "ws_0", "status": "completed"},
+            {
+                "type": "message",
+                "id": "msg_0",
+                "role": "assistant",
+                "status": "completed",
+                "content": [
+                    {
+                        "type": "output_text",
+                        "text": text,
+                        "annotations": [
+                            {
+                                "type": "url_citation",
+                                "url": CITATION_URL,
+                                "title": "Example",
+                                "start_index": len(text) - len(CITATION_LINK) - 1,
+                                "end_index": len(text) - 1,
+                            }
+                        ],
+                    }
+                ],
+            },
+        ],
+        "usage": {
+            "input_tokens": len(body.get("input", "")),
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": len(text),
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": len(body.get("input", "")) + len(text),
+        },
+    }
+
+
+def create_app(latency: LatencyModel, payload_chars: int) -> Starlette:
+    response_ids = itertools.count()
+    stats = {"requests": 0, "previous_response_ids": []}
+    issued: set[str] = set()
+
+    async def responses(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        previous_response_id = body.get("previous_response_id")
+        if previous_response_id is not None:
+            stats["previous_response_ids"].append(previous_response_id)
+            if previous_response_id not in issued:
+                return JSONResponse(
+                    {
+                        "error": {
+                            "message": f"Previous response with id '{previous_response_id}' not found.",
+                            "type": "invalid_request_error",
+                            "param": "previous_response_id",
+                            "code": "previous_response_not_found",
+                        }
+                    },
+                    status_code=400,
+                )
+        response_id = f"resp_{next(response_ids)}"
+        issued.add(response_id)
+        text = (f"Answer to {body.get('input')!r}. " * payload_chars)[:payload_chars]
+        # Cite the source inline the way the web search tool does.
+        text = f"{text.rstrip()} ({CITATION_LINK})"
+        response = build_response(response_id, body, text)
+        delay = latency.sample()
+        headers = {
+            "x-ratelimit-limit-requests": "10000",
+            "x-ratelimit-remaining-requests": "9999",
+        }
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return JSONResponse(response, headers=headers)
+
+        async def events():
+            sequence = itertools.count()
+
+            def event(data: dict) -> str:
+                data["sequence_number"] = next(sequence)
+                return f"event: {data['type']}\ndata: {json.dumps(data)}\n\n"
+
+            yield event(
+                {
+                    "type": "response.created",
+                    "response": {**response, "status": "in_progress", "output": []},
+                }
+            )
+            yield event(
+                {
+                    "type": "response.web_search_call.searching",
+                    "item_id": "ws_0",
+                    "output_index": 0,
+                }
+            )
+            await asyncio.sleep(delay * 0.8)
+            yield event(
+                {
+                    "type": "response.web_search_call.completed",
+                    "item_id": "ws_0",
+                    "output_index": 0,
+                }
+            )
+            chunks = [text[i : i + 64] for i in range(0, len(text), 64)]
+            for chunk in chunks:
+                await asyncio.sleep(delay * 0.2 / len(chunks))
+                yield event(
+                    {
+                        "type": "response.output_text.delta",
+                        "item_id": "msg_0",
+                        "output_index": 1,
+                        "content_index": 0,
+                        "delta": chunk,
+                        "logprobs": [],
+                    }
+                )
+            yield event({"type": "response.completed", "response": response})
+
+        return StreamingResponse(
+            events(), media_type="text/event-stream", headers=headers
+        )
+
+    async def get_stats(request: Request) -> JSONResponse:
+        return JSONResponse(stats)
+
+    return Starlette(
+        routes=[
+            Route("/v1/responses", responses, methods=["POST"]),
+            Route("/stats", get_stats, methods=["GET"]),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--median", type=float, default=1.0, help="Median latency (s)")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal sigma")
+    parser.add_argument(
+        "--tail-probability", type=float, default=0.02, help="Share of slow requests"
+    )
+    parser.add_argument(
+        "--tail-latency", type=float, default=20.0, help="Latency of slow requests (s)"
+    )
+    parser.add_argument(
+        "--payload-chars", type=int, default=2000, help="Answer length in characters"
+    )
+    args = parser.parse_args()
+
+    latency = LatencyModel(
+        args.median, args.sigma, args.tail_probability, args.tail_latency
+    )
+    uvicorn.run(
+        create_app(latency, args.payload_chars),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Compare tail latency of the OpenAI backend with and without hedged requests.
+
+Runs the fake Responses API in-process with a long-tailed latency distribution and sends
+the same workload through OpenAIBackend once directly and once through the Hedger.
+
+    uv run python -m benchmarks.hedge_benchmark --requests 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import uvicorn
+
+from benchmarks.fake_openai import LatencyModel, create_app
+from src.backends import OpenAIBackend
+from src.hedging import DiscardEvents, Hedger
+from src.openai_client import close_openai_client
+from src.rate_limit import AdaptiveConcurrencyLimiter, UpstreamLimiter
+from src.router import LatencyStats
+
+
+def summarize(latencies: list[float]) -> dict:
+    stats = LatencyStats(len(latencies))
+    for latency in latencies:
+        stats.record(latency, True)
+    return {
+        "p50": round(stats.percentile(0.50), 3),
+        "p95": round(stats.percentile(0.95), 3),
+        "p99": round(stats.percentile(0.99), 3),
+        "max": round(max(latencies), 3),
+    }
+
+
+async def run_workload(
+    backend: OpenAIBackend, hedger: Hedger | None, requests: int, concurrency: int
+) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started_at = time.monotonic()
+            question = f"question {i}"
+            if hedger is None:
+                await backend.search(question, DiscardEvents())
+            else:
+                await hedger.call(
+                    [backend],
+                    backend,
+                    DiscardEvents(),
+                    lambda b, sink: b.search(question, sink),
+                )
+            latencies.append(time.monotonic() - started_at)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--median", type=float, default=0.2)
+    parser.add_argument("--tail-probability", type=float, default=0.03)
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--percentile", type=float, default=0.95)
+    parser.add_argument("--max-rate", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=9998)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.median, 0.3, args.tail_probability, args.tail_latency)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(latency, payload_chars=500),
+            host="127.0.0.1",
+            port=args.port,
+            log_level="warning",
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    limiter = UpstreamLimiter(
+        requests=None,
+        tokens=None,
+        concurrency=AdaptiveConcurrencyLimiter(
+            initial=args.concurrency * 2,
+            minimum=args.concurrency * 2,
+            maximum=args.concurrency * 2,
+            max_wait=60,
+            max_queue=args.requests,
+        ),
+        max_retries=0,
+        base_delay=0,
+        max_delay=0,
+    )
+    backend = OpenAIBackend("o3", "", 1.0, limiter, estimated_tokens=0)
+    hedger = Hedger(args.percentile, args.max_rate, min_samples=20)
+
+    try:
+        # Warm up the hedger's latency distribution before measuring.
+        await run_workload(backend, hedger, 50, args.concurrency)
+        hedger.requests = hedger.hedges = hedger.hedge_wins = 0
+
+        baseline = await run_workload(backend, None, args.requests, args.concurrency)
+        hedged = await run_workload(backend, hedger, args.requests, args.concurrency)
+    finally:
+        await close_openai_client()
+        server.should_exit = True
+        await server_task
+
+    results = {
+        "config": vars(args),
+        "baseline": summarize(baseline),
+        "hedged": summarize(hedged),
+        "hedging": hedger.snapshot(),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
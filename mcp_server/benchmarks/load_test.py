@@ -0,0 +1,308 @@
+"""Load test the MCP server over streamable-http against the local fake OpenAI backend.
+
+Starts benchmarks.fake_openai and src.mcp_server as subprocesses, drives concurrent MCP
+sessions that call greet_user and openai_o3_web_search, and reports throughput, latency
+percentiles, error rate and server CPU / RSS.
+
+    uv run python -m benchmarks.load_test --sessions 50 --requests-per-session 20 \\
+        --output results/load_test.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from src.router import LatencyStats
+
+
+class ProcessSampler:
+    """Reads CPU time and RSS of a process and its children (e.g. uvicorn workers).
+
+    Uses psutil when it is installed and /proc otherwise.
+    """
+
+    def __init__(self, pid: int) -> None:
+        self.pid = pid
+        try:
+            import psutil
+
+            self._psutil = psutil
+        except ImportError:
+            self._psutil = None
+
+    def _pids(self) -> list[int]:
+        if self._psutil is not None:
+            children = self._psutil.Process(self.pid).children(recursive=True)
+            return [self.pid, *(child.pid for child in children)]
+        parents = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                with contextlib.suppress(OSError):
+                    parents[int(entry)] = int(self._stat(int(entry))[1])
+        pids = [self.pid]
+        for pid in pids:
+            pids.extend(child for child, parent in parents.items() if parent == pid)
+        return pids
+
+    @staticmethod
+    def _stat(pid: int) -> list[str]:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()
+
+    def _cpu_seconds(self, pid: int) -> float:
+        if self._psutil is not None:
+            times = self._psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        fields = self._stat(pid)
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def _rss_bytes(self, pid: int) -> int:
+        if self._psutil is not None:
+            return self._psutil.Process(pid).memory_info().rss
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def _sum(self, read: Callable[[int], float]) -> float:
+        errors = (OSError,) if self._psutil is None else (self._psutil.Error,)
+        total = 0.0
+        for pid in self._pids():
+            # A worker may exit between listing and reading it.
+            with contextlib.suppress(*errors):
+                total += read(pid)
+        return total
+
+    def cpu_seconds(self) -> float:
+        return self._sum(self._cpu_seconds)
+
+    def rss_bytes(self) -> int:
+        return int(self._sum(self._rss_bytes))
+
+
+def summarize(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    stats = LatencyStats(len(latencies))
+    for latency in latencies:
+        stats.record(latency, True)
+    return {
+        "count": len(latencies),
+        "p50": round(stats.percentile(0.50), 4),
+        "p95": round(stats.percentile(0.95), 4),
+        "p99": round(stats.percentile(0.99), 4),
+        "max": round(max(latencies), 4),
+    }
+
+
+async def wait_until_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout} seconds.")
+
+
+async def run_session(
+    url: str,
+    requests: int,
+    web_search_ratio: float,
+    unique_questions: bool,
+    latencies: dict[str, list[float]],
+    errors: dict[str, int],
+) -> None:
+    async with streamablehttp_client(url, timeout=600) as (
+        read_stream,
+        write_stream,
+        _,
+    ):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            for _ in range(requests):
+                if random.random() < web_search_ratio:
+                    tool = "openai_o3_web_search"
+                    question = (
+                        f"question {random.getrandbits(64)}"
+                        if unique_questions
+                        else f"question {random.randrange(20)}"
+                    )
+                    arguments = {"question": question}
+                else:
+                    tool = "greet_user"
+                    arguments = {"name": "benchmark"}
+                started_at = time.perf_counter()
+                try:
+                    result = await session.call_tool(tool, arguments)
+                    failed = result.isError or (
+                        result.content
+                        and getattr(result.content[0], "text", "").startswith(
+                            "Error occurred"
+                        )
+                    )
+                except Exception:
+                    failed = True
+                latencies[tool].append(time.perf_counter() - started_at)
+                if failed:
+                    errors[tool] += 1
+
+
+async def run(args: argparse.Namespace) -> dict:
+    fake_openai = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.fake_openai",
+            "--port",
+            str(args.fake_port),
+            "--median",
+            str(args.upstream_latency),
+            "--tail-probability",
+            "0",
+            "--payload-chars",
+            str(args.payload_chars),
+        ]
+    )
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+        "CACHE_BACKEND": os.getenv("CACHE_BACKEND", "none"),
+        "FASTMCP_PORT": str(args.port),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", *args.server_command.split()],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}/mcp"
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{args.fake_port}/stats")
+        await wait_until_ready(url)
+        sampler = ProcessSampler(server.pid)
+        cpu_before = sampler.cpu_seconds()
+
+        latencies: dict[str, list[float]] = {
+            "greet_user": [],
+            "openai_o3_web_search": [],
+        }
+        errors = {tool: 0 for tool in latencies}
+        rss_samples: list[int] = []
+
+        async def sample_rss() -> None:
+            while True:
+                rss_samples.append(sampler.rss_bytes())
+                await asyncio.sleep(0.5)
+
+        rss_task = asyncio.create_task(sample_rss())
+        started_at = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                run_session(
+                    url,
+                    args.requests_per_session,
+                    args.web_search_ratio,
+                    args.unique_questions,
+                    latencies,
+                    errors,
+                )
+                for _ in range(args.sessions)
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started_at
+        rss_task.cancel()
+        cpu_seconds = sampler.cpu_seconds() - cpu_before
+    finally:
+        server.terminate()
+        fake_openai.terminate()
+        server.wait()
+        fake_openai.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    failed_sessions = [
+        str(result) for result in results if isinstance(result, Exception)
+    ]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "config": vars(args),
+        "duration_seconds": round(elapsed, 3),
+        "requests": total,
+        "rps": round(total / elapsed, 2),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else None,
+        "failed_sessions": failed_sessions,
+        "tools": {
+            tool: {**summarize(values), "errors": errors[tool]}
+            for tool, values in latencies.items()
+        },
+        "server": {
+            "cpu_seconds": round(cpu_seconds, 3),
+            "cpu_utilization": round(cpu_seconds / elapsed, 3),
+            "rss_max_bytes": max(rss_samples, default=0),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--requests-per-session", type=int, default=20)
+    parser.add_argument(
+        "--web-search-ratio",
+        type=float,
+        default=0.5,
+        help="Share of calls that go to openai_o3_web_search",
+    )
+    parser.add_argument(
+        "--unique-questions",
+        action="store_true",
+        help="Never repeat a question, so the cache and single-flight never hit",
+    )
+    parser.add_argument(
+        "--upstream-latency", type=float, default=0.5, help="Fake OpenAI median (s)"
+    )
+    parser.add_argument("--payload-chars", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fake-port", type=int, default=9999)
+    parser.add_argument(
+        "--server-command",
+        default="src.mcp_server",
+        help="Module (and arguments) started with `python -m` to serve the MCP app",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Simulate a day of recurring questions with and without stale-while-revalidate.
+
+Questions are drawn from a Zipf distribution, so a few are asked all day and most only
+now and then. Time is a fake clock that jumps from one event to the next, so hours of
+traffic replay in seconds, and upstream calls go to a stub that answers after a latency
+drawn from the same model as benchmarks.fake_openai, measured on the fake clock.
+
+The same traffic runs twice through PopularAnswers: once configured as a plain TTL
+cache (no stale answers, no refreshes), and once with stale answers served while they
+are refreshed in the background within the refresh budget. For each run, the benchmark
+reports how many requests had to wait for the upstream, the age of stale answers
+served, and how many upstream calls were made live and in the background.
+
+    uv run python -m benchmarks.popular_benchmark --hours 24 --rate 20
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import random
+
+from benchmarks.fake_openai import LatencyModel
+from src.backends import BackendAnswer
+from src.popular import PopularAnswers
+from src.router import LatencyStats
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StubUpstream:
+    """Answers searches after a sampled latency on the fake clock."""
+
+    def __init__(self, clock: FakeClock, latency: LatencyModel) -> None:
+        self.clock = clock
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self._pending: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    async def search(self, question: str) -> BackendAnswer:
+        self.calls += 1
+        self.in_flight += 1
+        done = asyncio.get_running_loop().create_future()
+        due = self.clock.now + self.latency.sample()
+        heapq.heappush(self._pending, (due, next(self._sequence), done))
+        try:
+            await done
+        finally:
+            self.in_flight -= 1
+        return BackendAnswer(f"{question} ({self.clock.now:.0f})")
+
+    async def advance(self, to: float) -> None:
+        """Move the clock to `to`, completing the searches due on the way."""
+        while self._pending and self._pending[0][0] <= to:
+            due, _, done = heapq.heappop(self._pending)
+            self.clock.now = due
+            done.set_result(None)
+            await settle()
+        self.clock.now = to
+
+
+async def settle() -> None:
+    # Let the tasks woken by the fake clock run until they wait again.
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    stats = LatencyStats(max(1, len(values)))
+    for value in values:
+        stats.record(value, True)
+    result = stats.percentile(q)
+    return round(result, 1) if result is not None else None
+
+
+async def simulate(args: argparse.Namespace, stale_while_revalidate: bool) -> dict:
+    rng = random.Random(args.seed)
+    clock = FakeClock()
+    upstream = StubUpstream(
+        clock, LatencyModel(args.median_latency, 0.5, 0.02, args.median_latency * 5)
+    )
+    store = PopularAnswers(
+        fresh_ttl=args.ttl,
+        max_stale=args.max_stale if stale_while_revalidate else args.ttl,
+        max_entries=args.questions,
+        top_n=args.top_n if stale_while_revalidate else 0,
+        max_concurrency=args.refresh_concurrency,
+        refresh_per_hour=args.refresh_per_hour if stale_while_revalidate else 0,
+        busy=lambda: upstream.in_flight >= args.capacity,
+        clock=clock,
+    )
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.questions)]
+    live: dict[str, asyncio.Task] = {}
+    requests = waited = 0
+    stale_ages: list[float] = []
+
+    async def fetch(key: str, question: str) -> None:
+        answer = await upstream.search(question)
+        store.store(key, answer)
+        del live[key]
+
+    end = args.hours * 3600
+    next_refresh = args.refresh_interval
+    now = rng.expovariate(args.rate / 60)
+    while now < end:
+        while next_refresh <= now:
+            await upstream.advance(next_refresh)
+            if stale_while_revalidate:
+                store.refresh_popular()
+            next_refresh += args.refresh_interval
+        await upstream.advance(now)
+        key = f"q{rng.choices(range(args.questions), weights)[0]}"
+        question = f"question {key}"
+        requests += 1
+        store.record(key, question, lambda question=question: upstream.search(question))
+        answer = store.get(key)
+        if answer is None:
+            waited += 1
+            if key not in live:
+                live[key] = asyncio.create_task(fetch(key, question))
+        elif answer.age is not None:
+            stale_ages.append(answer.age)
+        await settle()
+        now += rng.expovariate(args.rate / 60)
+    await upstream.advance(end + 3600)
+    await store.close()
+
+    return {
+        "requests": requests,
+        "waited_for_upstream": waited,
+        "waited_ratio": round(waited / requests, 3) if requests else 0.0,
+        "stale_served": store.stale_served,
+        "stale_age_p50_s": percentile(stale_ages, 0.5),
+        "stale_age_p95_s": percentile(stale_ages, 0.95),
+        "upstream_calls": upstream.calls,
+        "background_refreshes": store.refreshed + store.refresh_errors,
+        "refresh_skipped": store.skipped,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--rate", type=float, default=20, help="Questions per minute")
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--ttl", type=float, default=3600, help="Fresh seconds")
+    parser.add_argument("--max-stale", type=float, default=86400)
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--refresh-interval", type=float, default=60)
+    parser.add_argument("--refresh-concurrency", type=int, default=2)
+    parser.add_argument("--refresh-per-hour", type=float, default=60)
+    parser.add_argument("--capacity", type=int, default=8, help="Upstream slots")
+    parser.add_argument("--median-latency", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "ttl_cache": await simulate(args, stale_while_revalidate=False),
+        "stale_while_revalidate": await simulate(args, stale_while_revalidate=True),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,94 @@
+import argparse
 import os
+import time
+from pathlib import Path
 
+import boto3
 from bedrock_agentcore_starter_toolkit import Runtime
 from dotenv import load_dotenv
 
+from deploy_plan import (
+    PhaseTimer,
+    deployed_fingerprint,
+    fingerprint,
+    load_state,
+    plan_deploy,
+    preserve_file,
+    save_state,
+)
+
+# Record of the last deploy, used to skip work that is already done.
+STATE_PATH = Path(".deploy_state.json")
+RUNTIME_SETTINGS = (
+    "roleArn",
+    "networkConfiguration",
+    "authorizerConfiguration",
+    "protocolConfiguration",
+    "requestHeaderConfiguration",
+)
+
+
+def image_exists(ecr_repository: str, tag: str, region: str) -> bool:
+    ecr = boto3.client("ecr", region_name=region)
+    try:
+        ecr.describe_images(
+            repositoryName=ecr_repository.split("/", 1)[1],
+            imageIds=[{"imageTag": tag}],
+        )
+    except (
+        ecr.exceptions.ImageNotFoundException,
+        ecr.exceptions.RepositoryNotFoundException,
+    ):
+        return False
+    return True
+
+
+def tag_image(ecr_repository: str, source_tag: str, tag: str, region: str) -> None:
+    """Add `tag` to the image tagged `source_tag` without pulling or pushing it."""
+    ecr = boto3.client("ecr", region_name=region)
+    repository_name = ecr_repository.split("/", 1)[1]
+    image = ecr.batch_get_image(
+        repositoryName=repository_name, imageIds=[{"imageTag": source_tag}]
+    )["images"][0]
+    try:
+        ecr.put_image(
+            repositoryName=repository_name,
+            imageManifest=image["imageManifest"],
+            imageManifestMediaType=image["imageManifestMediaType"],
+            imageTag=tag,
+        )
+    except ecr.exceptions.ImageAlreadyExistsException:
+        pass
+
+
+def update_runtime(agent_id: str, image_uri: str, env_vars: dict, region: str) -> None:
+    """Point the runtime at an image and env vars, keeping its other settings."""
+    client = boto3.client("bedrock-agentcore-control", region_name=region)
+    runtime = client.get_agent_runtime(agentRuntimeId=agent_id)
+    client.update_agent_runtime(
+        agentRuntimeId=agent_id,
+        agentRuntimeArtifact={"containerConfiguration": {"containerUri": image_uri}},
+        environmentVariables=env_vars,
+        **{key: runtime[key] for key in RUNTIME_SETTINGS if key in runtime},
+    )
+
+
+def wait_for_runtime(agent_id: str, region: str, timeout: float = 600) -> None:
+    """Wait with exponential backoff until the runtime finished updating."""
+    client = boto3.client("bedrock-agentcore-control", region_name=region)
+    deadline = time.monotonic() + timeout
+    delay = 1.0
+    while True:
+        status = client.get_agent_runtime(agentRuntimeId=agent_id)["status"]
+        if status == "READY":
+            return
+        if status.endswith("FAILED"):
+            raise RuntimeError(f"Runtime {agent_id} is {status}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Runtime {agent_id} is still {status}")
+        time.sleep(delay)
+        delay = min(delay * 2, 15.0)
+
 
 def deploy_mcp_server(
     cognito_client_id: str,
@@ -10,46 +96,111 @@ def deploy_mcp_server(
     role_arn: str,
     agent_name: str,
     env_vars: dict,
-    entrypoint: str = "./src/mcp_server.py",
+    entrypoint: str = "./src/serve.py",
     requirements_file: str = "./pyproject.toml",
     region: str = "us-west-2",
+    ecr_repository: str | None = None,
+    force: bool = False,
 ) -> None:
-    agentcore_runtime = Runtime()
+    """Deploy the MCP server, doing only the work its changes require.
 
+    The source tree, the dependency files, the env vars and the runtime settings are
+    hashed and compared with the last deploy recorded in .deploy_state.json. The image
+    is built only when no image with the same content hash is in ECR; when only src/
+    changed, the dependency layers come from the Docker build cache. When only the env
+    vars changed, or the image was built before, the runtime is updated in place.
+
+    Args:
+        force (bool): Build and launch even if nothing changed.
+    """
     auth_config = {
         "customJWTAuthorizer": {
             "allowedClients": [cognito_client_id],
             "discoveryUrl": cognito_discovery_url,
         }
     }
+    settings = {
+        "agent_name": agent_name,
+        "role_arn": role_arn,
+        "authorizer": auth_config,
+        "entrypoint": entrypoint,
+        "region": region,
+    }
 
-    print("Configuring AgentCore Runtime...")
-    agentcore_runtime.configure(
-        entrypoint=entrypoint,
-        execution_role=role_arn,
-        auto_create_ecr=True,
-        requirements_file=requirements_file,
-        region=region,
-        authorizer_configuration=auth_config,
-        protocol="MCP",
-        agent_name=agent_name,
-    )
-    print("Configuration completed ✓\n")
+    timer = PhaseTimer()
+    with timer.phase("hash"):
+        current = fingerprint(Path("."), env_vars, settings)
+    state = load_state(STATE_PATH) or {}
+    ecr_repository = ecr_repository or state.get("ecr_repository")
+    with timer.phase("check image"):
+        exists = ecr_repository is not None and image_exists(
+            ecr_repository, current.image_tag, region
+        )
+    plan = plan_deploy(current, deployed_fingerprint(state), exists, force)
+    print(f"Image {current.image_tag}: {plan.action} ({plan.reason})\n")
 
-    print("Launching MCP server to AgentCore Runtime...")
-    print("This may take several minutes...")
-    launch_result = agentcore_runtime.launch(
-        env_vars={"OPENAI_API_KEY": env_vars.get("OPENAI_API_KEY")},
-    )
-    print("Launch completed ✓\n")
-    print(f"Agent ARN: {launch_result.agent_arn}")
-    print(f"Agent ID: {launch_result.agent_id}")
+    if plan.action == "build":
+        agentcore_runtime = Runtime()
+
+        print("Configuring AgentCore Runtime...")
+        # configure() regenerates the Dockerfile from the toolkit template; keep ours,
+        # also when configure() fails halfway.
+        with timer.phase("configure"), preserve_file(Path("Dockerfile")):
+            agentcore_runtime.configure(
+                entrypoint=entrypoint,
+                execution_role=role_arn,
+                # Use the repository created by setup/src/setup_all.py when there is one.
+                ecr_repository=ecr_repository,
+                auto_create_ecr=ecr_repository is None,
+                requirements_file=requirements_file,
+                region=region,
+                authorizer_configuration=auth_config,
+                protocol="MCP",
+                agent_name=agent_name,
+            )
+        print("Configuration completed ✓\n")
+
+        print("Launching MCP server to AgentCore Runtime...")
+        print("This may take several minutes...")
+        with timer.phase("build and launch"):
+            launch_result = agentcore_runtime.launch(env_vars=env_vars)
+        print("Launch completed ✓\n")
+        with timer.phase("tag image"):
+            tag_image(launch_result.ecr_uri, "latest", current.image_tag, region)
+        state = {
+            "agent_id": launch_result.agent_id,
+            "agent_arn": launch_result.agent_arn,
+            "ecr_repository": launch_result.ecr_uri,
+        }
+    elif plan.action == "update":
+        print("Updating AgentCore Runtime...")
+        with timer.phase("update runtime"):
+            update_runtime(
+                state["agent_id"],
+                f"{ecr_repository}:{current.image_tag}",
+                env_vars,
+                region,
+            )
+        with timer.phase("wait for runtime"):
+            wait_for_runtime(state["agent_id"], region)
+        print("Update completed ✓\n")
+
+    save_state(STATE_PATH, state, current)
+    print(f"Agent ARN: {state['agent_arn']}")
+    print(f"Agent ID: {state['agent_id']}")
+    print(timer.report())
 
 
 def main() -> None:
     """
     Main function to execute the deployment of the MCP server.
     """
+    parser = argparse.ArgumentParser(description="Deploy the MCP server")
+    parser.add_argument(
+        "--force", action="store_true", help="Build and launch even if unchanged"
+    )
+    args = parser.parse_args()
+
     load_dotenv()
     cognito_client_id = os.getenv("COGNITO_CLIENT_ID")
     cognito_discovery_url = os.getenv("COGNITO_DISCOVERY_URL")
@@ -74,6 +225,8 @@ def main() -> None:
         role_arn,
         agent_name,
         {"OPENAI_API_KEY": openai_api_key},
+        ecr_repository=os.getenv("ECR_REPOSITORY") or None,
+        force=args.force,
     )
 
 
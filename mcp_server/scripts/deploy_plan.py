@@ -0,0 +1,197 @@
+"""Decide what a deploy has to do from content hashes of the deployable inputs.
+
+Nothing here talks to AWS, so the decision can be checked offline.
+"""
+
+import hashlib
+import json
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Literal
+
+# Inputs of the dependency layers of the image, see the Dockerfile.
+DEPENDENCY_PATHS = ("pyproject.toml", "uv.lock", "Dockerfile", ".dockerignore")
+# Inputs of the application layers.
+SOURCE_PATHS = ("src", "scripts/entrypoint.sh")
+
+DeployAction = Literal["build", "update", "skip"]
+
+
+def iter_files(root: Path, paths: Iterable[str]) -> Iterator[Path]:
+    """Yield the files under `paths`, relative to `root`, skipping bytecode caches."""
+    for name in paths:
+        path = root / name
+        candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file in candidates:
+            if not file.is_file() or "__pycache__" in file.parts:
+                continue
+            yield file.relative_to(root)
+
+
+def hash_files(root: Path, paths: Iterable[str]) -> str:
+    """Hash the names and contents of the files under `paths`.
+
+    Missing paths are skipped, so e.g. a project without .dockerignore still hashes.
+
+    Args:
+        root (Path): Directory the paths are relative to.
+        paths (Iterable[str]): Files or directories to hash.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for file in sorted(iter_files(root, paths)):
+        data = (root / file).read_bytes()
+        # Length-prefixed so that moving bytes between files changes the hash.
+        digest.update(f"{file.as_posix()}\0{len(data)}\0".encode())
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_values(values: dict) -> str:
+    """Hash a JSON-serializable mapping; only the digest of secrets is stored."""
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    dependencies: str
+    source: str
+    env: str
+    settings: str
+
+    @property
+    def image_tag(self) -> str:
+        """Tag of the image built from these dependencies and sources."""
+        image = hashlib.sha256(f"{self.dependencies}:{self.source}".encode())
+        return image.hexdigest()[:16]
+
+
+def fingerprint(
+    root: Path, env_vars: dict[str, str | None], settings: dict
+) -> Fingerprint:
+    """Fingerprint the deployable inputs.
+
+    Args:
+        root (Path): The mcp_server directory.
+        env_vars (dict[str, str | None]): Environment variables of the runtime.
+        settings (dict): Other runtime settings passed to configure(), such as the
+            execution role and the authorizer.
+
+    Returns:
+        Fingerprint: The hashes of each part.
+    """
+    return Fingerprint(
+        dependencies=hash_files(root, DEPENDENCY_PATHS),
+        source=hash_files(root, SOURCE_PATHS),
+        env=hash_values(env_vars),
+        settings=hash_values(settings),
+    )
+
+
+@dataclass(frozen=True)
+class DeployPlan:
+    action: DeployAction
+    reason: str
+
+
+def plan_deploy(
+    current: Fingerprint,
+    deployed: Fingerprint | None,
+    image_exists: bool,
+    force: bool = False,
+) -> DeployPlan:
+    """Choose the cheapest deploy that brings the runtime to the current inputs.
+
+    Args:
+        current (Fingerprint): Fingerprint of the working tree and env vars.
+        deployed (Fingerprint | None): Fingerprint of the last deploy, if recorded.
+        image_exists (bool): Whether an image tagged `current.image_tag` is in ECR.
+        force (bool): Build and launch even if nothing changed.
+
+    Returns:
+        DeployPlan: "build" to configure, build, push and launch through the toolkit,
+            which also applies changed runtime settings, "update" to point the
+            existing runtime at an existing image and the current env vars, or "skip"
+            when the runtime is up to date.
+    """
+    if force:
+        return DeployPlan("build", "forced")
+    if deployed is None:
+        return DeployPlan("build", "no previous deploy recorded")
+    if current.settings != deployed.settings:
+        return DeployPlan("build", "runtime settings changed")
+    if not image_exists:
+        if current.dependencies != deployed.dependencies:
+            return DeployPlan("build", "dependencies changed")
+        if current.source != deployed.source:
+            return DeployPlan(
+                "build", "source changed, dependency layers come from the build cache"
+            )
+        return DeployPlan("build", f"image {current.image_tag} not found in ECR")
+    if current.image_tag != deployed.image_tag:
+        return DeployPlan("update", f"image {current.image_tag} was already built")
+    if current.env != deployed.env:
+        return DeployPlan("update", "only the environment variables changed")
+    return DeployPlan("skip", "nothing changed since the last deploy")
+
+
+def load_state(path: Path) -> dict | None:
+    """Read the record of the last deploy, or None if there is none."""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(path: Path, state: dict, current: Fingerprint) -> None:
+    path.write_text(json.dumps({**state, "fingerprint": asdict(current)}, indent=2))
+
+
+def deployed_fingerprint(state: dict | None) -> Fingerprint | None:
+    if not state or "fingerprint" not in state:
+        return None
+    return Fingerprint(**state["fingerprint"])
+
+
+@contextmanager
+def preserve_file(path: Path) -> Iterator[None]:
+    """Restore the content of `path` when the block exits, even when it raises.
+
+    A file that did not exist before is left as the block wrote it.
+    """
+    content = path.read_bytes() if path.exists() else None
+    try:
+        yield
+    finally:
+        if content is not None:
+            path.write_bytes(content)
+
+
+class PhaseTimer:
+    """Measures the wall time of the phases of a deploy."""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def report(self) -> str:
+        total = sum(self.phases.values())
+        lines = [
+            f"  {name:<20} {seconds:8.1f}s {seconds / total if total else 0:6.0%}"
+            for name, seconds in self.phases.items()
+        ]
+        return "\n".join(["Timing:", *lines, f"  {'total':<20} {total:8.1f}s"])
@@ -0,0 +1,8 @@
+#!/bin/sh
+# Start the MCP server, with OpenTelemetry auto-instrumentation unless it is turned off.
+set -e
+
+if [ "${OTEL_AUTO_INSTRUMENTATION:-1}" = "1" ]; then
+    exec opentelemetry-instrument python -m src.serve
+fi
+exec python -m src.serve
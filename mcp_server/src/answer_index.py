@@ -0,0 +1,335 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.backends import BackendAnswer, Citation
+
+# Every answer is indexed by trigrams, which also matches Japanese text without word
+# boundaries. Terms shorter than three characters cannot be looked up.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    question_key TEXT NOT NULL UNIQUE,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    citations TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_created_at ON answers (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS answers_fts USING fts5(
+    question, answer, urls,
+    content='answers', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS answers_ai AFTER INSERT ON answers BEGIN
+    INSERT INTO answers_fts (rowid, question, answer, urls)
+    VALUES (new.id, new.question, new.answer, new.urls);
+END;
+CREATE TRIGGER IF NOT EXISTS answers_ad AFTER DELETE ON answers BEGIN
+    INSERT INTO answers_fts (answers_fts, rowid, question, answer, urls)
+    VALUES ('delete', old.id, old.question, old.answer, old.urls);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS answers_vocab USING fts5vocab(answers_fts, 'row');
+"""
+# Matches in the question weigh most, then in the cited URLs, then in the answer.
+RANK = "bm25(4.0, 1.0, 2.0)"
+WORD = re.compile(r"\w+")
+# Query terms are pruned by document frequency, which is cached for a while. Only
+# terms found in the index are cached, so that a new answer is found right away.
+MAX_QUERY_TERMS = 12
+MAX_TERM_SHARE = 0.1
+CANDIDATE_BUDGET = 500
+FREQUENCY_TTL = 600
+PURGE_BATCH = 1000
+
+
+@dataclass
+class IndexedAnswer:
+    question: str
+    answer: str
+    citations: list[Citation]
+    backend: str
+    created_at: float
+    score: float
+
+
+def question_key(question: str) -> str:
+    return hashlib.sha256(" ".join(question.split()).encode()).hexdigest()
+
+
+def query_terms(text: str) -> list[str]:
+    """Split free text into the trigrams the index is searched by.
+
+    Trigrams also match Japanese text, which has no spaces between words. Words shorter
+    than three characters are dropped because they cannot be looked up.
+
+    Args:
+        text (str): Keywords or a question.
+
+    Returns:
+        list[str]: Distinct trigrams in order of appearance.
+    """
+    terms: dict[str, None] = {}
+    for word in WORD.findall(text.lower()):
+        terms.update(dict.fromkeys(word[i : i + 3] for i in range(len(word) - 2)))
+    return list(terms)
+
+
+def any_of(terms: list[str]) -> str:
+    return "(" + " OR ".join(f'"{term}"' for term in terms) + ")"
+
+
+class AnswerIndex:
+    """Full-text index of past answers and their cited URLs in a SQLite file.
+
+    Triggers keep the FTS5 index in step with every insert and delete, so new answers
+    are searchable immediately. Answers older than `retention` seconds, and the oldest
+    ones beyond `max_answers`, are purged in small batches in the background, each
+    followed by a bounded FTS5 merge. Asking the same question again replaces the
+    stored answer. Several server workers can share one file.
+
+    Lookups stay fast at hundreds of thousands of answers because bm25 only scores a
+    bounded set of candidates: trigrams found in more than `MAX_TERM_SHARE` of the
+    answers are dropped like stop words, only answers containing one of the rarest
+    trigrams are ranked, and when even those are more than `CANDIDATE_BUDGET`, only
+    the most recent ones are.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        retention: float = 30 * 86400,
+        max_answers: int = 200000,
+        purge_interval: float = 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.retention = retention
+        self.max_answers = max_answers
+        self.purge_interval = purge_interval
+        self.clock = clock
+        self.added = 0
+        self.searches = 0
+        self.purged = 0
+        self.write_errors = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(
+            "INSERT INTO answers_fts (answers_fts, rank) VALUES ('rank', ?)", (RANK,)
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+        self._purge_task: asyncio.Task | None = None
+        self._frequencies: dict[str, int] = {}
+        self._total = 0
+        self._frequencies_expire_at = 0.0
+
+    def _add(self, rows: list[tuple]) -> None:
+        # Delete and insert rather than update, so that ids follow recency.
+        for row in rows:
+            self._conn.execute("DELETE FROM answers WHERE question_key = ?", row[:1])
+            self._conn.execute(
+                "INSERT INTO answers (question_key, question, answer, urls, "
+                "citations, backend, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+        self._conn.commit()
+        # Replaced answers are counted twice until the cached total expires, which
+        # only makes the pruning of common terms slightly less strict.
+        self._total += len(rows)
+
+    @staticmethod
+    def row(
+        question: str, backend: str, answer: BackendAnswer, created_at: float
+    ) -> tuple:
+        return (
+            question_key(question),
+            question,
+            answer.text,
+            "\n".join(citation.url for citation in answer.citations),
+            json.dumps([[c.url, c.title] for c in answer.citations]),
+            backend,
+            created_at,
+        )
+
+    async def add(self, question: str, backend: str, answer: BackendAnswer) -> None:
+        """Store an answer. Failures are counted instead of failing the search."""
+        try:
+            async with self._lock:
+                await asyncio.to_thread(
+                    self._add, [self.row(question, backend, answer, self.clock())]
+                )
+            self.added += 1
+        except sqlite3.Error:
+            self.write_errors += 1
+
+    def _frequency(self, term: str) -> int:
+        if time.monotonic() >= self._frequencies_expire_at:
+            self._frequencies.clear()
+            self._total = self._count()
+            self._frequencies_expire_at = time.monotonic() + FREQUENCY_TTL
+        frequency = self._frequencies.get(term)
+        if frequency is None:
+            row = self._conn.execute(
+                "SELECT doc FROM answers_vocab WHERE term = ?", (term,)
+            ).fetchone()
+            frequency = row[0] if row else 0
+            if frequency:
+                self._frequencies[term] = frequency
+        return frequency
+
+    def _search(
+        self, terms: list[str], limit: int, min_created_at: float
+    ) -> list[IndexedAnswer]:
+        frequencies = {term: self._frequency(term) for term in terms}
+        known = sorted((t for t in terms if frequencies[t]), key=frequencies.get)
+        if not known:
+            return []
+        selective = [t for t in known if frequencies[t] <= MAX_TERM_SHARE * self._total]
+        terms = (selective or known[:1])[:MAX_QUERY_TERMS]
+        gate = terms[:1]
+        candidates = frequencies[terms[0]]
+        for term in terms[1:]:
+            if candidates + frequencies[term] > CANDIDATE_BUDGET:
+                break
+            gate.append(term)
+            candidates += frequencies[term]
+        min_id = 0
+        if candidates > CANDIDATE_BUDGET:
+            row = self._conn.execute(
+                "SELECT rowid FROM answers_fts WHERE answers_fts MATCH ? "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (any_of(gate), CANDIDATE_BUDGET - 1),
+            ).fetchone()
+            min_id = row[0] if row else 0
+        rows = self._conn.execute(
+            "SELECT a.question, a.answer, a.citations, a.backend, a.created_at, "
+            "answers_fts.rank FROM answers_fts JOIN answers AS a "
+            "ON a.id = answers_fts.rowid "
+            "WHERE answers_fts MATCH ? AND answers_fts.rowid >= ? "
+            "AND a.created_at >= ? ORDER BY answers_fts.rank LIMIT ?",
+            (f"{any_of(gate)} AND {any_of(terms)}", min_id, min_created_at, limit),
+        ).fetchall()
+        return [
+            IndexedAnswer(
+                question,
+                answer,
+                [Citation(url, title) for url, title in json.loads(citations)],
+                backend,
+                created_at,
+                -rank,
+            )
+            for question, answer, citations, backend, created_at, rank in rows
+        ]
+
+    async def search(
+        self, text: str, limit: int = 5, max_age: float | None = None
+    ) -> list[IndexedAnswer]:
+        """Find the stored answers that best match keywords or a question.
+
+        Args:
+            text (str): Keywords or a question.
+            limit (int): Maximum number of answers.
+            max_age (float | None): Only answers stored within this many seconds.
+
+        Returns:
+            list[IndexedAnswer]: Matching answers, best first.
+        """
+        self.searches += 1
+        terms = query_terms(text)
+        if not terms:
+            return []
+        min_created_at = self.clock() - max_age if max_age is not None else 0.0
+        async with self._lock:
+            return await asyncio.to_thread(self._search, terms, limit, min_created_at)
+
+    def _purge(self) -> int:
+        (count,) = self._conn.execute("SELECT count(*) FROM answers").fetchone()
+        (expired,) = self._conn.execute(
+            "SELECT count(*) FROM answers WHERE created_at < ?",
+            (self.clock() - self.retention,),
+        ).fetchone()
+        # Expired answers are the oldest ones, so one oldest-first delete covers both.
+        batch = min(PURGE_BATCH, max(expired, count - self.max_answers))
+        deleted = self._conn.execute(
+            "DELETE FROM answers WHERE id IN "
+            "(SELECT id FROM answers ORDER BY created_at LIMIT ?)",
+            (batch,),
+        ).rowcount
+        if deleted:
+            # Merge a bounded number of index pages instead of a full optimize.
+            self._conn.execute(
+                "INSERT INTO answers_fts (answers_fts, rank) VALUES ('merge', 500)"
+            )
+        self._conn.commit()
+        return deleted
+
+    async def purge(self) -> int:
+        """Delete one batch of expired or excess answers and return how many."""
+        async with self._lock:
+            deleted = await asyncio.to_thread(self._purge)
+        self.purged += deleted
+        return deleted
+
+    async def _purge_loop(self) -> None:
+        while True:
+            with contextlib.suppress(sqlite3.Error):
+                # Keep going without sleeping while whole batches are deleted.
+                if await self.purge() == PURGE_BATCH:
+                    continue
+            await asyncio.sleep(self.purge_interval)
+
+    def start(self) -> None:
+        self._purge_task = asyncio.create_task(self._purge_loop())
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT count(*) FROM answers").fetchone()[0]
+
+    async def stats(self) -> dict:
+        async with self._lock:
+            answers = await asyncio.to_thread(self._count)
+        return {
+            "answers": answers,
+            "added": self.added,
+            "searches": self.searches,
+            "purged": self.purged,
+            "write_errors": self.write_errors,
+        }
+
+    async def close(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            await asyncio.gather(self._purge_task, return_exceptions=True)
+        self._conn.close()
+
+
+def create_answer_index() -> AnswerIndex | None:
+    """Create the index of past answers configured by environment variables.
+
+    Environment variables:
+        ANSWER_INDEX_PATH: SQLite file of the index; empty disables it
+            (default: answers.db).
+        ANSWER_INDEX_RETENTION_DAYS: Age after which answers are deleted (default: 30).
+        ANSWER_INDEX_MAX_ANSWERS: Answers kept at most; the oldest are deleted first
+            (default: 200000).
+
+    Returns:
+        AnswerIndex | None: The index, or None when disabled.
+    """
+    path = os.getenv("ANSWER_INDEX_PATH", "answers.db")
+    if not path:
+        return None
+    return AnswerIndex(
+        path,
+        retention=float(os.getenv("ANSWER_INDEX_RETENTION_DAYS", "30")) * 86400,
+        max_answers=int(os.getenv("ANSWER_INDEX_MAX_ANSWERS", "200000")),
+    )
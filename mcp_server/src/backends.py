@@ -0,0 +1,288 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from src.metrics import metrics
+from src.openai_client import get_openai_client
+from src.rate_limit import UpstreamLimiter
+
+WEB_SEARCH_TOOLS = [{"type": "web_search_preview"}]
+
+
+class SearchEventSink(Protocol):
+    async def status(self, message: str) -> None: ...
+
+    async def text(self, delta: str) -> None: ...
+
+
+@dataclass
+class Citation:
+    url: str
+    title: str | None = None
+
+
+@dataclass
+class BackendAnswer:
+    text: str
+    total_tokens: int | None = None
+    citations: list[Citation] = field(default_factory=list)
+    # Upstream ID that follow-up questions can be chained to, if the backend keeps one.
+    response_id: str | None = None
+    # Seconds since the answer was fetched, set when a stale answer is served.
+    age: float | None = None
+
+
+def url_citations(response) -> list[Citation]:
+    """Collect the distinct URLs cited by the web search tool in a Responses API result.
+
+    Args:
+        response: The completed response.
+
+    Returns:
+        list[Citation]: Cited URLs in order of first citation.
+    """
+    citations: dict[str, Citation] = {}
+    for item in response.output:
+        if item.type != "message":
+            continue
+        for content in item.content:
+            for annotation in getattr(content, "annotations", None) or []:
+                if (
+                    annotation.type == "url_citation"
+                    and annotation.url not in citations
+                ):
+                    citations[annotation.url] = Citation(
+                        annotation.url, annotation.title or None
+                    )
+    return list(citations.values())
+
+
+class SearchBackend(Protocol):
+    """A model that can answer a search question.
+
+    Attributes:
+        name: Unique name, used in cache keys and routing statistics.
+        tools: Tools passed to the model, part of the cache key.
+        instructions: System instructions, part of the cache key.
+        cost: Relative cost of one call, compared against the caller's cost budget.
+        supports_threads: Whether follow-up questions can be chained to its answers
+            with `previous_response_id`.
+    """
+
+    name: str
+    tools: list
+    instructions: str
+    cost: float
+    supports_threads: bool
+
+    async def search(
+        self,
+        question: str,
+        events: SearchEventSink,
+        previous_response_id: str | None = None,
+    ) -> BackendAnswer: ...
+
+
+class OpenAIBackend:
+    """OpenAI reasoning model with the hosted web search tool, called through the Responses API."""
+
+    def __init__(
+        self,
+        model: str,
+        instructions: str,
+        cost: float,
+        limiter: UpstreamLimiter,
+        estimated_tokens: int,
+    ) -> None:
+        self.name = f"openai:{model}"
+        self.model = model
+        self.tools = WEB_SEARCH_TOOLS
+        self.instructions = instructions
+        self.cost = cost
+        self.supports_threads = True
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+
+    async def search(
+        self,
+        question: str,
+        events: SearchEventSink,
+        previous_response_id: str | None = None,
+    ) -> BackendAnswer:
+        client = get_openai_client()
+        # Only follow-ups pass the ID; the earlier turns are kept by OpenAI.
+        thread = (
+            {}
+            if previous_response_id is None
+            else {"previous_response_id": previous_response_id}
+        )
+        async with self.limiter.slot(self.estimated_tokens):
+            with metrics.upstream_call(self.name, self.model) as call:
+                stream = await self.limiter.call(
+                    lambda: client.responses.create(
+                        model=self.model,
+                        tools=self.tools,
+                        instructions=self.instructions,
+                        input=question,
+                        stream=True,
+                        **thread,
+                    )
+                )
+                self.limiter.observe_headers(stream.response.headers)
+                response = None
+                async for event in stream:
+                    if event.type == "response.web_search_call.searching":
+                        await events.status("Searching the web")
+                    elif event.type == "response.web_search_call.completed":
+                        await events.status("Web search completed")
+                    elif (
+                        event.type == "response.output_item.added"
+                        and event.item.type == "reasoning"
+                    ):
+                        await events.status("Reasoning")
+                    elif event.type == "response.output_text.delta":
+                        await events.text(event.delta)
+                    elif event.type == "response.completed":
+                        response = event.response
+                    elif event.type in ("response.failed", "response.incomplete"):
+                        raise RuntimeError(
+                            f"Response {event.response.status}: {event.response.error}"
+                        )
+                if response is not None and response.usage is not None:
+                    call.set_usage(
+                        response.usage.input_tokens, response.usage.output_tokens
+                    )
+        if response is None:
+            raise RuntimeError(
+                "The response stream ended before the response completed."
+            )
+
+        total_tokens = None
+        if response.usage is not None:
+            total_tokens = response.usage.total_tokens
+            self.limiter.record_usage(self.estimated_tokens, total_tokens)
+        return BackendAnswer(
+            response.output_text, total_tokens, url_citations(response), response.id
+        )
+
+
+class BedrockBackend:
+    """Bedrock-hosted model called through the Converse API.
+
+    Bedrock models have no hosted web search tool, so answers come from the model's own
+    knowledge. This backend is meant as a fast, cheap fallback.
+    """
+
+    def __init__(
+        self, model_id: str, instructions: str, cost: float, region: str
+    ) -> None:
+        import boto3
+
+        self.name = f"bedrock:{model_id}"
+        self.model_id = model_id
+        self.tools = []
+        self.instructions = instructions
+        self.cost = cost
+        self.supports_threads = False
+        self._client = boto3.client("bedrock-runtime", region_name=region)
+
+    def _stream(
+        self,
+        question: str,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+    ) -> None:
+        try:
+            response = self._client.converse_stream(
+                modelId=self.model_id,
+                system=[{"text": self.instructions}],
+                messages=[{"role": "user", "content": [{"text": question}]}],
+            )
+            for event in response["stream"]:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    async def search(
+        self,
+        question: str,
+        events: SearchEventSink,
+        previous_response_id: str | None = None,
+    ) -> BackendAnswer:
+        if previous_response_id is not None:
+            raise ValueError(f"{self.name} cannot continue a thread.")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with metrics.upstream_call(self.name, self.model_id) as call:
+            producer = asyncio.create_task(
+                asyncio.to_thread(self._stream, question, loop, queue)
+            )
+            await events.status("Generating")
+            chunks: list[str] = []
+            total_tokens = None
+            while (event := await queue.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                if "contentBlockDelta" in event:
+                    delta = event["contentBlockDelta"]["delta"].get("text", "")
+                    chunks.append(delta)
+                    await events.text(delta)
+                elif "metadata" in event:
+                    usage = event["metadata"].get("usage", {})
+                    total_tokens = usage.get("totalTokens")
+                    call.set_usage(usage.get("inputTokens"), usage.get("outputTokens"))
+            await producer
+        return BackendAnswer("".join(chunks), total_tokens)
+
+
+def create_backends(
+    web_search_instructions: str,
+    knowledge_instructions: str,
+    limiter: UpstreamLimiter,
+    estimated_tokens: int,
+) -> list[SearchBackend]:
+    """Create the search backends configured by environment variables.
+
+    Environment variables:
+        SEARCH_BACKENDS: Comma-separated `provider:model[@cost]` entries in order of
+            preference, e.g. `openai:o3@1,openai:o4-mini@0.2,bedrock:us.amazon.nova-pro-v1:0@0.1`.
+            Providers are `openai` and `bedrock` (default: `openai:o3@1`).
+        AWS_REGION: Region of the Bedrock runtime (default: us-west-2).
+
+    Args:
+        web_search_instructions: Instructions for models with the web search tool.
+        knowledge_instructions: Instructions for models without web search.
+        limiter: Limiter shared by all OpenAI backends.
+        estimated_tokens: Tokens reserved per OpenAI call.
+
+    Returns:
+        list[SearchBackend]: The backends, primary first.
+    """
+    backends: list[SearchBackend] = []
+    for spec in os.getenv("SEARCH_BACKENDS", "openai:o3@1").split(","):
+        provider, _, model = spec.strip().partition(":")
+        model, _, cost = model.rpartition("@") if "@" in model else (model, "", "1")
+        if provider == "openai":
+            backends.append(
+                OpenAIBackend(
+                    model,
+                    web_search_instructions,
+                    float(cost),
+                    limiter,
+                    estimated_tokens,
+                )
+            )
+        elif provider == "bedrock":
+            backends.append(
+                BedrockBackend(
+                    model,
+                    knowledge_instructions,
+                    float(cost),
+                    os.getenv("AWS_REGION", "us-west-2"),
+                )
+            )
+        else:
+            raise ValueError(f"Unknown search backend provider: {provider}")
+    return backends
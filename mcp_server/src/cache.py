@@ -0,0 +1,414 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Protocol
+
+from src.backends import BackendAnswer, Citation
+from src.metrics import metrics
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so that trivially different spellings share a cache entry.
+
+    Args:
+        question (str): The raw question text.
+
+    Returns:
+        str: The NFKC-normalized, lower-cased question with collapsed whitespace.
+    """
+    question = unicodedata.normalize("NFKC", question).lower()
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def make_cache_key(question: str, model: str, tools: list, instructions: str) -> str:
+    """Build the exact-match cache key for a web search request.
+
+    Args:
+        question (str): The question text.
+        model (str): The model name.
+        tools (list): The tools passed to the Responses API.
+        instructions (str): The system instructions.
+
+    Returns:
+        str: A SHA-256 hex digest identifying the request.
+    """
+    payload = json.dumps(
+        [normalize_question(question), model, tools, instructions],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def encode_answer(answer: BackendAnswer) -> str:
+    return json.dumps(
+        {
+            "text": answer.text,
+            "citations": [[c.url, c.title] for c in answer.citations],
+            "response_id": answer.response_id,
+        },
+        ensure_ascii=False,
+    )
+
+
+def decode_answer(value: str) -> BackendAnswer:
+    """Decode a cached answer, including entries stored as plain text before citations."""
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return BackendAnswer(value)
+    if not isinstance(data, dict) or "text" not in data:
+        return BackendAnswer(value)
+    return BackendAnswer(
+        data["text"],
+        citations=[Citation(url, title) for url, title in data.get("citations", [])],
+        response_id=data.get("response_id"),
+    )
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class InMemoryBackend:
+    """Process-local LRU cache with per-entry expiry."""
+
+    def __init__(
+        self, max_entries: int = 1024, clock: Callable[[], float] = time.time
+    ) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteBackend:
+    """On-disk LRU cache stored in a single SQLite file."""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_accessed_at ON answers (accessed_at)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _get(self, key: str) -> str | None:
+        now = self.clock()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM answers WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute(
+            "UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self._conn.commit()
+        return row[0]
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = self.clock()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        self._conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM answers WHERE key IN ("
+            "SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    async def get(self, key: str) -> str | None:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class RedisBackend:
+    """Cache stored in any server speaking the Redis protocol.
+
+    Size-bounded eviction is delegated to the server's `maxmemory-policy` (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url: str, prefix: str = "o3-web-search:") -> None:
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "The redis package is required for CACHE_BACKEND=redis."
+            ) from e
+        self.prefix = prefix
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class MinHashIndex:
+    """Near-duplicate question index based on MinHash signatures with LSH banding.
+
+    Character n-grams are used as shingles so that questions written in Japanese,
+    which have no whitespace between words, are handled as well as English ones.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int = 1024,
+        num_perm: int = 64,
+        bands: int = 16,
+        ngram: int = 3,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self._signatures: OrderedDict[str, tuple[str, tuple[int, ...]]] = OrderedDict()
+        self._buckets: dict[tuple[int, tuple[int, ...]], set[str]] = {}
+
+    def _signature(self, text: str) -> tuple[int, ...]:
+        text = normalize_question(text)
+        shingles = {
+            text[i : i + self.ngram] for i in range(max(1, len(text) - self.ngram + 1))
+        }
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest())
+            for s in shingles
+        ]
+        mask = (1 << 64) - 1
+        return tuple(
+            min(
+                ((h ^ (seed * 0x9E3779B97F4A7C15)) * 0xBF58476D1CE4E5B9) & mask
+                for h in hashes
+            )
+            for seed in range(1, self.num_perm + 1)
+        )
+
+    def _band_keys(
+        self, signature: tuple[int, ...]
+    ) -> list[tuple[int, tuple[int, ...]]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str, context: str, question: str) -> None:
+        """Register the question stored under `key`.
+
+        Args:
+            key (str): The exact-match cache key.
+            context (str): Model, tools and instructions the answer was produced with.
+            question (str): The question text.
+        """
+        self.remove(key)
+        signature = self._signature(question)
+        self._signatures[key] = (context, signature)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+        while len(self._signatures) > self.max_entries:
+            self.remove(next(iter(self._signatures)))
+
+    def remove(self, key: str) -> None:
+        entry = self._signatures.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry[1]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def find(self, context: str, question: str) -> str | None:
+        """Return the key of the most similar stored question, if it is similar enough.
+
+        Args:
+            context (str): Model, tools and instructions of the current request.
+            question (str): The question text.
+
+        Returns:
+            str | None: The exact-match key of the best candidate, or None.
+        """
+        signature = self._signature(question)
+        candidates: set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        best_key, best_score = None, self.threshold
+        for key in candidates:
+            candidate_context, candidate = self._signatures[key]
+            if candidate_context != context:
+                continue
+            score = sum(a == b for a, b in zip(signature, candidate)) / self.num_perm
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is not None:
+            self._signatures.move_to_end(best_key)
+        return best_key
+
+
+class AnswerCache:
+    """Two-tier cache for web search answers: exact match first, then near-duplicates."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float,
+        near_duplicate: MinHashIndex | None = None,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.near_duplicate = near_duplicate
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    async def get(
+        self, question: str, model: str, tools: list, instructions: str
+    ) -> BackendAnswer | None:
+        key = make_cache_key(question, model, tools, instructions)
+        value = await self.backend.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            metrics.cache_lookup("exact")
+            return decode_answer(value)
+        if self.near_duplicate is not None:
+            context = make_cache_key("", model, tools, instructions)
+            near_key = self.near_duplicate.find(context, question)
+            if near_key is not None:
+                value = await self.backend.get(near_key)
+                if value is not None:
+                    self.near_hits += 1
+                    metrics.cache_lookup("near")
+                    return decode_answer(value)
+                self.near_duplicate.remove(near_key)
+        self.misses += 1
+        metrics.cache_lookup("miss")
+        return None
+
+    async def set(
+        self,
+        question: str,
+        model: str,
+        tools: list,
+        instructions: str,
+        answer: BackendAnswer,
+    ) -> None:
+        key = make_cache_key(question, model, tools, instructions)
+        await self.backend.set(key, encode_answer(answer), self.ttl)
+        if self.near_duplicate is not None:
+            context = make_cache_key("", model, tools, instructions)
+            self.near_duplicate.add(key, context, question)
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.near_hits) / lookups
+            if lookups
+            else 0.0,
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_answer_cache() -> AnswerCache | None:
+    """Create the answer cache configured by environment variables.
+
+    Environment variables:
+        CACHE_BACKEND: "memory" (default), "sqlite", "redis" or "none".
+        CACHE_TTL_SECONDS: Lifetime of a cached answer (default: 3600).
+        CACHE_MAX_ENTRIES: Maximum number of cached answers (default: 1024).
+        CACHE_SQLITE_PATH: Database file for the sqlite backend (default: answer_cache.db).
+        CACHE_REDIS_URL: Connection URL for the redis backend (default: redis://localhost:6379/0).
+        CACHE_NEAR_DUPLICATE_THRESHOLD: Estimated Jaccard similarity above which a cached
+            answer to a similar question is reused. 0 disables the tier (default: 0).
+
+    Returns:
+        AnswerCache | None: The cache, or None when caching is disabled.
+    """
+    backend_name = os.getenv("CACHE_BACKEND", "memory")
+    max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    if backend_name == "none":
+        return None
+    if backend_name == "memory":
+        backend = InMemoryBackend(max_entries)
+    elif backend_name == "sqlite":
+        backend = SQLiteBackend(
+            os.getenv("CACHE_SQLITE_PATH", "answer_cache.db"), max_entries
+        )
+    elif backend_name == "redis":
+        backend = RedisBackend(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend_name}")
+
+    threshold = float(os.getenv("CACHE_NEAR_DUPLICATE_THRESHOLD", "0"))
+    near_duplicate = MinHashIndex(threshold, max_entries) if threshold > 0 else None
+    return AnswerCache(
+        backend, float(os.getenv("CACHE_TTL_SECONDS", "3600")), near_duplicate
+    )
@@ -0,0 +1,316 @@
+import asyncio
+import base64
+import binascii
+import contextlib
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable, Mapping
+from dataclasses import dataclass, field
+
+from mcp.server.fastmcp.exceptions import ToolError
+
+from src.rate_limit import OverloadedError
+from src.router import LatencyStats
+
+# Requests without a usable JWT share this caller and are not subject to quotas.
+ANONYMOUS = "anonymous"
+
+
+class QuotaExceededError(ToolError):
+    """Raised immediately when a caller is over its own concurrency or rate quota.
+
+    Unlike OverloadedError, the server may well have capacity; this caller should slow
+    down. The message is a JSON object so that agents can parse it.
+    """
+
+    def __init__(self, caller: str, quota: str, retry_after: float) -> None:
+        self.caller = caller
+        self.quota = quota
+        self.retry_after = retry_after
+        super().__init__(
+            json.dumps(
+                {
+                    "error": "quota_exceeded",
+                    "caller": caller,
+                    "quota": quota,
+                    "retry_after": round(retry_after, 1),
+                }
+            )
+        )
+
+
+def jwt_claims(authorization: str | None) -> dict | None:
+    """Decode the claims of a bearer JWT without verifying its signature.
+
+    The AgentCore Runtime authorizer has verified the token before forwarding it, and
+    the identity is only used to share capacity, not to grant access.
+
+    Args:
+        authorization (str | None): Value of the Authorization header.
+
+    Returns:
+        dict | None: The claims, or None if there is no well-formed bearer JWT.
+    """
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    parts = token.strip().split(".")
+    if scheme.lower() != "bearer" or len(parts) != 3:
+        return None
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (binascii.Error, ValueError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def caller_identity(
+    headers: Mapping[str, str], claims: tuple[str, ...] = ("sub", "client_id")
+) -> str:
+    """Identify the caller by the first of `claims` present in its JWT."""
+    decoded = jwt_claims(headers.get("authorization")) or {}
+    for claim in claims:
+        value = decoded.get(claim)
+        if isinstance(value, str) and value:
+            return value
+    return ANONYMOUS
+
+
+@dataclass
+class CallerState:
+    weight: float
+    in_flight: int = 0
+    queued: int = 0
+    admitted: int = 0
+    rejected: dict[str, int] = field(default_factory=dict)
+    # Virtual finish time of the caller's latest request.
+    finish: float = 0.0
+    tokens: float = 0.0
+    refilled_at: float = 0.0
+    waits: LatencyStats = field(default_factory=LatencyStats)
+    durations: deque[float] = field(default_factory=lambda: deque(maxlen=20))
+
+
+class FairScheduler:
+    """Shares upstream capacity between callers with weighted fair queuing.
+
+    Each request gets a virtual finish time, the later of the scheduler's virtual clock
+    and its caller's previous finish time, plus 1 / weight. Free slots go to the
+    earliest finish time (self-clocked fair queuing), so a caller with many queued
+    requests cannot delay another caller by more than about one request per slot, and
+    a caller of weight 2 gets twice the share of one of weight 1 while both are busy.
+
+    Callers are identified by the first of `claims` in their JWT, see caller_identity().
+    Identified callers are also held to quotas. A caller with `max_concurrency` requests
+    running or queued, or without rate budget left, is rejected immediately with
+    QuotaExceededError instead of queuing; the rate budget allows bursts of a sixth of
+    `rate_per_minute`. Requests that wait longer than `max_wait` for a slot are
+    rejected with OverloadedError.
+    """
+
+    def __init__(
+        self,
+        capacity: Callable[[], int],
+        max_concurrency: int = 8,
+        rate_per_minute: float = 0,
+        max_wait: float = 30,
+        weights: dict[str, float] | None = None,
+        claims: tuple[str, ...] = ("sub", "client_id"),
+        max_callers: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.max_concurrency = max_concurrency
+        self.rate = rate_per_minute / 60
+        self.burst = max(1.0, rate_per_minute / 6)
+        self.max_wait = max_wait
+        self.weights = weights or {}
+        self.claims = claims
+        self.max_callers = max_callers
+        self.clock = clock
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._queue: list[tuple[float, int, str, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._callers: OrderedDict[str, CallerState] = OrderedDict()
+
+    def _state(self, caller: str) -> CallerState:
+        state = self._callers.get(caller)
+        if state is None:
+            state = self._callers[caller] = CallerState(
+                self.weights.get(caller, 1.0),
+                tokens=self.burst,
+                refilled_at=self.clock(),
+                waits=LatencyStats(clock=self.clock),
+            )
+            self._evict()
+        self._callers.move_to_end(caller)
+        return state
+
+    def _evict(self) -> None:
+        # Callers are ordered by last use; forget the idle ones among the oldest.
+        for caller in list(self._callers)[: len(self._callers) - self.max_callers]:
+            state = self._callers[caller]
+            if not state.in_flight and not state.queued:
+                del self._callers[caller]
+
+    def _reject(
+        self, caller: str, state: CallerState, quota: str, retry_after: float
+    ) -> QuotaExceededError:
+        state.rejected[quota] = state.rejected.get(quota, 0) + 1
+        return QuotaExceededError(caller, quota, retry_after)
+
+    def _check_quotas(self, caller: str, state: CallerState) -> None:
+        if caller == ANONYMOUS:
+            return
+        if self.max_concurrency and (
+            state.in_flight + state.queued >= self.max_concurrency
+        ):
+            durations = state.durations
+            retry_after = sum(durations) / len(durations) if durations else 1.0
+            raise self._reject(caller, state, "concurrency", retry_after)
+        if self.rate:
+            now = self.clock()
+            state.tokens = min(
+                self.burst, state.tokens + (now - state.refilled_at) * self.rate
+            )
+            state.refilled_at = now
+            if state.tokens < 1:
+                raise self._reject(
+                    caller, state, "rate", (1 - state.tokens) / self.rate
+                )
+            state.tokens -= 1
+
+    def _dispatch(self) -> None:
+        while self._queue and self.in_flight < max(1, self.capacity()):
+            finish, _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue  # Gave up waiting.
+            self._virtual_time = finish
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, caller: str) -> AsyncIterator[None]:
+        """Hold one upstream slot on behalf of `caller` for the duration of the block.
+
+        Raises:
+            QuotaExceededError: If the caller is over its concurrency or rate quota.
+            OverloadedError: If no slot frees up within `max_wait`.
+        """
+        state = self._state(caller)
+        self._check_quotas(caller, state)
+        state.finish = max(self._virtual_time, state.finish) + 1 / state.weight
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue, (state.finish, next(self._sequence), caller, waiter)
+        )
+        queued_at = self.clock()
+        state.queued += 1
+        try:
+            self._dispatch()
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the wait ended; hand the slot on.
+                self.in_flight -= 1
+                self._dispatch()
+            waiter.cancel()
+            if isinstance(e, TimeoutError):
+                raise OverloadedError("fair share queue wait", self.max_wait) from None
+            raise
+        finally:
+            state.queued -= 1
+        started_at = self.clock()
+        state.waits.record(started_at - queued_at, True)
+        state.admitted += 1
+        state.in_flight += 1
+        try:
+            yield
+        finally:
+            state.in_flight -= 1
+            state.durations.append(self.clock() - started_at)
+            self.in_flight -= 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        callers = {}
+        for caller, state in self._callers.items():
+            p50 = state.waits.percentile(0.5)
+            p95 = state.waits.percentile(0.95)
+            callers[caller] = {
+                "weight": state.weight,
+                "in_flight": state.in_flight,
+                "queued": state.queued,
+                "admitted": state.admitted,
+                "rejected": state.rejected,
+                "wait_p50_seconds": round(p50, 3) if p50 is not None else None,
+                "wait_p95_seconds": round(p95, 3) if p95 is not None else None,
+            }
+        return {
+            "capacity": self.capacity(),
+            "in_flight": self.in_flight,
+            "queued": sum(state.queued for state in self._callers.values()),
+            "callers": callers,
+        }
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """Parse "caller=weight" pairs separated by commas."""
+    weights = {}
+    for pair in value.split(","):
+        caller, _, weight = pair.strip().rpartition("=")
+        if caller:
+            weights[caller] = float(weight)
+    return weights
+
+
+def create_fair_scheduler(capacity: Callable[[], int]) -> FairScheduler | None:
+    """Create the fair scheduler of upstream calls configured by environment variables.
+
+    Args:
+        capacity (Callable[[], int]): Returns the current number of upstream slots,
+            such as the adaptive concurrency limit of the upstream limiter.
+
+    Environment variables:
+        FAIR_SHARE_ENABLED: Set to "0" to serve upstream calls in arrival order without
+            quotas (default: enabled).
+        FAIR_SHARE_IDENTITY_CLAIMS: JWT claims identifying a caller, first present wins
+            (default: sub,client_id).
+        FAIR_SHARE_WEIGHTS: Share of individual callers, e.g. "agent-a=2,agent-b=0.5";
+            others have weight 1 (default: none).
+        FAIR_SHARE_CALLER_CONCURRENCY: Upstream calls a caller may have running or
+            queued, 0 for no limit (default: 8).
+        FAIR_SHARE_CALLER_RPM: Upstream calls per minute per caller, 0 for no limit
+            (default: 0).
+        SERVER_WORKERS: Worker processes sharing the caller quotas; each enforces an
+            equal part of them (default: 1).
+        FAIR_SHARE_MAX_WAIT: Seconds a call may wait for a slot (default: 30).
+
+    Returns:
+        FairScheduler | None: The scheduler, or None when disabled.
+    """
+    if os.getenv("FAIR_SHARE_ENABLED", "1") != "1":
+        return None
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    max_concurrency = int(os.getenv("FAIR_SHARE_CALLER_CONCURRENCY", "8"))
+    return FairScheduler(
+        capacity,
+        max_concurrency=math.ceil(max_concurrency / workers),
+        rate_per_minute=float(os.getenv("FAIR_SHARE_CALLER_RPM", "0")) / workers,
+        max_wait=float(os.getenv("FAIR_SHARE_MAX_WAIT", "30")),
+        weights=parse_weights(os.getenv("FAIR_SHARE_WEIGHTS", "")),
+        claims=tuple(
+            claim.strip()
+            for claim in os.getenv("FAIR_SHARE_IDENTITY_CLAIMS", "sub,client_id").split(
+                ","
+            )
+            if claim.strip()
+        ),
+    )
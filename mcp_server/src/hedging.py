@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from src.backends import SearchBackend, SearchEventSink
+from src.router import LatencyStats
+
+T = TypeVar("T")
+
+
+class DiscardEvents:
+    """Event sink for hedge requests, whose partial output must not interleave with the primary's."""
+
+    async def status(self, message: str) -> None:
+        pass
+
+    async def text(self, delta: str) -> None:
+        pass
+
+
+class Hedger:
+    """Fires a second request when the first one is slower than usual.
+
+    The hedge delay is the configured percentile of recent latencies of the primary
+    backend. The fraction of requests that may be hedged is capped so that upstream spend
+    stays bounded. Whichever request finishes first wins and the other is cancelled.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        max_rate: float,
+        min_samples: int = 20,
+        window: int = 200,
+        target: str = "same",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.window = window
+        self.target = target
+        self.clock = clock
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: dict[str, LatencyStats] = {}
+        self._recent_hedges: deque[bool] = deque(maxlen=window)
+
+    def hedge_delay(self, backend: SearchBackend) -> float | None:
+        stats = self._latencies.get(backend.name)
+        if stats is None or stats.samples < self.min_samples:
+            return None
+        return stats.percentile(self.percentile)
+
+    def _may_hedge(self) -> bool:
+        if not self._recent_hedges:
+            return self.max_rate > 0
+        return sum(self._recent_hedges) / len(self._recent_hedges) < self.max_rate
+
+    def _record(self, backend: SearchBackend, started_at: float) -> None:
+        stats = self._latencies.setdefault(
+            backend.name, LatencyStats(self.window, clock=self.clock)
+        )
+        stats.record(self.clock() - started_at, True)
+
+    def hedge_backend(
+        self, plan: list[SearchBackend], primary: SearchBackend
+    ) -> SearchBackend:
+        if self.target == "next":
+            index = plan.index(primary) if primary in plan else 0
+            if index + 1 < len(plan):
+                return plan[index + 1]
+        return primary
+
+    async def call(
+        self,
+        plan: list[SearchBackend],
+        primary: SearchBackend,
+        events: SearchEventSink,
+        fn: Callable[[SearchBackend, SearchEventSink], Awaitable[T]],
+    ) -> tuple[SearchBackend, T]:
+        """Call `fn` with `primary`, hedging with a second call if it is slow.
+
+        Args:
+            plan: The routing plan, used to choose a cheaper hedge backend.
+            primary: The backend of the first request.
+            events: Receives the progress of the first request.
+            fn: Performs the request against a backend.
+
+        Returns:
+            tuple[SearchBackend, T]: The backend and result of the request that finished
+                first.
+        """
+        self.requests += 1
+        started_at = self.clock()
+        first = asyncio.ensure_future(fn(primary, events))
+        second: asyncio.Future[T] | None = None
+        # Everything after the first request is started runs under the finally, so that
+        # a cancelled tool call, e.g. after a client disconnect, cancels it as well.
+        try:
+            delay = self.hedge_delay(primary)
+            if delay is None or not self._may_hedge():
+                self._recent_hedges.append(False)
+                result = await first
+                self._record(primary, started_at)
+                return primary, result
+
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                self._recent_hedges.append(False)
+                result = first.result()
+                self._record(primary, started_at)
+                return primary, result
+
+            self.hedges += 1
+            self._recent_hedges.append(True)
+            hedge_backend = self.hedge_backend(plan, primary)
+            await events.status(f"Hedging with {hedge_backend.name}")
+            second = asyncio.ensure_future(fn(hedge_backend, DiscardEvents()))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        # When the hedge wins, the elapsed time is a lower bound of the
+                        # primary's latency and still belongs in its distribution.
+                        self._record(primary, started_at)
+                        if task is second:
+                            self.hedge_wins += 1
+                            return hedge_backend, task.result()
+                        return primary, task.result()
+            # Both failed: surface the primary's error.
+            return primary, first.result()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+                    with contextlib.suppress(BaseException):
+                        await task
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+        }
+
+
+def create_hedger() -> Hedger | None:
+    """Create the hedger configured by environment variables.
+
+    Environment variables:
+        HEDGE_ENABLED: Set to "1" to hedge slow requests (default: disabled).
+        HEDGE_PERCENTILE: Percentile of recent latencies after which to hedge (default: 0.95).
+        HEDGE_MAX_RATE: Maximum fraction of requests that may be hedged (default: 0.05).
+        HEDGE_MIN_SAMPLES: Completed requests needed before hedging starts (default: 20).
+        HEDGE_TARGET: "same" to repeat the request on the same backend, or "next" to use
+            the next backend of the routing plan, e.g. a cheaper model (default: same).
+
+    Returns:
+        Hedger | None: The hedger, or None when hedging is disabled.
+    """
+    if os.getenv("HEDGE_ENABLED", "0") != "1":
+        return None
+    return Hedger(
+        percentile=float(os.getenv("HEDGE_PERCENTILE", "0.95")),
+        max_rate=float(os.getenv("HEDGE_MAX_RATE", "0.05")),
+        min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+        target=os.getenv("HEDGE_TARGET", "same"),
+    )
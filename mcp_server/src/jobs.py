@@ -0,0 +1,357 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any, Protocol
+
+from src.rate_limit import OverloadedError
+
+FINISHED = ("succeeded", "failed")
+
+
+def current_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner: str) -> bool:
+    """Whether the process that owns a job may still be running it.
+
+    Only processes on this host can be checked; owners on other hosts are assumed alive.
+    """
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+@dataclass
+class Job:
+    id: str
+    arguments: dict[str, Any]
+    owner: str
+    expires_at: float
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: str | None = None
+    error: str | None = None
+
+
+class JobStore(Protocol):
+    async def put(self, job: Job) -> None: ...
+
+    async def get(self, job_id: str) -> Job | None: ...
+
+    async def unfinished(self) -> list[Job]: ...
+
+    async def purge(self) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+class InMemoryJobStore:
+    """Process-local job store; jobs are lost when the process exits."""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._jobs: dict[str, Job] = {}
+
+    async def put(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    async def get(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None or job.expires_at <= self.clock():
+            return None
+        return job
+
+    async def unfinished(self) -> list[Job]:
+        return []
+
+    async def purge(self) -> int:
+        now = self.clock()
+        expired = [job.id for job in self._jobs.values() if job.expires_at <= now]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    async def close(self) -> None:
+        self._jobs.clear()
+
+
+class SQLiteJobStore:
+    """Job store in a SQLite file, shared by the workers on one host and kept across restarts."""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _put(self, job: Job) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)",
+            (job.id, job.status, job.expires_at, json.dumps(asdict(job))),
+        )
+        self._conn.commit()
+
+    def _get(self, job_id: str) -> Job | None:
+        row = self._conn.execute(
+            "SELECT data FROM jobs WHERE id = ? AND expires_at > ?",
+            (job_id, self.clock()),
+        ).fetchone()
+        return Job(**json.loads(row[0])) if row is not None else None
+
+    def _unfinished(self) -> list[Job]:
+        rows = self._conn.execute(
+            "SELECT data FROM jobs WHERE status NOT IN (?, ?) AND expires_at > ?",
+            (*FINISHED, self.clock()),
+        ).fetchall()
+        return [Job(**json.loads(row[0])) for row in rows]
+
+    def _purge(self) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM jobs WHERE expires_at <= ?", (self.clock(),)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    async def put(self, job: Job) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._put, job)
+
+    async def get(self, job_id: str) -> Job | None:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, job_id)
+
+    async def unfinished(self) -> list[Job]:
+        async with self._lock:
+            return await asyncio.to_thread(self._unfinished)
+
+    async def purge(self) -> int:
+        async with self._lock:
+            return await asyncio.to_thread(self._purge)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class JobRunner:
+    """Runs submitted jobs on a fixed number of worker tasks and keeps their results.
+
+    Submitting returns as soon as the job is stored, so callers do not hold a connection
+    open while it runs. At most `max_queued` jobs wait for a worker; further submissions
+    are rejected as overloaded. Results are kept for `ttl` seconds after the job finishes.
+    With a persistent store, jobs left unfinished by a process that exited are picked up
+    again when the next process starts.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: Callable[[dict[str, Any]], Awaitable[str]],
+        workers: int = 4,
+        max_queued: int = 100,
+        ttl: float = 3600,
+        poll_interval: float = 0.5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.owner = current_owner()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+        self.running = 0
+        # Unbounded so that recovered jobs always fit; `submit` enforces `max_queued`.
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._finished: dict[str, asyncio.Event] = {}
+        self._durations: list[float] = []
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Pick up orphaned jobs and start the workers and the expiry of old results."""
+        for job in await self.store.unfinished():
+            if owner_alive(job.owner):
+                continue
+            job.owner, job.status, job.started_at = self.owner, "queued", None
+            await self.store.put(job)
+            self._enqueue(job.id)
+            self.recovered += 1
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.workers)
+        ] + [asyncio.create_task(self._purge())]
+
+    def _enqueue(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+        self._finished[job_id] = asyncio.Event()
+
+    def _retry_after(self) -> float:
+        if not self._durations:
+            return 1.0
+        mean = sum(self._durations) / len(self._durations)
+        return mean * self._queue.qsize() / max(1, self.workers)
+
+    async def submit(self, arguments: dict[str, Any]) -> Job:
+        """Store a job and queue it for a worker.
+
+        Args:
+            arguments (dict[str, Any]): Arguments passed to the handler.
+
+        Returns:
+            Job: The queued job.
+        """
+        if self._queue.qsize() >= self.max_queued:
+            raise OverloadedError("job_queue_full", self._retry_after())
+        job = Job(
+            id=uuid.uuid4().hex,
+            arguments=arguments,
+            owner=self.owner,
+            expires_at=self.clock() + self.ttl,
+            created_at=self.clock(),
+        )
+        await self.store.put(job)
+        self._enqueue(job.id)
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        return await self.store.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Job | None:
+        """Return the job once it finished or `timeout` seconds passed, whichever is first.
+
+        Jobs run by another worker process sharing the store are polled.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in FINISHED or remaining <= 0:
+                return job
+            finished = self._finished.get(job_id)
+            with contextlib.suppress(TimeoutError):
+                if finished is not None:
+                    await asyncio.wait_for(finished.wait(), remaining)
+                else:
+                    await asyncio.sleep(min(remaining, self.poll_interval))
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = await self.store.get(job_id)
+            if job is None:
+                self._finished.pop(job_id, None)
+                continue
+            job.status, job.started_at = "running", self.clock()
+            await self.store.put(job)
+            self.running += 1
+            try:
+                job.result = await self.handler(job.arguments)
+                job.status = "succeeded"
+                self.succeeded += 1
+            except Exception as e:
+                job.status, job.error = "failed", str(e)
+                self.failed += 1
+            finally:
+                self.running -= 1
+            job.finished_at = self.clock()
+            job.expires_at = job.finished_at + self.ttl
+            await self.store.put(job)
+            self._durations = [*self._durations[-99:], job.finished_at - job.started_at]
+            self._finished.pop(job_id).set()
+
+    async def _purge(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.ttl))
+            await self.store.purge()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+        }
+
+    async def close(self) -> None:
+        """Stop the workers; with a persistent store their jobs resume after a restart."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.store.close()
+
+
+def create_job_runner(handler: Callable[[dict[str, Any]], Awaitable[str]]) -> JobRunner:
+    """Create the background job runner configured by environment variables.
+
+    Environment variables:
+        JOB_STORE: "memory" or "sqlite" (default: "sqlite" with more than one
+            SERVER_WORKERS, otherwise "memory"). The memory store cannot be used with
+            several workers, since a job is only known to the worker it was submitted
+            to.
+        JOB_SQLITE_PATH: Database file for the sqlite store (default: jobs.db).
+        JOB_WORKERS: Jobs run concurrently per server worker (default: 4).
+        JOB_MAX_QUEUED: Jobs waiting for a worker before submissions are rejected
+            (default: 100).
+        JOB_TTL_SECONDS: Lifetime of a job and its result after it finished
+            (default: 3600).
+
+    Args:
+        handler: Runs one job from its arguments and returns its result.
+
+    Returns:
+        JobRunner: The runner, not yet started.
+    """
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    store_name = os.getenv("JOB_STORE", "sqlite" if workers > 1 else "memory")
+    if store_name == "memory":
+        if workers > 1:
+            raise ValueError(
+                f"JOB_STORE=memory cannot be shared by {workers} SERVER_WORKERS; "
+                "use JOB_STORE=sqlite."
+            )
+        store = InMemoryJobStore()
+    elif store_name == "sqlite":
+        store = SQLiteJobStore(os.getenv("JOB_SQLITE_PATH", "jobs.db"))
+    else:
+        raise ValueError(f"Unknown JOB_STORE: {store_name}")
+    return JobRunner(
+        store,
+        handler,
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_queued=int(os.getenv("JOB_MAX_QUEUED", "100")),
+        ttl=float(os.getenv("JOB_TTL_SECONDS", "3600")),
+    )
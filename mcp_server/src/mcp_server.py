@@ -1,43 +1,662 @@
-from mcp.server.fastmcp import FastMCP
-from openai import OpenAI
-from pydantic import Field
+import asyncio
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+import uvicorn
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+from mcp.types import EmbeddedResource
+from pydantic import BaseModel, Field
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from src.answer_index import AnswerIndex, create_answer_index
+from src.backends import BackendAnswer, SearchBackend, create_backends
+from src.cache import AnswerCache, create_answer_cache, make_cache_key
+from src.fair_share import (
+    ANONYMOUS,
+    QuotaExceededError,
+    caller_identity,
+    create_fair_scheduler,
+)
+from src.hedging import create_hedger
+from src.jobs import Job, JobRunner, create_job_runner
+from src.metrics import metrics
+from src.openai_client import close_openai_client
+from src.popular import REFRESH_CALLER, PopularAnswers, create_popular_answers
+from src.progress import ProgressHub, SearchProgress
+from src.rate_limit import OverloadedError, create_upstream_limiter
+from src.router import create_backend_router
+from src.shaping import ResponseFormat, gzip_payload, shape_answer, truncate
+from src.singleflight import SingleFlight
+from src.threads import ThreadTable, create_thread_table
 
 INSTRUCTIONS = """
 - You must answer the question using web_search tool.
 - You must respond in japanese.
 """
+KNOWLEDGE_INSTRUCTIONS = """
+- You must answer the question from your own knowledge; you cannot search the web.
+- Mention that the answer may not reflect the latest information.
+- You must respond in japanese.
+"""
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "5"))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "300"))
+ESTIMATED_TOKENS = int(os.getenv("OPENAI_ESTIMATED_TOKENS", "4000"))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "60"))
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
 
 mcp = FastMCP(name="openai-web-search-mcp-server", host="0.0.0.0", stateless_http=True)
+answer_cache: AnswerCache | None = None
+answer_index: AnswerIndex | None = None
+popular_answers: PopularAnswers | None = None
+job_runner: JobRunner | None = None
+thread_table: ThreadTable | None = None
+in_flight_searches: SingleFlight[BackendAnswer] = SingleFlight(
+    int(os.getenv("SINGLE_FLIGHT_MAX_WAITERS", "100"))
+)
+search_progress = ProgressHub(
+    chunk_chars=int(os.getenv("STREAM_CHUNK_CHARS", "200")),
+    chunk_interval=float(os.getenv("STREAM_CHUNK_INTERVAL", "0.5")),
+)
+upstream_limiter = create_upstream_limiter()
+backend_router = create_backend_router(
+    create_backends(
+        INSTRUCTIONS, KNOWLEDGE_INSTRUCTIONS, upstream_limiter, ESTIMATED_TOKENS
+    )
+)
+hedger = create_hedger()
+# Upstream calls are shared fairly between callers within the adaptive upstream limit.
+fair_scheduler = create_fair_scheduler(lambda: int(upstream_limiter.concurrency.limit))
 
 
-@mcp.tool()
-def openai_o3_web_search(
+def request_caller(ctx: Context | None) -> str:
+    """Identify the caller of a tool from the JWT forwarded by AgentCore Runtime."""
+    if ctx is None or fair_scheduler is None:
+        return ANONYMOUS
+    try:
+        request = ctx.request_context.request
+    except ValueError:
+        return ANONYMOUS
+    if request is None:
+        return ANONYMOUS
+    return caller_identity(request.headers, fair_scheduler.claims)
+
+
+def upstream_busy() -> bool:
+    """Whether live searches use all upstream slots, so no background refresh starts."""
+    concurrency = upstream_limiter.concurrency
+    if fair_scheduler is not None:
+        in_use = fair_scheduler.in_flight
+    else:
+        in_use = concurrency.in_flight + concurrency.queued
+    return in_use >= int(concurrency.limit)
+
+
+def upstream_slot(caller: str) -> contextlib.AbstractAsyncContextManager[None]:
+    if fair_scheduler is None:
+        return contextlib.nullcontext()
+    return fair_scheduler.slot(caller)
+
+
+async def web_search(
+    question: str,
+    progress: SearchProgress | None = None,
+    max_latency: float | None = None,
+    max_cost: float | None = None,
+    caller: str = ANONYMOUS,
+) -> BackendAnswer:
+    """Answer a question with o3 and web search, serving repeated questions from the cache.
+
+    The backend is chosen by the router from the latency and cost budget. Concurrent
+    calls for the same question share a single upstream request, and each caller
+    receives the progress of that request. Once the answer to a popular question has
+    expired from the cache, the popular-answer store serves it stale, with its age set,
+    while it is refreshed in the background.
+
+    Args:
+        question: The search question to perform.
+        progress: Receives progress and partial output while the search runs.
+        max_latency: Latency budget in seconds.
+        max_cost: Cost budget relative to the backend costs.
+        caller: Identity whose fair share and quotas a cache miss is charged to.
+
+    Returns:
+        BackendAnswer: The answer text and the URLs it cites.
+    """
+    plan = backend_router.plan(max_latency, max_cost)
+    primary = plan[0]
+    key = make_cache_key(question, primary.name, primary.tools, primary.instructions)
+    if popular_answers is not None:
+        popular_answers.record(
+            key, question, lambda: refresh_answer(question, key, max_latency, max_cost)
+        )
+    if answer_cache is not None:
+        cached = await answer_cache.get(
+            question, primary.name, primary.tools, primary.instructions
+        )
+        if cached is not None:
+            return cached
+    if popular_answers is not None:
+        kept = popular_answers.get(key)
+        if kept is not None:
+            return kept
+
+    if progress is not None:
+        search_progress.subscribe(key, progress)
+    try:
+        answer = await in_flight_searches.do(
+            key, lambda: fetch_answer(question, key, plan, caller)
+        )
+    finally:
+        if progress is not None:
+            search_progress.unsubscribe(key, progress)
+    if popular_answers is not None:
+        popular_answers.store(key, answer)
+    return answer
+
+
+async def refresh_answer(
+    question: str, key: str, max_latency: float | None, max_cost: float | None
+) -> BackendAnswer:
+    """Fetch a fresh answer to a popular question in the background.
+
+    Args:
+        question: The search question to perform.
+        key: The cache key the question was asked under.
+        max_latency: Latency budget the question was asked with.
+        max_cost: Cost budget the question was asked with.
+
+    Returns:
+        BackendAnswer: The answer text and the URLs it cites.
+    """
+    plan = backend_router.plan(max_latency, max_cost)
+    return await in_flight_searches.do(
+        key, lambda: fetch_answer(question, key, plan, REFRESH_CALLER)
+    )
+
+
+async def fetch_answer(
+    question: str, key: str, plan: list[SearchBackend], caller: str = ANONYMOUS
+) -> BackendAnswer:
+    """Get the answer from the planned backends, forwarding progress, and store it.
+
+    Args:
+        question: The search question to perform.
+        key: The cache key of the question, used to address progress listeners.
+        plan: Backends to try in order.
+        caller: Identity the upstream call is scheduled for.
+
+    Returns:
+        BackendAnswer: The answer text and the URLs it cites.
+    """
+    events = search_progress.events(key)
+
+    async def on_fallback(backend: SearchBackend) -> None:
+        await events.status(f"Falling back to {backend.name}")
+
+    async def attempt(backend: SearchBackend) -> tuple[SearchBackend, BackendAnswer]:
+        if hedger is not None and backend is plan[0]:
+            return await hedger.call(
+                plan, backend, events, lambda b, sink: b.search(question, sink)
+            )
+        return backend, await backend.search(question, events)
+
+    async with upstream_slot(caller):
+        _, (backend, answer) = await backend_router.call(plan, attempt, on_fallback)
+    await events.flush()
+    if answer_cache is not None:
+        await answer_cache.set(
+            question, backend.name, backend.tools, backend.instructions, answer
+        )
+    if answer_index is not None:
+        await answer_index.add(question, backend.name, answer)
+    return answer
+
+
+async def continue_thread(
+    question: str,
+    previous_response_id: str,
+    progress: SearchProgress | None = None,
+    max_latency: float | None = None,
+    max_cost: float | None = None,
+    caller: str = ANONYMOUS,
+) -> BackendAnswer:
+    """Answer a follow-up question chained to an earlier answer.
+
+    The answer depends on the earlier turns, so it is neither cached nor shared with
+    concurrent calls, and only backends that can continue a thread are tried.
+
+    Args:
+        question: The follow-up question.
+        previous_response_id: Upstream ID of the answer to continue from.
+        progress: Receives progress and partial output while the search runs.
+        max_latency: Latency budget in seconds.
+        max_cost: Cost budget relative to the backend costs.
+        caller: Identity the upstream call is scheduled for.
+
+    Returns:
+        BackendAnswer: The answer text and the URLs it cites.
+    """
+    plan = [
+        backend
+        for backend in backend_router.plan(max_latency, max_cost)
+        if backend.supports_threads
+    ]
+    if not plan:
+        # The cost budget rules out every backend that can continue the thread.
+        plan = [
+            backend for backend in backend_router.backends if backend.supports_threads
+        ]
+    key = f"thread:{uuid.uuid4().hex}"
+    events = search_progress.events(key)
+
+    async def on_fallback(backend: SearchBackend) -> None:
+        await events.status(f"Falling back to {backend.name}")
+
+    if progress is not None:
+        search_progress.subscribe(key, progress)
+    try:
+        async with upstream_slot(caller):
+            _, answer = await backend_router.call(
+                plan,
+                lambda backend: backend.search(question, events, previous_response_id),
+                on_fallback,
+            )
+        await events.flush()
+        return answer
+    finally:
+        if progress is not None:
+            search_progress.unsubscribe(key, progress)
+
+
+# Unstructured output only: FastMCP would otherwise send the answer a second time as
+# structured content.
+@mcp.tool(structured_output=False)
+@metrics.instrument_tool
+async def openai_o3_web_search(
     question: str = Field(
         description="""Question text to send to OpenAI o3. It supports natural language queries.
         Write in Japanese. Be direct and specific about your requirements.
         Avoid chain-of-thought instructions like "think step by step" as o3 handles reasoning internally."""
     ),
-) -> str:
+    thread_id: str | None = Field(
+        None,
+        description="""Optional thread_id returned with an earlier answer, to ask a follow-up question.
+        o3 keeps the earlier questions, answers and search results of the thread, so ask only what is new
+        instead of restating the context.""",
+    ),
+    max_latency_seconds: float | None = Field(
+        None,
+        description="""Optional latency budget in seconds. When o3 is currently slower than this,
+        a faster model is used instead.""",
+    ),
+    max_cost: float | None = Field(
+        None,
+        description="""Optional cost budget relative to o3 (1.0). Lower values allow only cheaper models.""",
+    ),
+    response_format: ResponseFormat = Field(
+        "text",
+        description=""""text" returns the answer as is. "structured" returns JSON with the answer,
+        the cited URLs and a confidence between 0 and 1. "citations" returns only the cited URLs
+        and the confidence.""",
+    ),
+    max_chars: int | None = Field(
+        None,
+        gt=0,
+        description="""Optional maximum length of the answer in characters. Longer answers are cut
+        at a sentence end and marked with "…".""",
+    ),
+    max_tokens: int | None = Field(
+        None,
+        gt=0,
+        description="""Optional maximum length of the answer in (estimated) tokens.""",
+    ),
+    compress: bool = Field(
+        False,
+        description="""Return large results as a gzip-compressed, base64-encoded embedded resource.
+        Only for programmatic callers that decode it.""",
+    ),
+    ctx: Context = None,
+) -> str | EmbeddedResource | list[str | EmbeddedResource]:
     """An AI agent with advanced web search capabilities. Useful for finding the latest information,
     troubleshooting errors, and discussing ideas or design challenges. Supports natural language queries.
 
     Args:
         question: The search question to perform.
+        thread_id: Thread of an earlier answer to continue.
+        max_latency_seconds: Latency budget used to choose the model.
+        max_cost: Cost budget used to choose the model.
+        response_format: Shape of the result.
+        max_chars: Character budget of the answer.
+        max_tokens: Token budget of the answer.
+        compress: Whether to gzip large results.
+        ctx: The MCP request context, used to stream progress and partial output and
+            to identify the caller.
 
     Returns:
-        str: The search results with advanced reasoning and analysis.
+        str | EmbeddedResource | list[str | EmbeddedResource]: The search results with
+            advanced reasoning and analysis, followed by the age of the answer when an
+            older answer was served while a fresh one is fetched, and by the thread_id
+            for follow-up questions when the model supports them.
     """
+    thread = None
+    if thread_id is not None:
+        thread = await thread_table.get(thread_id) if thread_table is not None else None
+        if thread is None:
+            raise ToolError(
+                json.dumps({"error": "unknown_thread", "thread_id": thread_id})
+            )
+    caller = request_caller(ctx)
     try:
-        client = OpenAI()
-        response = client.responses.create(
-            model="o3",
-            tools=[{"type": "web_search_preview"}],
-            instructions=INSTRUCTIONS,
-            input=question,
-        )
-        return response.output_text
+        if thread is None:
+            answer = await web_search(
+                question, SearchProgress(ctx), max_latency_seconds, max_cost, caller
+            )
+        else:
+            answer = await continue_thread(
+                question,
+                thread.response_id,
+                SearchProgress(ctx),
+                max_latency_seconds,
+                max_cost,
+                caller,
+            )
+    except (OverloadedError, QuotaExceededError):
+        raise
     except Exception as e:
         return f"Error occurred: {str(e)}"
+    payload = shape_answer(answer, response_format, max_chars, max_tokens)
+    if compress:
+        payload = gzip_payload(payload, response_format, RESPONSE_GZIP_MIN_BYTES)
+    notes = []
+    if answer.age is not None:
+        notes.append(f"stale_answer_age_seconds: {round(answer.age)}")
+    if thread_table is not None and answer.response_id is not None:
+        if thread is None:
+            thread_id = await thread_table.start(answer.response_id)
+        else:
+            await thread_table.advance(thread_id, thread, answer.response_id)
+        notes.append(f"thread_id: {thread_id}")
+    return [payload, *notes] if notes else payload
+
+
+class SearchResult(BaseModel):
+    question: str
+    answer: str | None = None
+    # Set when an older answer was served while a fresh one is fetched.
+    age_seconds: float | None = None
+    error: str | None = None
+
+
+@mcp.tool()
+@metrics.instrument_tool
+async def openai_o3_web_search_batch(
+    questions: list[str] = Field(
+        description=f"""Up to {BATCH_MAX_QUESTIONS} independent question texts to send to OpenAI o3 at once.
+        Each question follows the same guidelines as openai_o3_web_search."""
+    ),
+    ctx: Context = None,
+) -> list[SearchResult]:
+    """Run several web searches concurrently. Use this instead of calling openai_o3_web_search
+    repeatedly when you need multiple related lookups.
+
+    Args:
+        questions: The search questions to perform.
+        ctx: The MCP request context, used to report how many questions are done and
+            to identify the caller.
+
+    Returns:
+        list[SearchResult]: One result per question in input order, each with either an
+            answer or an error.
+    """
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise ToolError(
+            f"At most {BATCH_MAX_QUESTIONS} questions can be sent in one batch."
+        )
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    progress = SearchProgress(ctx)
+    caller = request_caller(ctx)
+    done = 0
+
+    async def search(question: str) -> SearchResult:
+        nonlocal done
+        async with semaphore:
+            try:
+                answer = await asyncio.wait_for(
+                    web_search(question, caller=caller), timeout=BATCH_ITEM_TIMEOUT
+                )
+                result = SearchResult(
+                    question=question,
+                    answer=answer.text,
+                    age_seconds=round(answer.age) if answer.age is not None else None,
+                )
+            except TimeoutError:
+                result = SearchResult(
+                    question=question,
+                    error=f"Timed out after {BATCH_ITEM_TIMEOUT:g} seconds",
+                )
+            except Exception as e:
+                result = SearchResult(question=question, error=str(e))
+        done += 1
+        if progress.enabled:
+            with contextlib.suppress(Exception):
+                await progress.status(f"Completed {done}/{len(questions)} questions")
+        return result
+
+    return await asyncio.gather(*(search(question) for question in questions))
+
+
+class PreviousAnswer(BaseModel):
+    question: str
+    answer: str
+    urls: list[str]
+    backend: str
+    age_seconds: float
+    score: float
+
+
+@mcp.tool()
+@metrics.instrument_tool
+async def search_previous_answers(
+    query: str = Field(
+        description="""Keywords, a URL or a question to look up in the answers the server
+        already gave. Japanese works as well; words need at least three characters."""
+    ),
+    limit: int = Field(5, ge=1, le=20, description="Maximum number of answers."),
+    max_age_hours: float | None = Field(
+        None, gt=0, description="Only return answers given within this many hours."
+    ),
+    max_chars: int | None = Field(
+        1000, ge=1, description="Cut each answer to this many characters."
+    ),
+) -> list[PreviousAnswer]:
+    """Search the answers earlier web searches returned, in milliseconds and at no cost.
+    Call this before openai_o3_web_search to check whether the question was already
+    answered recently.
+
+    Args:
+        query: The keywords or question.
+        limit: Maximum number of answers.
+        max_age_hours: Only answers newer than this.
+        max_chars: Maximum length of each answer.
+
+    Returns:
+        list[PreviousAnswer]: Matching answers, best match first, with the URLs they
+            cite and how old they are.
+    """
+    if answer_index is None:
+        raise ToolError("The answer index is disabled.")
+    max_age = max_age_hours * 3600 if max_age_hours is not None else None
+    now = time.time()
+    return [
+        PreviousAnswer(
+            question=match.question,
+            answer=truncate(match.answer, max_chars)[0],
+            urls=[citation.url for citation in match.citations],
+            backend=match.backend,
+            age_seconds=round(now - match.created_at),
+            score=round(match.score, 3),
+        )
+        for match in await answer_index.search(query, limit, max_age)
+    ]
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+
+
+def job_info(job: Job) -> JobInfo:
+    return JobInfo(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+    )
+
+
+async def run_search_job(arguments: dict) -> str:
+    """Run a job submitted with `submit_web_search` and return its shaped answer."""
+    answer = await web_search(
+        arguments["question"],
+        max_latency=arguments.get("max_latency_seconds"),
+        max_cost=arguments.get("max_cost"),
+        caller=arguments.get("caller", ANONYMOUS),
+    )
+    return shape_answer(
+        answer,
+        arguments.get("response_format", "text"),
+        arguments.get("max_chars"),
+        arguments.get("max_tokens"),
+    )
+
+
+async def find_job(job_id: str, wait_seconds: float = 0) -> Job:
+    if job_runner is None:
+        raise ToolError("The job runner is not running.")
+    job = await job_runner.wait(job_id, min(wait_seconds, JOB_MAX_WAIT_SECONDS))
+    if job is None:
+        raise ToolError(json.dumps({"error": "unknown_job", "job_id": job_id}))
+    return job
+
+
+@mcp.tool()
+@metrics.instrument_tool
+async def submit_web_search(
+    question: str = Field(
+        description="""Question text to send to OpenAI o3, following the same guidelines as
+        openai_o3_web_search."""
+    ),
+    max_latency_seconds: float | None = Field(
+        None, description="""Optional latency budget in seconds."""
+    ),
+    max_cost: float | None = Field(
+        None, description="""Optional cost budget relative to o3 (1.0)."""
+    ),
+    response_format: ResponseFormat = Field(
+        "text", description="""Shape of the result, as for openai_o3_web_search."""
+    ),
+    max_chars: int | None = Field(
+        None,
+        gt=0,
+        description="""Optional maximum length of the answer in characters.""",
+    ),
+    max_tokens: int | None = Field(
+        None, gt=0, description="""Optional maximum length of the answer in tokens."""
+    ),
+    ctx: Context = None,
+) -> JobInfo:
+    """Start a web search in the background and return its job ID immediately. Use this
+    for several searches at once or when you have other work to do meanwhile, then fetch
+    the answer with get_job_result.
+
+    Args:
+        question: The search question to perform.
+        max_latency_seconds: Latency budget used to choose the model.
+        max_cost: Cost budget used to choose the model.
+        response_format: Shape of the result.
+        max_chars: Character budget of the answer.
+        max_tokens: Token budget of the answer.
+        ctx: The MCP request context, used to identify the caller.
+
+    Returns:
+        JobInfo: The queued job.
+    """
+    if job_runner is None:
+        raise ToolError("The job runner is not running.")
+    job = await job_runner.submit(
+        {
+            "question": question,
+            "max_latency_seconds": max_latency_seconds,
+            "max_cost": max_cost,
+            "response_format": response_format,
+            "max_chars": max_chars,
+            "max_tokens": max_tokens,
+            "caller": request_caller(ctx),
+        }
+    )
+    return job_info(job)
+
+
+@mcp.tool()
+@metrics.instrument_tool
+async def get_job_status(
+    job_id: str = Field(description="The job ID returned by submit_web_search."),
+) -> JobInfo:
+    """Return whether a background web search is queued, running, succeeded or failed.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        JobInfo: The job.
+    """
+    return job_info(await find_job(job_id))
+
+
+@mcp.tool(structured_output=False)
+@metrics.instrument_tool
+async def get_job_result(
+    job_id: str = Field(description="The job ID returned by submit_web_search."),
+    wait_seconds: float = Field(
+        0,
+        ge=0,
+        description=f"""Seconds to wait for the job to finish before returning, at most
+        {JOB_MAX_WAIT_SECONDS:g}. 0 returns immediately.""",
+    ),
+) -> str:
+    """Return the answer of a background web search. Fails with "not_finished" if the job
+    is still queued or running after waiting.
+
+    Args:
+        job_id: The job ID.
+        wait_seconds: How long to wait for the job to finish.
+
+    Returns:
+        str: The answer, shaped as requested on submission.
+    """
+    job = await find_job(job_id, wait_seconds)
+    if job.status == "failed":
+        raise ToolError(json.dumps({"error": "job_failed", "reason": job.error}))
+    if job.status != "succeeded":
+        raise ToolError(json.dumps({"error": "not_finished", "status": job.status}))
+    return job.result
 
 
 @mcp.tool()
@@ -51,5 +670,177 @@ def greet_user(
     return f"Hello, {name}! Nice to meet you. This is a test message."
 
 
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> Response:
+    """Serve metrics in the Prometheus text format when METRICS_PROMETHEUS=1."""
+    if not metrics.prometheus_enabled:
+        return Response("Prometheus metrics are disabled.", status_code=404)
+    content, media_type = metrics.prometheus_exposition()
+    return Response(content, media_type=media_type)
+
+
+@mcp.custom_route("/router/stats", methods=["GET"])
+async def router_stats(request: Request) -> JSONResponse:
+    """Return rolling latency and error statistics of each search backend."""
+    return JSONResponse(
+        {
+            "backends": backend_router.snapshot(),
+            "hedging": hedger.snapshot() if hedger is not None else None,
+        }
+    )
+
+
+@mcp.custom_route("/jobs/stats", methods=["GET"])
+async def jobs_stats(request: Request) -> JSONResponse:
+    """Return queue depth and outcome counters of the background jobs."""
+    if job_runner is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **job_runner.stats()})
+
+
+@mcp.custom_route("/callers/stats", methods=["GET"])
+async def callers_stats(request: Request) -> JSONResponse:
+    """Return the queue depth, wait times and rejections of each caller."""
+    if fair_scheduler is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **fair_scheduler.stats()})
+
+
+@mcp.custom_route("/threads/stats", methods=["GET"])
+async def threads_stats(request: Request) -> JSONResponse:
+    """Return the number of open threads and how many were continued or dropped."""
+    if thread_table is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **await thread_table.stats()})
+
+
+@mcp.custom_route("/answers/stats", methods=["GET"])
+async def answers_stats(request: Request) -> JSONResponse:
+    """Return the size and activity of the index of past answers."""
+    if answer_index is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **await answer_index.stats()})
+
+
+@mcp.custom_route("/popular/stats", methods=["GET"])
+async def popular_stats(request: Request) -> JSONResponse:
+    """Return the most asked questions and the stale serves and background refreshes."""
+    if popular_answers is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **popular_answers.stats()})
+
+
+@mcp.custom_route("/cache/stats", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """Return hit and miss counters of the answer cache."""
+    if answer_cache is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **answer_cache.stats()})
+
+
+async def tool_set_version() -> str:
+    """Return a hash of the tool definitions, which changes only when a tool changes.
+
+    It is advertised as the server version in the `initialize` result so that clients
+    can keep using cached tool lists without calling `tools/list`.
+
+    Returns:
+        str: The tool-set version.
+    """
+    tools = sorted(await mcp.list_tools(), key=lambda tool: tool.name)
+    definitions = [tool.model_dump(mode="json", exclude_none=True) for tool in tools]
+    payload = json.dumps(definitions, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def keep_streams_open_on_exit() -> None:
+    """Let uvicorn drain in-flight tool calls on SIGTERM.
+
+    sse-starlette hooks uvicorn's exit handler to close every open SSE stream as soon as
+    the signal arrives, which cuts off tool calls that are still streaming their result.
+    Without the hook, uvicorn stops accepting connections and waits for running responses
+    (up to its graceful shutdown timeout) before shutting the app down.
+    """
+    from sse_starlette.sse import AppStatus
+
+    if hasattr(AppStatus, "disable_automatic_graceful_drain"):
+        AppStatus.disable_automatic_graceful_drain()
+    if AppStatus.original_handler is not None:
+        uvicorn.Server.handle_exit = AppStatus.original_handler
+
+
+def create_app() -> Starlette:
+    """Create the streamable-http ASGI app.
+
+    The answer cache, the popular-answer store on top of it, the index of past answers,
+    the thread table and the background job runner are created and the tool-set
+    version computed when the app starts; they and the shared OpenAI client, which the
+    first search creates, are closed when it shuts down.
+    The per-request FastMCP lifespan is not used for this because it is entered for every
+    request in stateless mode.
+
+    Environment variables:
+        OPENAI_PREWARM: Set to "1" to import the OpenAI SDK in the background right after
+            startup instead of on the first search (default: disabled).
+
+    Returns:
+        Starlette: The ASGI application.
+    """
+    keep_streams_open_on_exit()
+    app = mcp.streamable_http_app()
+    session_manager_lifespan = app.router.lifespan_context
+    prewarm = os.getenv("OPENAI_PREWARM", "0") == "1"
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        global answer_cache, answer_index, job_runner, popular_answers, thread_table
+        answer_cache = create_answer_cache()
+        if answer_cache is not None:
+            # Stale answers are only served where answers are cached in the first place.
+            popular_answers = create_popular_answers(upstream_busy)
+        if popular_answers is not None:
+            popular_answers.start()
+        answer_index = create_answer_index()
+        if answer_index is not None:
+            answer_index.start()
+        thread_table = create_thread_table()
+        job_runner = create_job_runner(run_search_job)
+        await job_runner.start()
+        mcp._mcp_server.version = await tool_set_version()
+        if prewarm:
+            # Keep a reference so the task is not garbage collected before it finishes.
+            app.state.prewarm = asyncio.create_task(
+                asyncio.to_thread(importlib.import_module, "openai")
+            )
+        try:
+            async with session_manager_lifespan(app):
+                yield
+        finally:
+            await job_runner.close()
+            job_runner = None
+            if popular_answers is not None:
+                await popular_answers.close()
+                popular_answers = None
+            if answer_cache is not None:
+                await answer_cache.close()
+                answer_cache = None
+            if answer_index is not None:
+                await answer_index.close()
+                answer_index = None
+            if thread_table is not None:
+                await thread_table.close()
+                thread_table = None
+            await close_openai_client()
+            metrics.close()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
+    uvicorn.run(
+        create_app(),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
@@ -0,0 +1,285 @@
+import contextlib
+import functools
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any, ParamSpec, TypeVar
+
+from mcp.types import EmbeddedResource
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+METER_NAME = "openai-web-search-mcp-server"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def result_size(part: str | EmbeddedResource) -> int:
+    if isinstance(part, str):
+        return len(part.encode())
+    return len(getattr(part.resource, "blob", ""))
+
+
+class UpstreamCall:
+    """Handle for one upstream model call, used to attach token usage to its span."""
+
+    def __init__(self, span: Any) -> None:
+        self.span = span
+
+    def set_usage(self, input_tokens: int | None, output_tokens: int | None) -> None:
+        if self.span is None:
+            return
+        if input_tokens is not None:
+            self.span.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+        if output_tokens is not None:
+            self.span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+
+
+class Metrics:
+    """Application-level metrics and spans, exported through OpenTelemetry and Prometheus.
+
+    Both exporters are optional. When the OpenTelemetry API is installed, instruments are
+    created against the global providers, which are no-ops unless a provider was set up
+    (by `opentelemetry-instrument` or `METRICS_OTLP=1`). Prometheus instruments are only
+    created when `prometheus_client` is installed and `METRICS_PROMETHEUS=1`; with
+    `PROMETHEUS_MULTIPROC_DIR` set, as src.serve does for several workers, they are
+    written to files there so that every worker can serve the sum.
+    """
+
+    def __init__(self, otel: bool, prometheus: bool) -> None:
+        self._otel = None
+        self._tracer = None
+        self._prometheus = None
+        if otel:
+            self._setup_otel()
+        if prometheus:
+            self._setup_prometheus()
+
+    def _setup_otel(self) -> None:
+        try:
+            from opentelemetry import metrics, trace
+        except ImportError:
+            return
+        meter = metrics.get_meter(METER_NAME)
+        self._tracer = trace.get_tracer(METER_NAME)
+        self._otel = {
+            "tool_duration": meter.create_histogram(
+                "mcp.tool.duration", unit="s", description="Total tool call time"
+            ),
+            "upstream_duration": meter.create_histogram(
+                "mcp.upstream.duration",
+                unit="s",
+                description="Upstream model call time",
+            ),
+            "queue_duration": meter.create_histogram(
+                "mcp.upstream.queue_duration",
+                unit="s",
+                description="Time spent waiting for upstream admission",
+            ),
+            "response_size": meter.create_histogram(
+                "mcp.tool.response.size", unit="By", description="Tool result size"
+            ),
+            "in_flight": meter.create_up_down_counter(
+                "mcp.tool.in_flight", description="Tool calls in progress"
+            ),
+            "cache_lookups": meter.create_counter(
+                "mcp.cache.lookups", description="Answer cache lookups by result"
+            ),
+        }
+
+    def _setup_prometheus(self) -> None:
+        try:
+            import prometheus_client
+        except ImportError:
+            return
+        self._prometheus = {
+            "tool_duration": prometheus_client.Histogram(
+                "mcp_tool_duration_seconds",
+                "Total tool call time",
+                ["tool"],
+                buckets=LATENCY_BUCKETS,
+            ),
+            "upstream_duration": prometheus_client.Histogram(
+                "mcp_upstream_duration_seconds",
+                "Upstream model call time",
+                ["backend"],
+                buckets=LATENCY_BUCKETS,
+            ),
+            "queue_duration": prometheus_client.Histogram(
+                "mcp_upstream_queue_duration_seconds",
+                "Time spent waiting for upstream admission",
+                buckets=LATENCY_BUCKETS,
+            ),
+            "response_size": prometheus_client.Histogram(
+                "mcp_tool_response_bytes",
+                "Tool result size",
+                ["tool"],
+                buckets=SIZE_BUCKETS,
+            ),
+            "in_flight": prometheus_client.Gauge(
+                "mcp_tool_in_flight",
+                "Tool calls in progress",
+                ["tool"],
+                multiprocess_mode="livesum",
+            ),
+            "cache_lookups": prometheus_client.Counter(
+                "mcp_cache_lookups_total", "Answer cache lookups by result", ["result"]
+            ),
+        }
+
+    @property
+    def prometheus_enabled(self) -> bool:
+        return self._prometheus is not None
+
+    def prometheus_exposition(self) -> tuple[bytes, str]:
+        """Render the Prometheus metrics of all worker processes.
+
+        Returns:
+            tuple[bytes, str]: The metrics and their content type.
+        """
+        import prometheus_client
+
+        registry = prometheus_client.REGISTRY
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return (
+            prometheus_client.generate_latest(registry),
+            prometheus_client.CONTENT_TYPE_LATEST,
+        )
+
+    def close(self) -> None:
+        """Drop the live gauges of this process from the metrics shared by workers."""
+        if self._prometheus is not None and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            multiprocess.mark_process_dead(os.getpid())
+
+    def instrument_tool(
+        self, fn: Callable[P, Awaitable[T]]
+    ) -> Callable[P, Awaitable[T]]:
+        """Record duration, in-flight count and result size of an async tool."""
+        tool = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if self._otel is None and self._prometheus is None:
+                return await fn(*args, **kwargs)
+            attributes = {"tool": tool}
+            self._add("in_flight", 1, attributes)
+            started_at = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            finally:
+                self._add("in_flight", -1, attributes)
+                self._record(
+                    "tool_duration", time.perf_counter() - started_at, attributes
+                )
+            parts = result if isinstance(result, list) else [result]
+            if parts and all(
+                isinstance(part, str | EmbeddedResource) for part in parts
+            ):
+                self._record("response_size", sum(map(result_size, parts)), attributes)
+            return result
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def upstream_call(self, backend: str, model: str) -> Iterator[UpstreamCall]:
+        """Record the duration of one upstream call inside a span carrying model and usage."""
+        attributes = {"backend": backend}
+        started_at = time.perf_counter()
+        if self._tracer is None:
+            try:
+                yield UpstreamCall(None)
+            finally:
+                self._record(
+                    "upstream_duration", time.perf_counter() - started_at, attributes
+                )
+            return
+        with self._tracer.start_as_current_span(
+            "responses.create",
+            attributes={"gen_ai.request.model": model, "backend": backend},
+        ) as span:
+            try:
+                yield UpstreamCall(span)
+            finally:
+                self._record(
+                    "upstream_duration", time.perf_counter() - started_at, attributes
+                )
+
+    def queue_time(self, seconds: float) -> None:
+        self._record("queue_duration", seconds, {})
+
+    def cache_lookup(self, result: str) -> None:
+        self._add("cache_lookups", 1, {"result": result})
+
+    def _add(self, name: str, amount: float, attributes: dict) -> None:
+        if self._otel is not None:
+            self._otel[name].add(amount, attributes)
+        if self._prometheus is not None:
+            metric = self._prometheus[name]
+            if attributes:
+                metric = metric.labels(**attributes)
+            if amount >= 0:
+                metric.inc(amount)
+            else:
+                metric.dec(-amount)
+
+    def _record(self, name: str, value: float, attributes: dict) -> None:
+        if self._otel is not None:
+            self._otel[name].record(value, attributes)
+        if self._prometheus is not None:
+            metric = self._prometheus[name]
+            if attributes:
+                metric = metric.labels(**attributes)
+            metric.observe(value)
+
+
+def configure_otlp() -> None:
+    """Install OTLP metric and trace exporters when no provider has been configured.
+
+    `opentelemetry-instrument` already installs them in the container; this is for
+    running the server without auto-instrumentation.
+    """
+    from opentelemetry import metrics, trace
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+        OTLPMetricExporter,
+    )
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if not isinstance(metrics.get_meter_provider(), MeterProvider):
+        reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+        metrics.set_meter_provider(MeterProvider(metric_readers=[reader]))
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider()
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+
+
+def create_metrics() -> Metrics:
+    """Create the metrics facade configured by environment variables.
+
+    Environment variables:
+        METRICS_OTLP: Set to "1" to export metrics and spans over OTLP even without
+            `opentelemetry-instrument`; endpoints follow the standard OTEL_EXPORTER_OTLP_*
+            variables (default: disabled).
+        METRICS_PROMETHEUS: Set to "1" to serve Prometheus metrics at /metrics
+            (requires `prometheus_client`; default: disabled).
+
+    Returns:
+        Metrics: The metrics facade.
+    """
+    if os.getenv("METRICS_OTLP", "0") == "1":
+        configure_otlp()
+    return Metrics(otel=True, prometheus=os.getenv("METRICS_PROMETHEUS", "0") == "1")
+
+
+metrics = create_metrics()
@@ -0,0 +1,63 @@
+import os
+from typing import TYPE_CHECKING
+
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# The OpenAI SDK takes a large share of the server's import time, so it is only imported
+# when the first search creates the client.
+_client: "AsyncOpenAI | None" = None
+
+
+def create_openai_client() -> "AsyncOpenAI":
+    """Create the long-lived AsyncOpenAI client shared by all tool calls.
+
+    The underlying httpx connection pool can be tuned with environment variables:
+        OPENAI_MAX_CONNECTIONS: Maximum number of concurrent connections (default: 100).
+        OPENAI_MAX_KEEPALIVE_CONNECTIONS: Maximum number of idle connections kept alive (default: 20).
+        OPENAI_KEEPALIVE_EXPIRY: Seconds an idle connection is kept alive (default: 30).
+        OPENAI_HTTP2: Set to "1" to negotiate HTTP/2 with the OpenAI API (default: disabled).
+        OPENAI_TIMEOUT: Read timeout in seconds for a single request (default: 600).
+
+    Returns:
+        AsyncOpenAI: The client instance.
+    """
+    from openai import AsyncOpenAI
+
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(
+            os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+        ),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", "600")), connect=10.0)
+    http_client = httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=os.getenv("OPENAI_HTTP2", "0") == "1",
+    )
+    # Retries are handled by UpstreamLimiter so that they respect the shared rate limits.
+    return AsyncOpenAI(http_client=http_client, timeout=timeout, max_retries=0)
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Return the shared client, creating it on first use.
+
+    Returns:
+        AsyncOpenAI: The shared client instance.
+    """
+    global _client
+    if _client is None:
+        _client = create_openai_client()
+    return _client
+
+
+async def close_openai_client() -> None:
+    """Close the shared client and release its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
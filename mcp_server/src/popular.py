@@ -0,0 +1,311 @@
+import asyncio
+import contextlib
+import dataclasses
+import math
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from src.backends import BackendAnswer
+
+# Fair-share identity of background refreshes, which can be given a lower weight with
+# FAIR_SHARE_WEIGHTS.
+REFRESH_CALLER = "background-refresh"
+
+
+@dataclass
+class PopularQuestion:
+    question: str
+    # Fetches a fresh answer, e.g. with the routing options the question was asked with.
+    refresh: Callable[[], Awaitable[BackendAnswer]]
+    accessed_at: float
+    # Access count that halves every `half_life` seconds without access.
+    hits: float = 0.0
+    answer: BackendAnswer | None = None
+    fetched_at: float = 0.0
+    refreshing: bool = False
+
+
+class PopularAnswers:
+    """Answers to frequently asked questions, served stale while they are refreshed.
+
+    Every lookup counts as an access of its question, and a question with at least
+    `min_hits` accesses is popular. An answer younger than `fresh_ttl` is served as is.
+    An older one, up to `max_stale`, is still served immediately to a popular question,
+    with its age set, while a background task fetches a fresh one; other questions wait
+    for a fresh answer as usual. The `top_n` most popular questions are refreshed
+    before they go stale, once their answer is older than `refresh_ahead` of
+    `fresh_ttl`.
+
+    Background refreshes are bounded so that they cannot crowd out live searches: at
+    most `max_concurrency` run at once, at most `refresh_per_hour` start per hour, and
+    none start while `busy()` reports that live searches use all upstream capacity.
+    Questions are kept for the `max_entries` most recently asked.
+    """
+
+    def __init__(
+        self,
+        fresh_ttl: float = 3600,
+        max_stale: float = 86400,
+        max_entries: int = 1000,
+        half_life: float = 86400,
+        top_n: int = 20,
+        min_hits: float = 2,
+        refresh_ahead: float = 0.8,
+        refresh_interval: float = 60,
+        max_concurrency: int = 2,
+        refresh_per_hour: float = 60,
+        busy: Callable[[], bool] = lambda: False,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.half_life = half_life
+        self.top_n = top_n
+        self.min_hits = min_hits
+        self.refresh_ahead = refresh_ahead
+        self.refresh_interval = refresh_interval
+        self.max_concurrency = max_concurrency
+        self.refresh_rate = refresh_per_hour / 3600
+        # Up to five minutes of budget can be spent at once; none when it is 0.
+        self.burst = max(1.0, refresh_per_hour / 12) if refresh_per_hour > 0 else 0.0
+        self.busy = busy
+        self.clock = clock
+        self.fresh_served = 0
+        self.stale_served = 0
+        self.refreshed = 0
+        self.refresh_errors = 0
+        self.skipped: dict[str, int] = {}
+        self._questions: OrderedDict[str, PopularQuestion] = OrderedDict()
+        self._tokens = self.burst
+        self._refilled_at = clock()
+        self._refreshes: set[asyncio.Task] = set()
+        self._loop_task: asyncio.Task | None = None
+
+    def _decayed(self, entry: PopularQuestion, now: float) -> float:
+        return entry.hits * 0.5 ** ((now - entry.accessed_at) / self.half_life)
+
+    def _popular(self, entry: PopularQuestion, now: float) -> bool:
+        return self._decayed(entry, now) >= self.min_hits
+
+    def record(
+        self,
+        key: str,
+        question: str,
+        refresh: Callable[[], Awaitable[BackendAnswer]],
+    ) -> None:
+        """Count an access of a question and remember how to refresh its answer."""
+        now = self.clock()
+        entry = self._questions.get(key)
+        if entry is None:
+            entry = self._questions[key] = PopularQuestion(question, refresh, now)
+        entry.hits = self._decayed(entry, now) + 1
+        entry.accessed_at = now
+        entry.refresh = refresh
+        self._questions.move_to_end(key)
+        while len(self._questions) > self.max_entries:
+            self._questions.popitem(last=False)
+
+    def store(self, key: str, answer: BackendAnswer) -> None:
+        """Keep a newly fetched answer of a recorded question."""
+        entry = self._questions.get(key)
+        if entry is not None:
+            entry.answer = answer
+            entry.fetched_at = self.clock()
+
+    def get(self, key: str) -> BackendAnswer | None:
+        """Return the kept answer of a question if it is fresh, or stale but popular.
+
+        A stale answer, up to `max_stale`, is returned with its `age` set, and a
+        refresh is started in the background if the refresh budget allows.
+
+        Args:
+            key (str): Cache key of the question.
+
+        Returns:
+            BackendAnswer | None: The answer, or None if there is none to serve.
+        """
+        entry = self._questions.get(key)
+        if entry is None or entry.answer is None:
+            return None
+        now = self.clock()
+        age = now - entry.fetched_at
+        if age <= self.fresh_ttl:
+            self.fresh_served += 1
+            return entry.answer
+        if age > self.max_stale or not self._popular(entry, now):
+            return None
+        self.stale_served += 1
+        self._schedule(key, entry)
+        return dataclasses.replace(entry.answer, age=age)
+
+    def _take_budget(self) -> str | None:
+        """Reserve one refresh, or return why no refresh may start now."""
+        if len(self._refreshes) >= self.max_concurrency:
+            return "concurrency"
+        now = self.clock()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled_at) * self.refresh_rate
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return "budget"
+        if self.busy():
+            return "busy"
+        self._tokens -= 1
+        return None
+
+    def _schedule(self, key: str, entry: PopularQuestion) -> bool:
+        if entry.refreshing:
+            return False
+        reason = self._take_budget()
+        if reason is not None:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+            return False
+        entry.refreshing = True
+        task = asyncio.create_task(self._refresh(key, entry))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+        return True
+
+    async def _refresh(self, key: str, entry: PopularQuestion) -> None:
+        try:
+            answer = await entry.refresh()
+        except Exception:
+            # The stale answer keeps being served; a later access retries.
+            self.refresh_errors += 1
+            return
+        finally:
+            entry.refreshing = False
+        self.refreshed += 1
+        self.store(key, answer)
+
+    def due(self) -> list[tuple[str, PopularQuestion]]:
+        """The most popular questions whose answers are about to go stale."""
+        now = self.clock()
+        popular = sorted(
+            (
+                (key, entry)
+                for key, entry in self._questions.items()
+                if self._popular(entry, now)
+            ),
+            key=lambda item: self._decayed(item[1], now),
+            reverse=True,
+        )[: self.top_n]
+        return [
+            (key, entry)
+            for key, entry in popular
+            if entry.answer is not None
+            and now - entry.fetched_at >= self.refresh_ahead * self.fresh_ttl
+        ]
+
+    def refresh_popular(self) -> int:
+        """Start refreshes of popular questions before they go stale, within budget.
+
+        Returns:
+            int: The number of refreshes started.
+        """
+        started = 0
+        for key, entry in self.due():
+            if entry.refreshing:
+                continue
+            if not self._schedule(key, entry):
+                break
+            started += 1
+        return started
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            self.refresh_popular()
+
+    def start(self) -> None:
+        self._loop_task = asyncio.create_task(self._refresh_loop())
+
+    def stats(self) -> dict:
+        now = self.clock()
+        return {
+            "questions": len(self._questions),
+            "fresh_served": self.fresh_served,
+            "stale_served": self.stale_served,
+            "refreshing": len(self._refreshes),
+            "refreshed": self.refreshed,
+            "refresh_errors": self.refresh_errors,
+            "refresh_skipped": self.skipped,
+            "refresh_budget": round(self._tokens, 1),
+            "top": [
+                {
+                    "question": entry.question[:100],
+                    "hits": round(self._decayed(entry, now), 1),
+                    "age_seconds": round(now - entry.fetched_at)
+                    if entry.answer is not None
+                    else None,
+                }
+                for entry in sorted(
+                    self._questions.values(),
+                    key=lambda entry: self._decayed(entry, now),
+                    reverse=True,
+                )[:10]
+            ],
+        }
+
+    async def close(self) -> None:
+        tasks = [*self._refreshes]
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+        for task in tasks:
+            task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_popular_answers(busy: Callable[[], bool]) -> PopularAnswers | None:
+    """Create the store of popular answers configured by environment variables.
+
+    Args:
+        busy (Callable[[], bool]): Whether live searches use all upstream capacity, in
+            which case no background refresh starts.
+
+    Environment variables:
+        POPULAR_MAX_QUESTIONS: Questions whose accesses and answers are kept; 0
+            disables the store (default: 1000).
+        POPULAR_FRESH_SECONDS: Age up to which an answer is served as fresh
+            (default: CACHE_TTL_SECONDS or 3600).
+        POPULAR_MAX_STALE_SECONDS: Age up to which a stale answer is still served while
+            it is refreshed (default: 86400).
+        POPULAR_TOP_N: Most popular questions refreshed before they go stale
+            (default: 20).
+        POPULAR_MIN_HITS: Accesses, halved every POPULAR_HALF_LIFE_HOURS, a question
+            needs to be served stale and refreshed ahead (default: 2).
+        POPULAR_HALF_LIFE_HOURS: Half-life of the access counts (default: 24).
+        POPULAR_REFRESH_CONCURRENCY: Background refreshes running at once
+            (default: 2).
+        POPULAR_REFRESH_PER_HOUR: Background refreshes started per hour, the refresh
+            budget (default: 60).
+        SERVER_WORKERS: Worker processes sharing the refresh concurrency and budget;
+            each gets an equal part of them (default: 1).
+
+    Returns:
+        PopularAnswers | None: The store, or None when disabled.
+    """
+    max_entries = int(os.getenv("POPULAR_MAX_QUESTIONS", "1000"))
+    if max_entries <= 0:
+        return None
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    max_concurrency = int(os.getenv("POPULAR_REFRESH_CONCURRENCY", "2"))
+    return PopularAnswers(
+        fresh_ttl=float(
+            os.getenv("POPULAR_FRESH_SECONDS", os.getenv("CACHE_TTL_SECONDS", "3600"))
+        ),
+        max_stale=float(os.getenv("POPULAR_MAX_STALE_SECONDS", "86400")),
+        max_entries=max_entries,
+        half_life=float(os.getenv("POPULAR_HALF_LIFE_HOURS", "24")) * 3600,
+        top_n=int(os.getenv("POPULAR_TOP_N", "20")),
+        min_hits=float(os.getenv("POPULAR_MIN_HITS", "2")),
+        max_concurrency=math.ceil(max_concurrency / workers),
+        refresh_per_hour=float(os.getenv("POPULAR_REFRESH_PER_HOUR", "60")) / workers,
+        busy=busy,
+    )
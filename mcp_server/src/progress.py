@@ -0,0 +1,109 @@
+import time
+
+from mcp.server.fastmcp import Context
+
+OUTPUT_TEXT_LOGGER = "openai_o3_web_search.output_text"
+
+
+class SearchProgress:
+    """Forwards the progress of a web search to the MCP client of one tool call.
+
+    Status updates are sent as progress notifications. Partial answer text is sent as
+    log notifications with the `OUTPUT_TEXT_LOGGER` logger name. Both are only sent when
+    the client asked for progress by passing a progress token.
+    """
+
+    def __init__(self, ctx: Context) -> None:
+        meta = ctx.request_context.meta
+        self.ctx = ctx
+        self.enabled = meta is not None and meta.progressToken is not None
+        self.progress = 0
+
+    async def status(self, message: str) -> None:
+        # Context.report_progress does not pass the related request ID, so in stateless
+        # streamable-http mode the notification would not reach the tool call's stream.
+        self.progress += 1
+        await self.ctx.session.send_progress_notification(
+            progress_token=self.ctx.request_context.meta.progressToken,
+            progress=self.progress,
+            message=message,
+            related_request_id=self.ctx.request_id,
+        )
+
+    async def text(self, chunk: str) -> None:
+        await self.ctx.log("info", chunk, logger_name=OUTPUT_TEXT_LOGGER)
+
+
+class ProgressHub:
+    """Fans out the progress of shared upstream calls to every caller waiting on them."""
+
+    def __init__(self, chunk_chars: int = 200, chunk_interval: float = 0.5) -> None:
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+        self._listeners: dict[str, set[SearchProgress]] = {}
+
+    def subscribe(self, key: str, listener: SearchProgress) -> None:
+        if listener.enabled:
+            self._listeners.setdefault(key, set()).add(listener)
+
+    def unsubscribe(self, key: str, listener: SearchProgress) -> None:
+        listeners = self._listeners.get(key)
+        if listeners is not None:
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[key]
+
+    async def status(self, key: str, message: str) -> None:
+        for listener in list(self._listeners.get(key, ())):
+            try:
+                await listener.status(message)
+            except Exception:
+                self.unsubscribe(key, listener)
+
+    async def text(self, key: str, chunk: str) -> None:
+        for listener in list(self._listeners.get(key, ())):
+            try:
+                await listener.text(chunk)
+            except Exception:
+                self.unsubscribe(key, listener)
+
+    def events(self, key: str) -> "SearchEvents":
+        return SearchEvents(self, key)
+
+
+class SearchEvents:
+    """Progress sink handed to a search backend for the upstream call of one key.
+
+    Output text deltas are batched so that each notification carries a useful chunk.
+    """
+
+    def __init__(self, hub: ProgressHub, key: str) -> None:
+        self.hub = hub
+        self.key = key
+        self.received = 0
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._flushed_at = time.monotonic()
+
+    async def status(self, message: str) -> None:
+        await self.hub.status(self.key, message)
+
+    async def text(self, delta: str) -> None:
+        self.received += len(delta)
+        self._pending.append(delta)
+        self._pending_chars += len(delta)
+        if (
+            self._pending_chars >= self.hub.chunk_chars
+            or time.monotonic() - self._flushed_at >= self.hub.chunk_interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        chunk = "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._flushed_at = time.monotonic()
+        await self.hub.status(self.key, f"Received {self.received} characters")
+        await self.hub.text(self.key, chunk)
@@ -0,0 +1,265 @@
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from typing import TypeVar
+
+import httpx
+from mcp.server.fastmcp.exceptions import ToolError
+
+from src.metrics import metrics
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class OverloadedError(ToolError):
+    """Raised when an upstream call cannot be admitted within the allowed wait time.
+
+    The message is a JSON object so that agents can parse it and back off accordingly.
+    """
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(
+            json.dumps(
+                {
+                    "error": "overloaded",
+                    "reason": reason,
+                    "retry_after": round(retry_after, 1),
+                }
+            )
+        )
+
+
+class TokenBucket:
+    """Token bucket that reserves capacity up front so concurrent callers queue fairly.
+
+    A reservation may drive the balance negative; the caller then sleeps until the debt
+    has been refilled. Reservations whose wait would exceed `max_wait` are rejected.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, max_wait: float) -> None:
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.max_wait = max_wait
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Take `amount` tokens, waiting for the bucket to refill if needed.
+
+        Raises:
+            OverloadedError: If the tokens would not be available within `max_wait`.
+        """
+        self._refill()
+        self._tokens -= amount
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > self.max_wait:
+            self._tokens += amount
+            raise OverloadedError(f"{self.name} rate limit", wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def adjust(self, amount: float) -> None:
+        """Correct a previous reservation once the real cost is known."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit tuned with additive increase / multiplicative decrease (AIMD).
+
+    The limit grows by roughly one slot per window of successful calls and is halved when
+    the upstream throttles us or reports that little of its rate limit is left.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        max_wait: float,
+        max_queue: int,
+    ) -> None:
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self._condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the block.
+
+        Raises:
+            OverloadedError: If the queue is full or no slot frees up within `max_wait`.
+        """
+        if self.queued >= self.max_queue:
+            raise OverloadedError("upstream queue full", self.max_wait)
+        self.queued += 1
+        try:
+            async with self._condition:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < int(self.limit)),
+                    self.max_wait,
+                )
+                self.in_flight += 1
+        except TimeoutError:
+            raise OverloadedError("upstream concurrency limit", self.max_wait) from None
+        finally:
+            self.queued -= 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttled(self) -> None:
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> float | None:
+    """Read the server-requested delay from `retry-after-ms` or `retry-after` headers."""
+    if value := headers.get("retry-after-ms"):
+        with contextlib.suppress(ValueError):
+            return float(value) / 1000
+    if value := headers.get("retry-after"):
+        with contextlib.suppress(ValueError):
+            return float(value)
+    return None
+
+
+class UpstreamLimiter:
+    """Guards calls to OpenAI with rate limits, adaptive concurrency and retries."""
+
+    def __init__(
+        self,
+        requests: TokenBucket | None,
+        tokens: TokenBucket | None,
+        concurrency: AdaptiveConcurrencyLimiter,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+    ) -> None:
+        self.requests = requests
+        self.tokens = tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @contextlib.asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[None]:
+        """Admit one upstream call, reserving request and token budget for it.
+
+        Raises:
+            OverloadedError: If the call cannot be admitted within the allowed wait time.
+        """
+        started_at = time.perf_counter()
+        async with self.concurrency.slot():
+            if self.requests is not None:
+                await self.requests.acquire()
+            if self.tokens is not None:
+                await self.tokens.acquire(estimated_tokens)
+            metrics.queue_time(time.perf_counter() - started_at)
+            yield
+
+    def record_usage(self, estimated_tokens: int, used_tokens: int) -> None:
+        if self.tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Adjust the concurrency limit from the rate-limit headers of a response."""
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        limit = headers.get("x-ratelimit-limit-requests")
+        if remaining and limit and int(remaining) < int(limit) * 0.1:
+            self.concurrency.on_throttled()
+        else:
+            self.concurrency.on_success()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Call `fn`, retrying throttled and transient failures with jittered backoff.
+
+        `Retry-After` from the upstream takes precedence over the computed delay.
+        """
+        import openai
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await fn()
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                response: httpx.Response | None = getattr(e, "response", None)
+                status = response.status_code if response is not None else None
+                if status == 429:
+                    self.concurrency.on_throttled()
+                retryable = status is None or status in RETRYABLE_STATUS_CODES
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2**attempt)
+                )
+                if response is not None:
+                    delay = retry_after_seconds(response.headers) or delay
+                await asyncio.sleep(min(delay, self.max_delay))
+        raise AssertionError("unreachable")
+
+
+def create_upstream_limiter() -> UpstreamLimiter:
+    """Create the upstream limiter configured by environment variables.
+
+    Environment variables:
+        OPENAI_RPM: Requests per minute allowed to OpenAI, 0 for no limit (default: 0).
+        OPENAI_TPM: Tokens per minute allowed to OpenAI, 0 for no limit (default: 0).
+        UPSTREAM_INITIAL_CONCURRENCY: Initial concurrent upstream calls (default: 8).
+        UPSTREAM_MIN_CONCURRENCY: Lower bound of the adaptive limit (default: 1).
+        UPSTREAM_MAX_CONCURRENCY: Upper bound of the adaptive limit (default: 32).
+        UPSTREAM_MAX_QUEUE: Callers allowed to wait for a slot (default: 100).
+        UPSTREAM_MAX_WAIT: Seconds a caller may wait before being rejected (default: 30).
+        UPSTREAM_MAX_RETRIES: Retries for throttled or transient failures (default: 3).
+        UPSTREAM_RETRY_BASE_DELAY: Base delay of the exponential backoff (default: 1).
+        UPSTREAM_RETRY_MAX_DELAY: Maximum delay between retries (default: 30).
+        SERVER_WORKERS: Worker processes sharing the OpenAI quota; OPENAI_RPM and
+            OPENAI_TPM are divided between them (default: 1).
+
+    Returns:
+        UpstreamLimiter: The limiter.
+    """
+    max_wait = float(os.getenv("UPSTREAM_MAX_WAIT", "30"))
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    rpm = float(os.getenv("OPENAI_RPM", "0")) / workers
+    tpm = float(os.getenv("OPENAI_TPM", "0")) / workers
+    return UpstreamLimiter(
+        requests=TokenBucket("requests", rpm, max_wait) if rpm > 0 else None,
+        tokens=TokenBucket("tokens", tpm, max_wait) if tpm > 0 else None,
+        concurrency=AdaptiveConcurrencyLimiter(
+            initial=int(os.getenv("UPSTREAM_INITIAL_CONCURRENCY", "8")),
+            minimum=int(os.getenv("UPSTREAM_MIN_CONCURRENCY", "1")),
+            maximum=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "32")),
+            max_wait=max_wait,
+            max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "100")),
+        ),
+        max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "3")),
+        base_delay=float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "1")),
+        max_delay=float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "30")),
+    )
@@ -0,0 +1,224 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from mcp.server.fastmcp.exceptions import ToolError
+
+from src.backends import SearchBackend
+
+T = TypeVar("T")
+
+
+class LatencyStats:
+    """Rolling window of call latencies and outcomes for one backend.
+
+    With `max_age`, calls older than that many seconds are forgotten as well, so that
+    the statistics recover once a backend is no longer called.
+    """
+
+    def __init__(
+        self,
+        window: int = 100,
+        max_age: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_age = max_age
+        self.clock = clock
+        self._calls: deque[tuple[float, float, bool]] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool) -> None:
+        self._calls.append((self.clock(), latency, ok))
+
+    def clear(self) -> None:
+        self._calls.clear()
+
+    def _recent(self) -> deque[tuple[float, float, bool]]:
+        if self.max_age is not None:
+            cutoff = self.clock() - self.max_age
+            while self._calls and self._calls[0][0] < cutoff:
+                self._calls.popleft()
+        return self._calls
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent())
+
+    def percentile(self, q: float) -> float | None:
+        latencies = sorted(latency for _, latency, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+    def error_rate(self) -> float:
+        calls = self._recent()
+        if not calls:
+            return 0.0
+        return sum(not ok for _, _, ok in calls) / len(calls)
+
+
+class BackendRouter:
+    """Chooses search backends per request from a latency and cost budget.
+
+    Backends are kept in order of preference. A backend is demoted when it is erroring or
+    when its rolling p95 latency exceeds the caller's latency budget; demoted backends are
+    still tried as a last resort. Backends above the cost budget are skipped entirely.
+
+    A backend demoted for errors is rarely called, so its statistics would not change.
+    Calls older than `max_age` seconds are therefore forgotten, and every
+    `probe_interval` seconds one request tries an erroring backend first, falling back
+    to the others if it still fails. Once it answers, its earlier errors are forgotten.
+    """
+
+    def __init__(
+        self,
+        backends: list[SearchBackend],
+        window: int = 100,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        max_age: float = 600,
+        probe_interval: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not backends:
+            raise ValueError("At least one search backend is required.")
+        self.backends = backends
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.stats = {
+            backend.name: LatencyStats(window, max_age, clock) for backend in backends
+        }
+        self._probed_at: dict[str, float] = {}
+
+    def is_healthy(self, backend: SearchBackend) -> bool:
+        stats = self.stats[backend.name]
+        return (
+            stats.samples < self.min_samples
+            or stats.error_rate() <= self.max_error_rate
+        )
+
+    def p95(self, backend: SearchBackend) -> float | None:
+        stats = self.stats[backend.name]
+        return stats.percentile(0.95) if stats.samples >= self.min_samples else None
+
+    def plan(
+        self, max_latency: float | None = None, max_cost: float | None = None
+    ) -> list[SearchBackend]:
+        """Order the backends to try for one request.
+
+        Args:
+            max_latency: Latency budget in seconds, or None for no budget.
+            max_cost: Cost budget in the same units as `SearchBackend.cost`, or None.
+
+        Returns:
+            list[SearchBackend]: Backends within budget in order of preference, followed by
+                slow ones (fastest first) and erroring ones, unless an erroring one is
+                due to be probed and comes first. If no backend fits the cost budget,
+                the cheapest one is returned.
+        """
+        candidates = [
+            backend
+            for backend in self.backends
+            if max_cost is None or backend.cost <= max_cost
+        ]
+        if not candidates:
+            return [min(self.backends, key=lambda backend: backend.cost)]
+
+        now = self.clock()
+        preferred, slow, unhealthy = [], [], []
+        for backend in candidates:
+            p95 = self.p95(backend)
+            if not self.is_healthy(backend):
+                unhealthy.append(backend)
+                # The first probe is due one interval after the backend was demoted.
+                self._probed_at.setdefault(backend.name, now)
+                continue
+            self._probed_at.pop(backend.name, None)
+            if max_latency is not None and p95 is not None and p95 > max_latency:
+                slow.append(backend)
+            else:
+                preferred.append(backend)
+        slow.sort(key=lambda backend: self.p95(backend))
+        ordered = preferred + slow + unhealthy
+        for backend in unhealthy:
+            if now - self._probed_at[backend.name] >= self.probe_interval:
+                self._probed_at[backend.name] = now
+                return [backend, *(other for other in ordered if other is not backend)]
+        return ordered
+
+    async def call(
+        self,
+        plan: list[SearchBackend],
+        fn: Callable[[SearchBackend], Awaitable[T]],
+        on_fallback: Callable[[SearchBackend], Awaitable[None]] | None = None,
+    ) -> tuple[SearchBackend, T]:
+        """Call `fn` with each backend of `plan` in turn until one succeeds.
+
+        Args:
+            plan: Backends to try, as returned by `plan`.
+            fn: Performs the request against one backend.
+            on_fallback: Called before falling back to the next backend.
+
+        Returns:
+            tuple[SearchBackend, T]: The backend that answered and its result.
+        """
+        error: Exception | None = None
+        for backend in plan:
+            if error is not None and on_fallback is not None:
+                await on_fallback(backend)
+            started_at = self.clock()
+            try:
+                result = await fn(backend)
+            except (asyncio.CancelledError, ToolError):
+                # Our own overload and quota rejections say nothing about the backend.
+                raise
+            except Exception as e:
+                self.stats[backend.name].record(self.clock() - started_at, False)
+                error = e
+                continue
+            stats = self.stats[backend.name]
+            if not self.is_healthy(backend):
+                stats.clear()
+            stats.record(self.clock() - started_at, True)
+            return backend, result
+        raise error
+
+    def snapshot(self) -> dict:
+        return {
+            backend.name: {
+                "samples": self.stats[backend.name].samples,
+                "p95": self.stats[backend.name].percentile(0.95),
+                "error_rate": self.stats[backend.name].error_rate(),
+                "healthy": self.is_healthy(backend),
+            }
+            for backend in self.backends
+        }
+
+
+def create_backend_router(backends: list[SearchBackend]) -> BackendRouter:
+    """Create the backend router configured by environment variables.
+
+    Environment variables:
+        ROUTER_WINDOW: Number of recent calls kept per backend (default: 100).
+        ROUTER_MIN_SAMPLES: Calls needed before statistics are trusted (default: 5).
+        ROUTER_MAX_ERROR_RATE: Error rate above which a backend is demoted (default: 0.5).
+        ROUTER_MAX_AGE_SECONDS: Age after which a call no longer counts (default: 600).
+        ROUTER_PROBE_INTERVAL: Seconds between requests that try a backend demoted for
+            errors first (default: 30).
+
+    Returns:
+        BackendRouter: The router.
+    """
+    return BackendRouter(
+        backends,
+        window=int(os.getenv("ROUTER_WINDOW", "100")),
+        min_samples=int(os.getenv("ROUTER_MIN_SAMPLES", "5")),
+        max_error_rate=float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5")),
+        max_age=float(os.getenv("ROUTER_MAX_AGE_SECONDS", "600")),
+        probe_interval=float(os.getenv("ROUTER_PROBE_INTERVAL", "30")),
+    )
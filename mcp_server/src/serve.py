@@ -0,0 +1,83 @@
+"""Production entry point serving the streamable-http app from several worker processes.
+
+    python -m src.serve
+
+The server is stateless (`stateless_http=True`), so any worker can answer any request and
+the app scales out across cores behind a single listening socket, as long as jobs and
+threads are kept in stores shared by the workers.
+"""
+
+import os
+import tempfile
+
+import uvicorn
+
+from src.mcp_server import keep_streams_open_on_exit, mcp
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def shared_stores_configured() -> bool:
+    """Whether jobs and threads are kept where every worker process finds them."""
+    threads_shared = (
+        os.getenv("THREAD_STORE") == "sqlite" or os.getenv("THREAD_MAX") == "0"
+    )
+    return os.getenv("JOB_STORE") == "sqlite" and threads_shared
+
+
+def default_workers() -> int:
+    """Return one worker per CPU if state is shared between workers, otherwise one."""
+    return available_cpus() if shared_stores_configured() else 1
+
+
+def main() -> None:
+    """Serve the app with uvicorn workers configured by environment variables.
+
+    Environment variables:
+        SERVER_WORKERS: Worker processes (default: number of available CPUs when
+            JOB_STORE and THREAD_STORE are "sqlite", otherwise 1). With several
+            workers, jobs and threads default to their sqlite stores, and per-caller
+            quotas and the refresh budget are divided between the workers.
+        SERVER_BACKLOG: Listen backlog of the shared socket (default: 2048).
+        SERVER_KEEPALIVE_TIMEOUT: Seconds an idle keep-alive connection is kept open
+            (default: 75, above the idle timeout of typical load balancers).
+        SERVER_LIMIT_CONCURRENCY: Concurrent connections per worker before new ones get
+            HTTP 503, 0 for no limit (default: 0).
+        SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: Seconds to drain in-flight tool calls after
+            SIGTERM before they are cancelled (default: 30).
+    """
+    workers = int(os.getenv("SERVER_WORKERS", str(default_workers())))
+    # Workers inherit the environment; quotas and budgets are split by it.
+    os.environ["SERVER_WORKERS"] = str(workers)
+    if workers > 1 and os.getenv("METRICS_PROMETHEUS", "0") == "1":
+        # Each worker writes its metrics there, and /metrics sums them up.
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-")
+        )
+    limit_concurrency = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0"))
+    # The app is created by the workers after uvicorn has installed its signal
+    # handlers, so the exit hook must be removed before that.
+    keep_streams_open_on_exit()
+    uvicorn.run(
+        "src.mcp_server:create_app",
+        factory=True,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+        workers=workers,
+        backlog=int(os.getenv("SERVER_BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("SERVER_KEEPALIVE_TIMEOUT", "75")),
+        limit_concurrency=limit_concurrency or None,
+        timeout_graceful_shutdown=int(
+            os.getenv("SERVER_GRACEFUL_SHUTDOWN_TIMEOUT", "30")
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import base64
+import gzip
+import math
+import re
+from typing import Literal
+from urllib.parse import urlsplit
+
+from mcp.types import BlobResourceContents, EmbeddedResource
+from pydantic import BaseModel
+
+from src.backends import BackendAnswer, Citation
+
+ResponseFormat = Literal["text", "structured", "citations"]
+TRUNCATION_MARK = "…"
+# The web search tool cites sources inline as markdown links, e.g.
+# " ([example.com](https://example.com/page?utm_source=openai))".
+INLINE_CITATION = re.compile(r" ?\(\[[^\]]*\]\((\S+?)\)\)")
+SENTENCE_END = re.compile(r"[。！？!?]|\.(?=\s)|\n")
+
+
+class ShapedAnswer(BaseModel):
+    answer: str | None = None
+    citations: list[Citation] = []
+    confidence: float
+    truncated: bool | None = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer.
+
+    ASCII text averages about four characters per token, while Japanese and other
+    non-ASCII text is closer to one token per character.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    ascii_chars = sum(char.isascii() for char in text)
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def truncate(
+    text: str, max_chars: int | None = None, max_tokens: int | None = None
+) -> tuple[str, bool]:
+    """Cut a text to a character and token budget, preferably at a sentence end.
+
+    Args:
+        text (str): The text.
+        max_chars (int | None): Maximum length in characters, including the mark.
+        max_tokens (int | None): Maximum estimated tokens, including the mark.
+
+    Returns:
+        tuple[str, bool]: The text, ending with a truncation mark if it was cut, and
+            whether it was cut.
+    """
+    if (max_chars is None or len(text) <= max_chars) and (
+        max_tokens is None or estimate_tokens(text) <= max_tokens
+    ):
+        return text, False
+
+    # Leave room for the mark in both budgets.
+    limit = len(text) if max_chars is None else max(0, max_chars - len(TRUNCATION_MARK))
+    if max_tokens is not None:
+        budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+        if estimate_tokens(text[:limit]) > budget:
+            # Longest prefix within the budget; the estimate grows with the prefix.
+            low, high = 0, limit
+            while low < high:
+                middle = (low + high + 1) // 2
+                if estimate_tokens(text[:middle]) <= budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            limit = low
+    cut = limit
+    sentence_ends = [match.end() for match in SENTENCE_END.finditer(text, 0, limit)]
+    # Prefer a sentence boundary unless it would throw away most of the budget.
+    if sentence_ends and sentence_ends[-1] > limit // 2:
+        cut = sentence_ends[-1]
+    return text[:cut].rstrip() + TRUNCATION_MARK, True
+
+
+def number_citations(text: str, citations: list[Citation]) -> str:
+    """Replace inline citation links with `[n]` references into `citations`."""
+    numbers = {citation.url: i + 1 for i, citation in enumerate(citations)}
+
+    def replace(match: re.Match) -> str:
+        number = numbers.get(match.group(1))
+        return match.group(0) if number is None else f" [{number}]"
+
+    return INLINE_CITATION.sub(replace, text)
+
+
+def estimate_confidence(citations: list[Citation]) -> float:
+    """Heuristic confidence of an answer from the sources it cites.
+
+    Answers without citations, e.g. from a knowledge-only fallback model, get 0.3;
+    each distinct cited domain adds 0.15 to a base of 0.5, up to 0.95.
+    """
+    domains = {urlsplit(citation.url).hostname for citation in citations}
+    if not domains:
+        return 0.3
+    return min(0.95, 0.5 + 0.15 * len(domains))
+
+
+def shape_answer(
+    answer: BackendAnswer,
+    response_format: ResponseFormat = "text",
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+) -> str:
+    """Render an answer in the requested format within the size budget.
+
+    Args:
+        answer (BackendAnswer): The answer.
+        response_format (ResponseFormat): "text" for the answer text, "structured" for
+            JSON with the answer, its cited URLs and a confidence, or "citations" for
+            JSON with only the cited URLs and the confidence.
+        max_chars (int | None): Character budget of the answer text.
+        max_tokens (int | None): Estimated token budget of the answer text.
+
+    Returns:
+        str: The answer text or the JSON document.
+    """
+    if response_format == "text":
+        return truncate(answer.text, max_chars, max_tokens)[0]
+
+    confidence = estimate_confidence(answer.citations)
+    if response_format == "citations":
+        shaped = ShapedAnswer(citations=answer.citations, confidence=confidence)
+    else:
+        # The citations are listed separately, so the inline links become references.
+        text, truncated = truncate(
+            number_citations(answer.text, answer.citations), max_chars, max_tokens
+        )
+        shaped = ShapedAnswer(
+            answer=text,
+            citations=answer.citations,
+            confidence=confidence,
+            truncated=truncated,
+        )
+    return shaped.model_dump_json(exclude_none=True)
+
+
+def gzip_payload(
+    payload: str, response_format: ResponseFormat, min_bytes: int
+) -> str | EmbeddedResource:
+    """Gzip a payload of at least `min_bytes` into an embedded base64 blob.
+
+    Args:
+        payload (str): The shaped answer.
+        response_format (ResponseFormat): Format of the payload, which decides the URI.
+        min_bytes (int): Smaller payloads are returned unchanged.
+
+    Returns:
+        str | EmbeddedResource: The payload, or a resource with the gzip-compressed
+            payload.
+    """
+    data = payload.encode()
+    if len(data) < min_bytes:
+        return payload
+    extension = "txt" if response_format == "text" else "json"
+    return EmbeddedResource(
+        type="resource",
+        resource=BlobResourceContents(
+            uri=f"search://answer.{extension}.gz",
+            mimeType="application/gzip",
+            blob=base64.b64encode(gzip.compress(data)).decode(),
+        ),
+    )
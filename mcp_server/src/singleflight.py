@@ -0,0 +1,71 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class TooManyWaitersError(RuntimeError):
+    """Raised when a key already has the maximum number of callers waiting on it."""
+
+
+class _Call(Generic[T]):
+    def __init__(self, task: asyncio.Task[T]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls with the same key into a single upstream call.
+
+    The first caller for a key starts the call; callers that arrive while it is in flight
+    await the same task and receive its result or exception. A caller that is cancelled
+    (e.g. because its client disconnected) only stops waiting: the shared call keeps
+    running for the remaining callers and is cancelled once nobody is waiting any more.
+    """
+
+    def __init__(self, max_waiters: int = 100) -> None:
+        self.max_waiters = max_waiters
+        self._calls: dict[str, _Call[T]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn` for `key`, or join the call that is already in flight for it.
+
+        Args:
+            key (str): Identifies calls that can share a result.
+            fn (Callable[[], Awaitable[T]]): Starts the upstream call.
+
+        Returns:
+            T: The result of the shared call.
+
+        Raises:
+            TooManyWaitersError: If `max_waiters` callers already wait for `key`.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        elif call.waiters >= self.max_waiters:
+            raise TooManyWaitersError(
+                f"{call.waiters} callers are already waiting for this request."
+            )
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        """Return the number of distinct keys with a call in flight."""
+        return len(self._calls)
+
+    def _forget(self, key: str, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,125 @@
+"""Startup profiler for the MCP server.
+
+    python -m src.startup
+
+Imports the heavy dependencies one at a time, then the app, starts it in-process, sends
+an MCP `initialize` request, imports the SDKs the first search would load, and prints
+how long each phase took as JSON. Each import is measured on top of the previous ones,
+so shared dependencies are counted once under the first library that needs them.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import time
+
+PROFILED_IMPORTS = (
+    "pydantic",
+    "starlette",
+    "httpx",
+    "uvicorn",
+    "mcp.server.fastmcp",
+    "opentelemetry.trace",
+)
+# Imported on the first search rather than at startup.
+LAZY_IMPORTS = ("openai", "boto3")
+INITIALIZE_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-profiler", "version": "0.1.0"},
+    },
+}
+
+
+class StartupProfiler:
+    """Measures consecutive startup phases relative to when the profiler was created."""
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def measure(self, name: str, started_at: float) -> None:
+        self.phases[name] = round(time.perf_counter() - started_at, 4)
+
+    def report(self) -> dict:
+        return {
+            "total_seconds": round(time.perf_counter() - self.started_at, 4),
+            "phases": self.phases,
+        }
+
+
+def import_modules(
+    profiler: StartupProfiler, modules: tuple[str, ...], prefix: str
+) -> None:
+    for module in modules:
+        started_at = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        profiler.measure(f"{prefix} {module}", started_at)
+
+
+async def profile_startup() -> dict:
+    """Profile imports, app creation, the first `initialize` response and lazy imports.
+
+    Returns:
+        dict: Seconds per phase, the time to the first `initialize` response and in total.
+    """
+    profiler = StartupProfiler()
+    import_modules(profiler, PROFILED_IMPORTS, "import")
+
+    started_at = time.perf_counter()
+    from src.mcp_server import create_app
+
+    profiler.measure("import src.mcp_server", started_at)
+
+    started_at = time.perf_counter()
+    app = create_app()
+    profiler.measure("create_app", started_at)
+
+    import httpx
+
+    started_at = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        profiler.measure("lifespan startup", started_at)
+        started_at = time.perf_counter()
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://localhost"
+        ) as client:
+            response = await client.post(
+                "/mcp",
+                json=INITIALIZE_REQUEST,
+                headers={"Accept": "application/json, text/event-stream"},
+            )
+            response.raise_for_status()
+        profiler.measure("first initialize", started_at)
+        time_to_initialize = time.perf_counter() - profiler.started_at
+        import_modules(profiler, LAZY_IMPORTS, "first search: import")
+    return {
+        **profiler.report(),
+        "time_to_first_initialize_seconds": round(time_to_initialize, 4),
+    }
+
+
+def main() -> None:
+    """Print the startup profile.
+
+    Environment variables:
+        STARTUP_PROFILE_OUTPUT: Also write the profile to this JSON file (default: unset).
+    """
+    report = asyncio.run(profile_startup())
+    print(json.dumps(report, indent=2))
+    output = os.getenv("STARTUP_PROFILE_OUTPUT")
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Protocol
+
+
+@dataclass
+class Thread:
+    response_id: str
+    # Wall-clock time, so that every process sharing the store agrees on it.
+    expires_at: float
+    turns: int = 1
+
+
+class ThreadStore(Protocol):
+    expired: int
+    evicted: int
+
+    async def get(self, thread_id: str, now: float) -> Thread | None: ...
+
+    async def put(self, thread_id: str, thread: Thread, now: float) -> None: ...
+
+    async def count(self, now: float) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+class InMemoryThreadStore:
+    """Process-local thread store; threads are unknown to other worker processes."""
+
+    def __init__(self, max_threads: int = 10000) -> None:
+        self.max_threads = max_threads
+        self.expired = 0
+        self.evicted = 0
+        self._threads: OrderedDict[str, Thread] = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        # Threads are ordered by last use and share one TTL, so expired ones come first.
+        while self._threads:
+            thread_id, thread = next(iter(self._threads.items()))
+            if thread.expires_at > now:
+                break
+            del self._threads[thread_id]
+            self.expired += 1
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+            self.evicted += 1
+
+    async def get(self, thread_id: str, now: float) -> Thread | None:
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            return None
+        if thread.expires_at <= now:
+            del self._threads[thread_id]
+            self.expired += 1
+            return None
+        return thread
+
+    async def put(self, thread_id: str, thread: Thread, now: float) -> None:
+        self._threads[thread_id] = thread
+        self._threads.move_to_end(thread_id)
+        self._evict(now)
+
+    async def count(self, now: float) -> int:
+        self._evict(now)
+        return len(self._threads)
+
+    async def close(self) -> None:
+        self._threads.clear()
+
+
+class SQLiteThreadStore:
+    """Thread store in a SQLite file, shared by the workers on one host."""
+
+    def __init__(self, path: str, max_threads: int = 10000) -> None:
+        self.max_threads = max_threads
+        self.expired = 0
+        self.evicted = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS threads ("
+            "id TEXT PRIMARY KEY, response_id TEXT NOT NULL, "
+            "turns INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS threads_expires_at ON threads (expires_at)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _get(self, thread_id: str, now: float) -> Thread | None:
+        row = self._conn.execute(
+            "SELECT response_id, expires_at, turns FROM threads "
+            "WHERE id = ? AND expires_at > ?",
+            (thread_id, now),
+        ).fetchone()
+        return Thread(*row) if row is not None else None
+
+    def _put(self, thread_id: str, thread: Thread, now: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO threads VALUES (?, ?, ?, ?)",
+            (thread_id, thread.response_id, thread.turns, thread.expires_at),
+        )
+        self.expired += self._conn.execute(
+            "DELETE FROM threads WHERE expires_at <= ?", (now,)
+        ).rowcount
+        # All threads share one TTL, so the earliest expiry is the least recently used.
+        self.evicted += self._conn.execute(
+            "DELETE FROM threads WHERE id IN ("
+            "SELECT id FROM threads ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_threads,),
+        ).rowcount
+        self._conn.commit()
+
+    def _count(self, now: float) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM threads WHERE expires_at > ?", (now,)
+        ).fetchone()[0]
+
+    async def get(self, thread_id: str, now: float) -> Thread | None:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, thread_id, now)
+
+    async def put(self, thread_id: str, thread: Thread, now: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._put, thread_id, thread, now)
+
+    async def count(self, now: float) -> int:
+        async with self._lock:
+            return await asyncio.to_thread(self._count, now)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class ThreadTable:
+    """Maps thread handles returned to callers to the latest upstream response.
+
+    A follow-up question on a thread is chained to that response with the Responses API
+    `previous_response_id`, so the model keeps the earlier questions, answers and search
+    results without the caller restating them. The handle always points at the newest
+    answer of its thread. Threads expire `ttl` seconds after their last use, and the
+    store drops the least recently used thread once it is full. With a shared store,
+    any worker process can continue a thread started by another.
+    """
+
+    def __init__(
+        self,
+        store: ThreadStore,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.clock = clock
+        self.started = 0
+        self.continued = 0
+
+    async def start(self, response_id: str) -> str:
+        """Open a thread at an upstream response and return its handle."""
+        thread_id = uuid.uuid4().hex
+        now = self.clock()
+        await self.store.put(thread_id, Thread(response_id, now + self.ttl), now)
+        self.started += 1
+        return thread_id
+
+    async def get(self, thread_id: str) -> Thread | None:
+        return await self.store.get(thread_id, self.clock())
+
+    async def advance(self, thread_id: str, thread: Thread, response_id: str) -> None:
+        """Move a thread to the answer of a follow-up and extend its lifetime.
+
+        The thread is written back even if it was evicted while the follow-up ran, so
+        that the handle keeps working.
+        """
+        now = self.clock()
+        await self.store.put(
+            thread_id, Thread(response_id, now + self.ttl, thread.turns + 1), now
+        )
+        self.continued += 1
+
+    async def stats(self) -> dict:
+        return {
+            "threads": await self.store.count(self.clock()),
+            "started": self.started,
+            "continued": self.continued,
+            "expired": self.store.expired,
+            "evicted": self.store.evicted,
+        }
+
+    async def close(self) -> None:
+        await self.store.close()
+
+
+def create_thread_table() -> ThreadTable | None:
+    """Create the thread table configured by environment variables.
+
+    Environment variables:
+        THREAD_STORE: "memory" or "sqlite" (default: "sqlite" with more than one
+            SERVER_WORKERS, otherwise "memory"). The memory store cannot be used with
+            several workers, since a follow-up may reach a worker that does not know
+            its thread.
+        THREAD_SQLITE_PATH: Database file for the sqlite store (default: threads.db).
+        THREAD_MAX: Threads kept; 0 disables threads (default: 10000).
+        THREAD_TTL_SECONDS: Lifetime of a thread after its last answer (default: 3600).
+
+    Returns:
+        ThreadTable | None: The table, or None when threads are disabled.
+    """
+    max_threads = int(os.getenv("THREAD_MAX", "10000"))
+    if max_threads <= 0:
+        return None
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    store_name = os.getenv("THREAD_STORE", "sqlite" if workers > 1 else "memory")
+    if store_name == "memory":
+        if workers > 1:
+            raise ValueError(
+                f"THREAD_STORE=memory cannot be shared by {workers} SERVER_WORKERS; "
+                "use THREAD_STORE=sqlite."
+            )
+        store = InMemoryThreadStore(max_threads)
+    elif store_name == "sqlite":
+        store = SQLiteThreadStore(
+            os.getenv("THREAD_SQLITE_PATH", "threads.db"), max_threads
+        )
+    else:
+        raise ValueError(f"Unknown THREAD_STORE: {store_name}")
+    return ThreadTable(store, float(os.getenv("THREAD_TTL_SECONDS", "3600")))
@@ -0,0 +1,126 @@
+import itertools
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from benchmarks.fake_openai import CITATION_LINK, build_response
+
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit-requests": "10000",
+    "x-ratelimit-remaining-requests": "9999",
+}
+
+
+class FakeClock:
+    """A clock that only moves when the test advances it."""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeOpenAI:
+    """Answers Responses API requests in an httpx transport, without any network.
+
+    Queued failures are served first: an `httpx.Response` is returned as is and an
+    exception is raised as a transport error. Every answer streams the same events as
+    benchmarks/fake_openai.py, and the request bodies are kept for assertions.
+    """
+
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+        self.failures: list[httpx.Response | Exception] = []
+        self.events: list[dict] | None = None
+        self._ids = itertools.count()
+
+    def fail(self, *failures: httpx.Response | Exception) -> None:
+        self.failures.extend(failures)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        response = build_response(
+            f"resp_{next(self._ids)}",
+            body,
+            f"Answer to {body['input']} ({CITATION_LINK})",
+        )
+        events = self.events or [
+            {"type": "response.created", "response": {**response, "output": []}},
+            {
+                "type": "response.output_item.added",
+                "output_index": 0,
+                "item": {"type": "reasoning", "id": "rs_0", "summary": []},
+            },
+            {
+                "type": "response.web_search_call.searching",
+                "item_id": "ws_0",
+                "output_index": 1,
+            },
+            {
+                "type": "response.web_search_call.completed",
+                "item_id": "ws_0",
+                "output_index": 1,
+            },
+            *(
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": "msg_0",
+                    "output_index": 2,
+                    "content_index": 0,
+                    "delta": delta,
+                    "logprobs": [],
+                }
+                for delta in ("Answer to ", body["input"])
+            ),
+            {"type": "response.completed", "response": response},
+        ]
+        content = "".join(
+            f"event: {event['type']}\n"
+            f"data: {json.dumps({**event, 'sequence_number': number})}\n\n"
+            for number, event in enumerate(events)
+        )
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream", **RATE_LIMIT_HEADERS},
+            content=content.encode(),
+        )
+
+
+def error_response(status: int, headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(
+        status,
+        headers=headers,
+        json={"error": {"message": f"status {status}", "type": "error"}},
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+async def fake_openai(monkeypatch):
+    """Route the shared OpenAI client of the backends to a FakeOpenAI."""
+    fake = FakeOpenAI()
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="https://openai.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake.handle)),
+        max_retries=0,
+    )
+    monkeypatch.setattr("src.backends.get_openai_client", lambda: client)
+    yield fake
+    await client.close()
@@ -0,0 +1,120 @@
+import pytest
+
+from src.answer_index import AnswerIndex, query_terms
+from src.backends import BackendAnswer, Citation
+
+DAY = 86400
+
+
+@pytest.fixture
+async def index(tmp_path, clock):
+    index = AnswerIndex(
+        str(tmp_path / "answers.db"), retention=30 * DAY, max_answers=3, clock=clock
+    )
+    yield index
+    await index.close()
+
+
+def answer(text: str, url: str = "https://example.com/") -> BackendAnswer:
+    return BackendAnswer(text, citations=[Citation(url, "Example")])
+
+
+def test_query_terms_are_distinct_trigrams():
+    assert query_terms("Python python") == ["pyt", "yth", "tho", "hon"]
+    assert query_terms("東京の天気") == ["東京の", "京の天", "の天気"]
+    assert query_terms("an MCP") == ["mcp"]
+    assert query_terms("a b") == []
+
+
+async def test_answer_is_searchable_right_after_it_is_added(index):
+    assert await index.search("PostgreSQL release") == []
+
+    await index.add("PostgreSQL release date", "openai:o3", answer("In September."))
+
+    [found] = await index.search("PostgreSQL release")
+    assert (found.question, found.answer, found.backend) == (
+        "PostgreSQL release date",
+        "In September.",
+        "openai:o3",
+    )
+    assert found.citations == [Citation("https://example.com/", "Example")]
+
+
+async def test_question_match_ranks_before_answer_match(index):
+    await index.add("Rust borrow checker", "openai:o3", answer("About lifetimes."))
+    await index.add("Lifetimes in Go", "openai:o3", answer("The borrow checker ..."))
+
+    results = await index.search("borrow checker")
+
+    assert [result.question for result in results] == [
+        "Rust borrow checker",
+        "Lifetimes in Go",
+    ]
+
+
+async def test_cited_urls_are_searchable(index):
+    await index.add(
+        "Release notes",
+        "openai:o3",
+        answer("See the notes.", "https://docs.python.org/3.13/whatsnew/"),
+    )
+
+    [found] = await index.search("docs.python.org")
+    assert found.question == "Release notes"
+
+
+async def test_asking_again_replaces_the_answer(index):
+    await index.add("PostgreSQL release date", "openai:o3", answer("Old answer."))
+    await index.add("PostgreSQL  release date", "openai:o4-mini", answer("New answer."))
+
+    [found] = await index.search("PostgreSQL release")
+    assert (found.answer, found.backend) == ("New answer.", "openai:o4-mini")
+    assert (await index.stats())["answers"] == 1
+
+
+async def test_japanese_text_is_found_by_trigrams(index):
+    await index.add("東京の明日の天気は？", "openai:o3", answer("晴れのち曇りです．"))
+
+    assert [r.question for r in await index.search("明日の天気")] == [
+        "東京の明日の天気は？"
+    ]
+    assert await index.search("大阪の株価") == []
+
+
+async def test_max_age_filters_old_answers(index, clock):
+    await index.add("PostgreSQL release date", "openai:o3", answer("Old."))
+    clock.advance(2 * DAY)
+    await index.add("PostgreSQL release notes", "openai:o3", answer("New."))
+
+    recent = await index.search("PostgreSQL release", max_age=DAY)
+
+    assert [result.answer for result in recent] == ["New."]
+    assert len(await index.search("PostgreSQL release")) == 2
+
+
+async def test_purge_deletes_expired_then_excess_answers(index, clock):
+    await index.add("expired question one", "openai:o3", answer("1"))
+    clock.advance(31 * DAY)
+    for number in ("two", "three", "four", "five"):
+        clock.advance(1)
+        await index.add(f"kept question {number}", "openai:o3", answer(number))
+
+    # One expired answer and one above max_answers, oldest first.
+    assert await index.purge() == 2
+    assert await index.purge() == 0
+    questions = {r.question for r in await index.search("question", limit=10)}
+    assert questions == {
+        "kept question three",
+        "kept question four",
+        "kept question five",
+    }
+    assert (await index.stats())["purged"] == 2
+
+
+async def test_common_terms_do_not_hide_rare_ones(index):
+    for number in range(3):
+        await index.add(f"python question {number}", "openai:o3", answer("python"))
+    await index.add("python asyncio", "openai:o3", answer("python"))
+
+    [found, *_] = await index.search("python asyncio")
+    assert found.question == "python asyncio"
@@ -0,0 +1,157 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from src.backends import Citation, OpenAIBackend
+from src.rate_limit import AdaptiveConcurrencyLimiter, UpstreamLimiter
+from tests.conftest import error_response
+
+
+class RecordingEvents:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, str]] = []
+
+    async def status(self, message: str) -> None:
+        self.events.append(("status", message))
+
+    async def text(self, delta: str) -> None:
+        self.events.append(("text", delta))
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list[float]:
+    """Record the backoff delays of the limiter instead of sleeping."""
+    sleeps = []
+    sleep = asyncio.sleep
+
+    async def record(delay, *args, **kwargs):
+        sleeps.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr("src.rate_limit.asyncio.sleep", record)
+    return sleeps
+
+
+@pytest.fixture
+def backend() -> OpenAIBackend:
+    limiter = UpstreamLimiter(
+        requests=None,
+        tokens=None,
+        concurrency=AdaptiveConcurrencyLimiter(
+            initial=8, minimum=1, maximum=32, max_wait=1, max_queue=10
+        ),
+        max_retries=2,
+        base_delay=1,
+        max_delay=30,
+    )
+    return OpenAIBackend("o3", "Answer with sources.", 1, limiter, 1000)
+
+
+async def test_streams_progress_and_text(backend, fake_openai):
+    events = RecordingEvents()
+
+    answer = await backend.search("what is MCP?", events)
+
+    assert events.events == [
+        ("status", "Reasoning"),
+        ("status", "Searching the web"),
+        ("status", "Web search completed"),
+        ("text", "Answer to "),
+        ("text", "what is MCP?"),
+    ]
+    assert answer.text.startswith("Answer to what is MCP?")
+    assert answer.citations == [
+        Citation("https://example.com/?utm_source=openai", "Example")
+    ]
+    assert answer.response_id == "resp_0"
+    assert answer.total_tokens is not None
+    assert fake_openai.requests[0]["stream"] is True
+    assert "previous_response_id" not in fake_openai.requests[0]
+
+
+async def test_follow_up_is_chained_to_previous_response(backend, fake_openai):
+    first = await backend.search("what is MCP?", RecordingEvents())
+    await backend.search("who maintains it?", RecordingEvents(), first.response_id)
+
+    assert fake_openai.requests[1]["previous_response_id"] == "resp_0"
+
+
+async def test_retries_throttling_after_retry_after(backend, fake_openai, sleeps):
+    fake_openai.fail(error_response(429, {"retry-after-ms": "250"}))
+
+    answer = await backend.search("what is MCP?", RecordingEvents())
+
+    assert answer.response_id == "resp_0"
+    assert len(fake_openai.requests) == 2
+    assert sleeps == [0.25]
+    # Throttling halves the concurrency limit, the success then grows it slightly.
+    assert 4 <= backend.limiter.concurrency.limit < 5
+
+
+async def test_retries_transient_failures_with_backoff(backend, fake_openai, sleeps):
+    fake_openai.fail(error_response(503), httpx.ConnectError("connection refused"))
+
+    answer = await backend.search("what is MCP?", RecordingEvents())
+
+    assert answer.response_id == "resp_0"
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2
+
+
+async def test_gives_up_after_max_retries(backend, fake_openai, sleeps):
+    fake_openai.fail(*(error_response(500) for _ in range(3)))
+
+    with pytest.raises(openai.InternalServerError):
+        await backend.search("what is MCP?", RecordingEvents())
+    assert len(fake_openai.requests) == 3
+    assert len(sleeps) == 2
+
+
+async def test_client_errors_are_not_retried(backend, fake_openai, sleeps):
+    fake_openai.fail(error_response(400))
+
+    with pytest.raises(openai.BadRequestError):
+        await backend.search("what is MCP?", RecordingEvents())
+    assert len(fake_openai.requests) == 1
+    assert sleeps == []
+
+
+async def test_failed_response_raises(backend, fake_openai):
+    fake_openai.events = [
+        {
+            "type": "response.failed",
+            "response": {
+                "id": "resp_0",
+                "object": "response",
+                "created_at": 0,
+                "model": "o3",
+                "status": "failed",
+                "error": {"code": "server_error", "message": "boom"},
+                "output": [],
+                "parallel_tool_calls": True,
+                "tool_choice": "auto",
+                "tools": [],
+            },
+        }
+    ]
+
+    with pytest.raises(RuntimeError, match="Response failed"):
+        await backend.search("what is MCP?", RecordingEvents())
+
+
+async def test_stream_ending_early_raises(backend, fake_openai):
+    fake_openai.events = [
+        {
+            "type": "response.output_text.delta",
+            "item_id": "msg_0",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": "Answer",
+            "logprobs": [],
+        }
+    ]
+
+    with pytest.raises(RuntimeError, match="ended before the response completed"):
+        await backend.search("what is MCP?", RecordingEvents())
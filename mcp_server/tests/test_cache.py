@@ -0,0 +1,115 @@
+import pytest
+
+from src.backends import BackendAnswer, Citation
+from src.cache import (
+    AnswerCache,
+    InMemoryBackend,
+    MinHashIndex,
+    SQLiteBackend,
+    decode_answer,
+    encode_answer,
+    make_cache_key,
+)
+
+TOOLS = [{"type": "web_search_preview"}]
+REQUEST = ("o3", TOOLS, "Answer with sources.")
+
+
+def test_cache_key_ignores_case_width_and_whitespace():
+    key = make_cache_key("What is MCP?", *REQUEST)
+
+    assert make_cache_key("  what   is ＭＣＰ？ ", *REQUEST) == key
+    assert make_cache_key("What is MCP?", "o4-mini", *REQUEST[1:]) != key
+
+
+def test_answers_round_trip_with_citations():
+    answer = BackendAnswer(
+        "MCP is a protocol.",
+        citations=[Citation("https://example.com", "Example")],
+        response_id="resp_1",
+    )
+
+    assert decode_answer(encode_answer(answer)) == answer
+    assert decode_answer("plain text from an older version") == BackendAnswer(
+        "plain text from an older version"
+    )
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "memory":
+        backend = InMemoryBackend(max_entries=2, clock=clock)
+    else:
+        backend = SQLiteBackend(str(tmp_path / "cache.db"), 2, clock)
+    yield backend
+    if request.param == "sqlite":
+        backend._conn.close()
+
+
+async def test_backend_expires_entries(backend, clock):
+    await backend.set("a", "answer", ttl=60)
+    clock.advance(59)
+    assert await backend.get("a") == "answer"
+
+    clock.advance(1)
+    assert await backend.get("a") is None
+
+
+async def test_backend_evicts_least_recently_used(backend, clock):
+    await backend.set("a", "1", ttl=60)
+    clock.advance(1)
+    await backend.set("b", "2", ttl=60)
+    clock.advance(1)
+    assert await backend.get("a") == "1"
+    clock.advance(1)
+    await backend.set("c", "3", ttl=60)
+
+    assert await backend.get("a") == "1"
+    assert await backend.get("b") is None
+    assert await backend.get("c") == "3"
+
+
+async def test_sqlite_backend_is_shared_through_the_file(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    writer, reader = SQLiteBackend(path, clock=clock), SQLiteBackend(path, clock=clock)
+
+    await writer.set("a", "answer", ttl=60)
+
+    assert await reader.get("a") == "answer"
+    await writer.close()
+    await reader.close()
+
+
+async def test_answer_cache_exact_near_and_miss(clock):
+    cache = AnswerCache(
+        InMemoryBackend(clock=clock), ttl=60, near_duplicate=MinHashIndex(0.5)
+    )
+    answer = BackendAnswer("MCP is a protocol.", response_id="resp_1")
+    await cache.set("What is the Model Context Protocol?", *REQUEST, answer)
+
+    assert await cache.get("what is the model context protocol?", *REQUEST) == answer
+    assert await cache.get("What is the Model Context Protocol", *REQUEST) == answer
+    assert await cache.get("How do I bake bread?", *REQUEST) is None
+    assert (
+        await cache.get("What is the Model Context Protocol?", "o4-mini", *REQUEST[1:])
+        is None
+    )
+    assert cache.stats() == {
+        "exact_hits": 1,
+        "near_hits": 1,
+        "misses": 2,
+        "hit_ratio": 0.5,
+    }
+
+
+async def test_near_duplicate_of_expired_answer_is_forgotten(clock):
+    index = MinHashIndex(0.5)
+    cache = AnswerCache(InMemoryBackend(clock=clock), ttl=60, near_duplicate=index)
+    await cache.set("What is the Model Context Protocol?", *REQUEST, BackendAnswer("x"))
+    clock.advance(60)
+
+    assert await cache.get("What is the Model Context Protocol", *REQUEST) is None
+    assert (
+        index.find(make_cache_key("", *REQUEST), "What is the Model Context Protocol")
+        is None
+    )
@@ -0,0 +1,162 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from deploy_plan import (
+    Fingerprint,
+    fingerprint,
+    hash_files,
+    plan_deploy,
+    preserve_file,
+)
+
+ENV = {"OPENAI_API_KEY": "sk-test", "SEARCH_BACKENDS": "openai"}
+SETTINGS = {"roleArn": "arn:aws:iam::123456789012:role/agentcore-test-role"}
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    """A minimal mcp_server tree with every input of the image."""
+    files = {
+        "pyproject.toml": "[project]\nname = 'mcp-server'\n",
+        "uv.lock": "version = 1\n",
+        "Dockerfile": "FROM python:3.12-slim\n",
+        "src/__init__.py": "",
+        "src/mcp_server.py": "print('hello')\n",
+        "scripts/entrypoint.sh": "#!/bin/sh\n",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def test_source_change_only_changes_source_hash(root):
+    before = fingerprint(root, ENV, SETTINGS)
+    (root / "src/mcp_server.py").write_text("print('bye')\n")
+    after = fingerprint(root, ENV, SETTINGS)
+
+    assert after.source != before.source
+    assert after.image_tag != before.image_tag
+    assert (after.dependencies, after.env, after.settings) == (
+        before.dependencies,
+        before.env,
+        before.settings,
+    )
+
+
+def test_env_change_only_changes_env_hash(root):
+    before = fingerprint(root, ENV, SETTINGS)
+    after = fingerprint(root, {**ENV, "SEARCH_BACKENDS": "openai,bing"}, SETTINGS)
+
+    assert after.env != before.env
+    assert after.image_tag == before.image_tag
+    assert replace(after, env=before.env) == before
+
+
+def test_renaming_a_file_changes_hash(root):
+    before = hash_files(root, ["src"])
+    (root / "src/mcp_server.py").rename(root / "src/server.py")
+
+    assert hash_files(root, ["src"]) != before
+
+
+def test_moving_bytes_between_files_changes_hash(root):
+    (root / "src/a.py").write_text("ab")
+    (root / "src/b.py").write_text("")
+    before = hash_files(root, ["src"])
+    (root / "src/a.py").write_text("a")
+    (root / "src/b.py").write_text("b")
+
+    assert hash_files(root, ["src"]) != before
+
+
+def test_bytecode_caches_are_ignored(root):
+    before = fingerprint(root, ENV, SETTINGS)
+    cache = root / "src/__pycache__"
+    cache.mkdir()
+    (cache / "mcp_server.cpython-312.pyc").write_bytes(b"\x00bytecode")
+
+    assert fingerprint(root, ENV, SETTINGS) == before
+
+
+def test_missing_paths_are_skipped(root):
+    assert hash_files(root, ["Dockerfile", ".dockerignore"]) == hash_files(
+        root, ["Dockerfile"]
+    )
+
+
+@pytest.fixture
+def deployed() -> Fingerprint:
+    return Fingerprint(dependencies="d1", source="s1", env="e1", settings="x1")
+
+
+@pytest.mark.parametrize(
+    ("changes", "image_exists", "force", "action", "reason"),
+    [
+        ({}, True, False, "skip", "nothing changed since the last deploy"),
+        ({}, True, True, "build", "forced"),
+        ({"env": "e2"}, True, False, "update", "only the environment variables"),
+        ({"source": "s2"}, True, False, "update", "was already built"),
+        ({"settings": "x2"}, True, False, "build", "runtime settings changed"),
+        ({"dependencies": "d2"}, False, False, "build", "dependencies changed"),
+        ({"source": "s2"}, False, False, "build", "source changed"),
+        ({"env": "e2"}, False, False, "build", "not found in ECR"),
+        ({}, False, False, "build", "not found in ECR"),
+    ],
+)
+def test_plan_deploy(deployed, changes, image_exists, force, action, reason):
+    current = replace(deployed, **changes)
+
+    plan = plan_deploy(current, deployed, image_exists, force)
+
+    assert plan.action == action
+    assert reason in plan.reason
+
+
+def test_plan_deploy_without_previous_deploy(deployed):
+    plan = plan_deploy(deployed, None, image_exists=True)
+
+    assert (plan.action, plan.reason) == ("build", "no previous deploy recorded")
+
+
+def test_src_only_change_updates_to_existing_image_or_builds(root):
+    deployed = fingerprint(root, ENV, SETTINGS)
+    (root / "src/mcp_server.py").write_text("print('bye')\n")
+    current = fingerprint(root, ENV, SETTINGS)
+
+    assert plan_deploy(current, deployed, image_exists=True).action == "update"
+    assert plan_deploy(current, deployed, image_exists=False).action == "build"
+
+
+def test_env_only_change_never_builds(root):
+    deployed = fingerprint(root, ENV, SETTINGS)
+    current = fingerprint(root, {**ENV, "OPENAI_API_KEY": "sk-rotated"}, SETTINGS)
+
+    plan = plan_deploy(current, deployed, image_exists=True)
+
+    assert (plan.action, plan.reason) == (
+        "update",
+        "only the environment variables changed",
+    )
+
+
+def test_preserve_file_restores_content_after_failure(root):
+    dockerfile = root / "Dockerfile"
+
+    with pytest.raises(RuntimeError), preserve_file(dockerfile):
+        dockerfile.write_text("FROM toolkit-template\n")
+        raise RuntimeError("configure failed")
+
+    assert dockerfile.read_text() == "FROM python:3.12-slim\n"
+
+
+def test_preserve_file_keeps_new_file(tmp_path):
+    dockerfile = tmp_path / "Dockerfile"
+
+    with preserve_file(dockerfile):
+        dockerfile.write_text("FROM toolkit-template\n")
+
+    assert dockerfile.read_text() == "FROM toolkit-template\n"
@@ -0,0 +1,198 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from src.fair_share import (
+    ANONYMOUS,
+    FairScheduler,
+    QuotaExceededError,
+    caller_identity,
+    create_fair_scheduler,
+    parse_weights,
+)
+from src.rate_limit import OverloadedError
+
+
+def bearer(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    return f"Bearer header.{payload.decode()}.signature"
+
+
+def test_caller_identity_from_jwt_claims():
+    assert caller_identity({"authorization": bearer({"sub": "user-1"})}) == "user-1"
+    assert (
+        caller_identity({"authorization": bearer({"client_id": "agent-a"})})
+        == "agent-a"
+    )
+    assert caller_identity({"authorization": "Bearer not-a-jwt"}) == ANONYMOUS
+    assert caller_identity({}) == ANONYMOUS
+
+
+def test_create_fair_scheduler_divides_quotas_between_workers(monkeypatch):
+    monkeypatch.setenv("SERVER_WORKERS", "4")
+    monkeypatch.setenv("FAIR_SHARE_CALLER_CONCURRENCY", "6")
+    monkeypatch.setenv("FAIR_SHARE_CALLER_RPM", "60")
+    monkeypatch.setenv("FAIR_SHARE_WEIGHTS", "agent-a=2, agent-b=0.5")
+
+    scheduler = create_fair_scheduler(lambda: 8)
+
+    assert scheduler.max_concurrency == 2
+    assert scheduler.rate == 15 / 60
+    assert scheduler.weights == parse_weights("agent-a=2,agent-b=0.5")
+    monkeypatch.setenv("FAIR_SHARE_ENABLED", "0")
+    assert create_fair_scheduler(lambda: 8) is None
+
+
+async def settle() -> None:
+    """Let every runnable task reach its next wait."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def admitted_in_order(scheduler: FairScheduler, callers: list[str]) -> list[str]:
+    """Queue one call per entry of `callers` behind a held slot and release it."""
+    order = []
+
+    async def call(caller: str) -> None:
+        async with scheduler.slot(caller):
+            order.append(caller)
+
+    async with scheduler.slot("holder"):
+        tasks = [asyncio.create_task(call(caller)) for caller in callers]
+        await settle()
+    await asyncio.gather(*tasks)
+    return order
+
+
+async def test_weights_set_the_share_of_busy_callers():
+    scheduler = FairScheduler(lambda: 1, max_concurrency=0, weights={"a": 2})
+
+    order = await admitted_in_order(scheduler, ["a"] * 6 + ["b"] * 6)
+
+    # While both have calls queued, "a" gets two slots for every one of "b".
+    assert order[:6] == ["a", "a", "b", "a", "a", "b"]
+    assert order[6:].count("b") == 4
+
+
+async def test_queued_burst_does_not_delay_another_caller():
+    scheduler = FairScheduler(lambda: 1, max_concurrency=0)
+
+    order = await admitted_in_order(scheduler, ["heavy"] * 10 + ["light"])
+
+    assert order.index("light") <= 1
+
+
+async def test_cancelled_waiter_releases_its_place():
+    scheduler = FairScheduler(lambda: 1)
+
+    async with scheduler.slot("holder"):
+        waiting = asyncio.create_task(scheduler.slot("a").__aenter__())
+        await settle()
+        assert scheduler.stats()["queued"] == 1
+        waiting.cancel()
+        await settle()
+        assert scheduler.stats()["queued"] == 0
+
+    stats = scheduler.stats()
+    assert (stats["in_flight"], stats["callers"]["a"]["admitted"]) == (0, 0)
+    async with scheduler.slot("b"):
+        assert scheduler.in_flight == 1
+
+
+async def test_slot_granted_while_cancelling_is_handed_on():
+    scheduler = FairScheduler(lambda: 1)
+    admitted = []
+
+    async def call(caller: str) -> None:
+        async with scheduler.slot(caller):
+            admitted.append(caller)
+
+    async with scheduler.slot("holder"):
+        first = asyncio.create_task(call("a"))
+        second = asyncio.create_task(call("b"))
+        await settle()
+    # Leaving the slot granted it to "a"; "a" is cancelled before it could run.
+    first.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+
+    # Python 3.11 lets "a" use the slot it was granted, later versions cancel it and
+    # hand the slot to "b" right away; either way no slot is lost.
+    assert admitted in (["a", "b"], ["b"])
+    assert scheduler.in_flight == 0
+    assert scheduler.stats()["queued"] == 0
+
+
+async def test_cancelled_call_releases_its_slot():
+    scheduler = FairScheduler(lambda: 1)
+    started = asyncio.Event()
+
+    async def call() -> None:
+        async with scheduler.slot("a"):
+            started.set()
+            await asyncio.Event().wait()
+
+    task = asyncio.create_task(call())
+    await started.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert scheduler.in_flight == 0
+    assert scheduler.stats()["callers"]["a"]["in_flight"] == 0
+
+
+async def test_wait_beyond_max_wait_is_overloaded():
+    scheduler = FairScheduler(lambda: 1, max_wait=0.01)
+
+    async with scheduler.slot("holder"):
+        with pytest.raises(OverloadedError):
+            async with scheduler.slot("a"):
+                pass
+
+    assert scheduler.stats()["queued"] == 0
+    assert scheduler.in_flight == 0
+
+
+async def test_concurrency_quota_rejects_without_queuing():
+    scheduler = FairScheduler(lambda: 1, max_concurrency=2)
+
+    async with scheduler.slot("a"):
+        queued = asyncio.create_task(scheduler.slot("a").__aenter__())
+        await settle()
+        with pytest.raises(QuotaExceededError) as error:
+            async with scheduler.slot("a"):
+                pass
+        queued.cancel()
+        await settle()
+
+    assert json.loads(str(error.value))["quota"] == "concurrency"
+    assert scheduler.stats()["callers"]["a"]["rejected"] == {"concurrency": 1}
+
+
+async def test_anonymous_callers_have_no_quota():
+    scheduler = FairScheduler(lambda: 8, max_concurrency=1, rate_per_minute=6)
+
+    async with scheduler.slot(ANONYMOUS), scheduler.slot(ANONYMOUS):
+        assert scheduler.in_flight == 2
+
+
+async def test_rate_quota_refills_over_time(clock):
+    scheduler = FairScheduler(lambda: 8, rate_per_minute=6, clock=clock)
+
+    async with scheduler.slot("a"):
+        pass
+    with pytest.raises(QuotaExceededError) as error:
+        async with scheduler.slot("a"):
+            pass
+    assert json.loads(str(error.value)) == {
+        "error": "quota_exceeded",
+        "caller": "a",
+        "quota": "rate",
+        "retry_after": 10.0,
+    }
+
+    clock.advance(10)
+    async with scheduler.slot("a"):
+        pass
+    assert scheduler.stats()["callers"]["a"]["admitted"] == 2
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from src.hedging import Hedger
+
+# Latency of the primed calls in fake-clock seconds, which becomes the hedge delay.
+DELAY = 0.2
+
+
+class FakeBackend:
+    """Answers after a scripted real delay; the fake clock advances by `latency`."""
+
+    def __init__(self, name: str, clock, latency: float = DELAY) -> None:
+        self.name = name
+        self.clock = clock
+        self.latency = latency
+        self.sleep = 0.0
+        self.error: Exception | None = None
+        self.calls = 0
+        self.cancelled = 0
+
+    async def search(self, events) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.sleep)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.clock.advance(self.latency)
+        if self.error is not None:
+            raise self.error
+        return f"answer from {self.name}"
+
+
+class RecordingEvents:
+    def __init__(self) -> None:
+        self.statuses: list[str] = []
+
+    async def status(self, message: str) -> None:
+        self.statuses.append(message)
+
+    async def text(self, delta: str) -> None:
+        pass
+
+
+def search(backend, events):
+    return backend.search(events)
+
+
+@pytest.fixture
+def primary(clock) -> FakeBackend:
+    return FakeBackend("primary", clock)
+
+
+@pytest.fixture
+def fallback(clock) -> FakeBackend:
+    return FakeBackend("fallback", clock)
+
+
+async def primed(primary, **options) -> Hedger:
+    """A hedger that has seen three calls of DELAY seconds to `primary`."""
+    hedger = Hedger(0.95, options.pop("max_rate", 1.0), min_samples=3, **options)
+    for _ in range(3):
+        await hedger.call([primary], primary, RecordingEvents(), search)
+    return hedger
+
+
+async def test_no_hedge_before_enough_samples(primary, clock):
+    hedger = Hedger(0.95, 1.0, min_samples=3, clock=clock)
+    primary.sleep = 0.05
+
+    assert hedger.hedge_delay(primary) is None
+    assert await hedger.call([primary], primary, RecordingEvents(), search) == (
+        primary,
+        "answer from primary",
+    )
+    assert hedger.hedges == 0
+
+
+async def test_no_hedge_when_primary_answers_within_delay(primary, clock):
+    hedger = await primed(primary, clock=clock)
+
+    assert hedger.hedge_delay(primary) == pytest.approx(DELAY)
+    backend, _ = await hedger.call([primary], primary, RecordingEvents(), search)
+
+    assert backend is primary
+    assert (hedger.hedges, primary.calls) == (0, 4)
+
+
+async def test_hedge_wins_and_primary_is_cancelled(primary, fallback, clock):
+    hedger = await primed(primary, clock=clock, target="next")
+    primary.sleep = 10
+    events = RecordingEvents()
+
+    backend, result = await hedger.call([primary, fallback], primary, events, search)
+
+    assert (backend, result) == (fallback, "answer from fallback")
+    assert events.statuses == ["Hedging with fallback"]
+    assert primary.cancelled == 1
+    assert hedger.snapshot() == {
+        "requests": 4,
+        "hedges": 1,
+        "hedge_wins": 1,
+        "hedge_rate": 0.25,
+    }
+
+
+async def test_primary_wins_after_hedge_started(primary, fallback, clock):
+    hedger = await primed(primary, clock=clock, target="next")
+    primary.sleep = DELAY * 2
+    fallback.sleep = 10
+
+    backend, _ = await hedger.call(
+        [primary, fallback], primary, RecordingEvents(), search
+    )
+
+    assert backend is primary
+    assert fallback.cancelled == 1
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 0)
+
+
+async def test_hedge_failure_waits_for_primary(primary, fallback, clock):
+    hedger = await primed(primary, clock=clock, target="next")
+    primary.sleep = DELAY * 2
+    fallback.error = RuntimeError("fallback failed")
+
+    backend, _ = await hedger.call(
+        [primary, fallback], primary, RecordingEvents(), search
+    )
+
+    assert backend is primary
+
+
+async def test_both_failing_raises_primary_error(primary, fallback, clock):
+    hedger = await primed(primary, clock=clock, target="next")
+    primary.sleep = DELAY * 2
+    primary.error = RuntimeError("primary failed")
+    fallback.error = RuntimeError("fallback failed")
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        await hedger.call([primary, fallback], primary, RecordingEvents(), search)
+
+
+async def test_hedge_rate_is_capped(primary, clock):
+    hedger = await primed(primary, clock=clock, max_rate=0.25)
+    primary.sleep = DELAY * 1.5
+
+    await hedger.call([primary], primary, RecordingEvents(), search)
+    assert hedger.hedges == 1
+    # One hedge in the four recent requests reaches the cap.
+    await hedger.call([primary], primary, RecordingEvents(), search)
+    assert hedger.hedges == 1
+
+
+async def test_cancelled_call_cancels_primary_during_hedge_delay(primary, clock):
+    hedger = await primed(primary, clock=clock)
+    primary.sleep = 10
+
+    call = asyncio.create_task(
+        hedger.call([primary], primary, RecordingEvents(), search)
+    )
+    await asyncio.sleep(DELAY / 4)
+    call.cancel()
+    await asyncio.gather(call, return_exceptions=True)
+
+    assert primary.cancelled == 1
+    assert hedger.hedges == 0
@@ -0,0 +1,176 @@
+import asyncio
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from src.jobs import (
+    InMemoryJobStore,
+    Job,
+    JobRunner,
+    SQLiteJobStore,
+    current_owner,
+    owner_alive,
+)
+from src.rate_limit import OverloadedError
+
+TTL = 600
+
+
+class FakeHandler:
+    """Answers each job with its question, once `gate` is open."""
+
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.calls: list[dict] = []
+
+    async def __call__(self, arguments: dict) -> str:
+        self.calls.append(arguments)
+        await self.gate.wait()
+        if "error" in arguments:
+            raise RuntimeError(arguments["error"])
+        return f"answer to {arguments['question']}"
+
+
+@pytest.fixture
+def handler() -> FakeHandler:
+    return FakeHandler()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return InMemoryJobStore(clock=clock)
+    return SQLiteJobStore(str(tmp_path / "jobs.db"), clock=clock)
+
+
+@pytest.fixture
+async def runner(store, handler, clock):
+    runner = JobRunner(store, handler, workers=1, max_queued=2, ttl=TTL, clock=clock)
+    await runner.start()
+    yield runner
+    await runner.close()
+
+
+def dead_owner() -> str:
+    """Owner name of a process on this host that has exited."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"{socket.gethostname()}:{process.pid}"
+
+
+async def settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_submit_and_wait(runner, clock):
+    job = await runner.submit({"question": "what is MCP?"})
+
+    finished = await runner.wait(job.id, timeout=5)
+
+    assert finished.status == "succeeded"
+    assert finished.result == "answer to what is MCP?"
+    assert finished.created_at == clock()
+    assert finished.expires_at == finished.finished_at + TTL
+    assert runner.stats() == {
+        "workers": 1,
+        "queued": 0,
+        "running": 0,
+        "submitted": 1,
+        "succeeded": 1,
+        "failed": 0,
+        "recovered": 0,
+    }
+
+
+async def test_failed_job_keeps_error(runner):
+    job = await runner.submit({"question": "?", "error": "upstream failed"})
+
+    finished = await runner.wait(job.id, timeout=5)
+
+    assert (finished.status, finished.error) == ("failed", "upstream failed")
+    assert runner.stats()["failed"] == 1
+
+
+async def test_wait_returns_unfinished_job_after_timeout(runner, handler):
+    handler.gate.clear()
+    job = await runner.submit({"question": "slow"})
+
+    waited = await runner.wait(job.id, timeout=0.01)
+
+    assert waited.status == "running"
+    assert await runner.wait("unknown", timeout=0.01) is None
+
+
+async def test_rejects_submissions_when_queue_is_full(runner, handler):
+    handler.gate.clear()
+    running = await runner.submit({"question": "first"})
+    await settle()
+    queued = [await runner.submit({"question": f"q{i}"}) for i in range(2)]
+
+    with pytest.raises(OverloadedError) as rejected:
+        await runner.submit({"question": "one too many"})
+
+    assert rejected.value.reason == "job_queue_full"
+    # No job has finished yet to estimate the wait from.
+    assert rejected.value.retry_after == 1.0
+    assert runner.stats()["queued"] == 2
+    handler.gate.set()
+    for job in [running, *queued]:
+        assert (await runner.wait(job.id, timeout=5)).status == "succeeded"
+
+
+async def test_results_expire_after_ttl(runner, store, clock):
+    job = await runner.submit({"question": "what is MCP?"})
+    await runner.wait(job.id, timeout=5)
+
+    clock.advance(TTL - 1)
+    assert await runner.get(job.id) is not None
+    clock.advance(1)
+    assert await runner.get(job.id) is None
+    assert await store.purge() == 1
+    assert await store.purge() == 0
+
+
+async def test_recovers_jobs_orphaned_in_sqlite_store(tmp_path, handler, clock):
+    path = str(tmp_path / "jobs.db")
+    expires_at = clock() + TTL
+    jobs = {
+        "orphaned": Job("orphaned", {"question": "q"}, dead_owner(), expires_at),
+        "running": Job("running", {"question": "q"}, current_owner(), expires_at),
+        "remote": Job("remote", {"question": "q"}, "other-host:1", expires_at),
+        "done": Job(
+            "done", {}, dead_owner(), expires_at, status="succeeded", result="a"
+        ),
+        "expired": Job("expired", {"question": "q"}, dead_owner(), clock()),
+    }
+    jobs["orphaned"].status = "running"
+    store = SQLiteJobStore(path, clock=clock)
+    for job in jobs.values():
+        await store.put(job)
+    await store.close()
+
+    runner = JobRunner(SQLiteJobStore(path, clock=clock), handler, ttl=TTL, clock=clock)
+    await runner.start()
+    try:
+        recovered = await runner.wait("orphaned", timeout=5)
+        await settle()
+        others = {job_id: await runner.get(job_id) for job_id in jobs}
+    finally:
+        await runner.close()
+
+    assert runner.recovered == 1
+    assert (recovered.status, recovered.owner) == ("succeeded", runner.owner)
+    assert handler.calls == [{"question": "q"}]
+    assert others["running"].status == others["remote"].status == "queued"
+    assert others["done"].result == "a"
+    assert others["expired"] is None
+
+
+def test_owner_alive():
+    assert owner_alive(current_owner())
+    assert not owner_alive(dead_owner())
+    assert owner_alive("other-host:1")
@@ -0,0 +1,225 @@
+import asyncio
+
+import pytest
+
+from src.backends import BackendAnswer
+from src.popular import PopularAnswers
+
+TTL = 3600
+
+
+class Upstream:
+    """Fresh answers for refreshes, held back until `release` is set."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error: Exception | None = None
+
+    async def refresh(self) -> BackendAnswer:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return BackendAnswer(f"fresh answer {self.calls}")
+
+
+@pytest.fixture
+def upstream() -> Upstream:
+    return Upstream()
+
+
+@pytest.fixture
+def make_store(clock):
+    stores = []
+
+    def make(**options) -> PopularAnswers:
+        store = PopularAnswers(fresh_ttl=TTL, max_stale=4 * TTL, clock=clock, **options)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        for task in store._refreshes:
+            task.cancel()
+
+
+def ask(store: PopularAnswers, upstream: Upstream, key: str, times: int = 1) -> None:
+    for _ in range(times):
+        store.record(key, f"question {key}", upstream.refresh)
+
+
+def lookup(store: PopularAnswers, upstream: Upstream, key: str) -> BackendAnswer | None:
+    """Look a question up the way web_search does: count the access, then get."""
+    ask(store, upstream, key)
+    return store.get(key)
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_fresh_answer_is_served_as_is(make_store, upstream, clock):
+    store = make_store()
+    ask(store, upstream, "q")
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL)
+
+    assert lookup(store, upstream, "q") == BackendAnswer("answer")
+    assert store.stats()["fresh_served"] == 1
+    assert upstream.calls == 0
+
+
+async def test_stale_answer_to_popular_question_is_served_and_refreshed(
+    make_store, upstream, clock
+):
+    store = make_store()
+    ask(store, upstream, "q", times=2)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+
+    stale = lookup(store, upstream, "q")
+    assert (stale.text, stale.age) == ("answer", TTL + 1)
+    await settle()
+
+    assert upstream.calls == 1
+    assert lookup(store, upstream, "q") == BackendAnswer("fresh answer 1")
+    assert (store.stale_served, store.refreshed) == (1, 1)
+
+
+async def test_stale_answer_to_one_off_question_is_not_served(
+    make_store, upstream, clock
+):
+    store = make_store()
+    ask(store, upstream, "q")
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+
+    assert lookup(store, upstream, "q") is None
+    assert upstream.calls == 0
+
+
+async def test_popularity_decays(make_store, upstream, clock):
+    store = make_store(half_life=TTL / 4)
+    ask(store, upstream, "q", times=2)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+
+    # Two accesses halved four times plus this one are below min_hits.
+    assert lookup(store, upstream, "q") is None
+
+
+async def test_answer_older_than_max_stale_is_not_served(make_store, upstream, clock):
+    store = make_store()
+    ask(store, upstream, "q", times=5)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(4 * TTL + 1)
+
+    assert lookup(store, upstream, "q") is None
+
+
+async def test_one_refresh_per_question_at_a_time(make_store, upstream, clock):
+    store = make_store()
+    ask(store, upstream, "q", times=2)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+    upstream.release.clear()
+
+    lookup(store, upstream, "q")
+    lookup(store, upstream, "q")
+    await settle()
+
+    assert upstream.calls == 1
+    assert store.stats()["refreshing"] == 1
+    upstream.release.set()
+    await settle()
+    assert store.stats()["refreshing"] == 0
+
+
+async def test_refresh_budget_refills_over_time(make_store, upstream, clock):
+    # 12 per hour: a burst of one, then one every five minutes.
+    store = make_store(refresh_per_hour=12)
+    for key in ("a", "b"):
+        ask(store, upstream, key, times=2)
+        store.store(key, BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+
+    assert lookup(store, upstream, "a").age is not None
+    assert lookup(store, upstream, "b").age is not None
+    await settle()
+    assert upstream.calls == 1
+    assert store.skipped == {"budget": 1}
+
+    clock.advance(300)
+    lookup(store, upstream, "b")
+    await settle()
+    assert upstream.calls == 2
+
+
+async def test_refresh_concurrency_is_bounded(make_store, upstream, clock):
+    store = make_store(max_concurrency=1)
+    for key in ("a", "b"):
+        ask(store, upstream, key, times=2)
+        store.store(key, BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+    upstream.release.clear()
+
+    lookup(store, upstream, "a")
+    lookup(store, upstream, "b")
+    await settle()
+
+    assert upstream.calls == 1
+    assert store.skipped == {"concurrency": 1}
+
+
+async def test_no_refresh_while_upstream_is_busy(make_store, upstream, clock):
+    busy = True
+    store = make_store(refresh_per_hour=12, busy=lambda: busy)
+    ask(store, upstream, "q", times=2)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+
+    assert lookup(store, upstream, "q").age is not None
+    assert store.skipped == {"busy": 1}
+    busy = False
+    # Being busy did not use up the budget.
+    lookup(store, upstream, "q")
+    await settle()
+    assert upstream.calls == 1
+
+
+async def test_failed_refresh_keeps_stale_answer(make_store, upstream, clock):
+    store = make_store()
+    ask(store, upstream, "q", times=2)
+    store.store("q", BackendAnswer("answer"))
+    clock.advance(TTL + 1)
+    upstream.error = RuntimeError("upstream failed")
+
+    lookup(store, upstream, "q")
+    await settle()
+
+    assert store.refresh_errors == 1
+    assert lookup(store, upstream, "q").text == "answer"
+    await settle()
+    assert upstream.calls == 2
+
+
+async def test_most_popular_questions_are_refreshed_ahead(make_store, upstream, clock):
+    store = make_store(top_n=1)
+    ask(store, upstream, "top", times=3)
+    ask(store, upstream, "second", times=2)
+    ask(store, upstream, "rare")
+    for key in ("top", "second", "rare"):
+        store.store(key, BackendAnswer("answer"))
+
+    clock.advance(0.8 * TTL - 1)
+    assert store.refresh_popular() == 0
+    clock.advance(1)
+    assert [key for key, _ in store.due()] == ["top"]
+    assert store.refresh_popular() == 1
+    await settle()
+
+    assert lookup(store, upstream, "top") == BackendAnswer("fresh answer 1")
+    assert upstream.calls == 1
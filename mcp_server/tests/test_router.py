@@ -0,0 +1,171 @@
+import json
+
+import pytest
+from mcp.server.fastmcp.exceptions import ToolError
+
+from src.fair_share import QuotaExceededError
+from src.rate_limit import OverloadedError
+from src.router import BackendRouter
+
+
+class FakeBackend:
+    """A search backend whose calls take `latency` seconds of the fake clock."""
+
+    def __init__(self, name: str, clock, cost: float = 1, latency: float = 1):
+        self.name = name
+        self.tools = []
+        self.instructions = ""
+        self.cost = cost
+        self.supports_threads = True
+        self.clock = clock
+        self.latency = latency
+        self.error: Exception | None = None
+        self.calls = 0
+
+    async def search(self) -> str:
+        self.calls += 1
+        self.clock.advance(self.latency)
+        if self.error is not None:
+            raise self.error
+        return f"answer from {self.name}"
+
+
+async def call(backend: FakeBackend) -> str:
+    return await backend.search()
+
+
+@pytest.fixture
+def backends(clock) -> list[FakeBackend]:
+    return [
+        FakeBackend("o3", clock, cost=1, latency=20),
+        FakeBackend("o4-mini", clock, cost=0.2, latency=5),
+        FakeBackend("nova", clock, cost=0.1, latency=2),
+    ]
+
+
+@pytest.fixture
+def router(backends, clock) -> BackendRouter:
+    return BackendRouter(
+        backends, min_samples=3, max_age=600, probe_interval=30, clock=clock
+    )
+
+
+def names(plan) -> list[str]:
+    return [backend.name for backend in plan]
+
+
+async def warm_up(router: BackendRouter, backends: list[FakeBackend]) -> None:
+    for backend in backends:
+        for _ in range(router.min_samples):
+            await router.call([backend], call)
+
+
+def test_requires_a_backend():
+    with pytest.raises(ValueError):
+        BackendRouter([])
+
+
+async def test_order_of_preference_without_statistics(router):
+    assert names(router.plan(max_latency=1)) == ["o3", "o4-mini", "nova"]
+
+
+async def test_slow_backends_follow_those_within_latency_budget(router, backends):
+    await warm_up(router, backends)
+
+    assert names(router.plan()) == ["o3", "o4-mini", "nova"]
+    assert names(router.plan(max_latency=10)) == ["o4-mini", "nova", "o3"]
+    # Backends over budget are tried fastest first.
+    assert names(router.plan(max_latency=1)) == ["nova", "o4-mini", "o3"]
+    assert router.snapshot()["o3"]["p95"] == 20
+
+
+async def test_cost_budget_skips_expensive_backends(router):
+    assert names(router.plan(max_cost=0.5)) == ["o4-mini", "nova"]
+    assert names(router.plan(max_cost=0.01)) == ["nova"]
+
+
+async def test_falls_back_until_a_backend_answers(router, backends):
+    backends[0].error = RuntimeError("upstream failed")
+    fallbacks = []
+
+    async def on_fallback(backend):
+        fallbacks.append(backend.name)
+
+    backend, result = await router.call(router.plan(), call, on_fallback)
+
+    assert (backend.name, result) == ("o4-mini", "answer from o4-mini")
+    assert fallbacks == ["o4-mini"]
+    assert router.snapshot()["o3"]["error_rate"] == 1
+
+
+async def test_raises_last_error_when_every_backend_fails(router, backends):
+    for number, backend in enumerate(backends):
+        backend.error = RuntimeError(f"failure {number}")
+
+    with pytest.raises(RuntimeError, match="failure 2"):
+        await router.call(router.plan(), call)
+
+
+async def test_erroring_backend_is_demoted(router, backends):
+    backends[0].error = RuntimeError("upstream failed")
+    for _ in range(3):
+        await router.call(router.plan(), call)
+
+    assert names(router.plan()) == ["o4-mini", "nova", "o3"]
+    assert router.snapshot()["o3"]["healthy"] is False
+    # Demoted backends are no longer called first.
+    await router.call(router.plan(), call)
+    assert backends[0].calls == 3
+
+
+async def test_demoted_backend_is_probed_and_recovers(router, backends, clock):
+    backends[0].error = RuntimeError("upstream failed")
+    for _ in range(3):
+        await router.call(router.plan(), call)
+    assert names(router.plan()) == ["o4-mini", "nova", "o3"]
+
+    clock.advance(29)
+    assert names(router.plan())[0] == "o4-mini"
+    clock.advance(1)
+    # A failed probe falls back, and the next probe is one interval later.
+    assert names(router.plan()) == ["o3", "o4-mini", "nova"]
+    assert names(router.plan())[0] == "o4-mini"
+
+    clock.advance(30)
+    backends[0].error = None
+    backend, _ = await router.call(router.plan(), call)
+
+    assert backend.name == "o3"
+    assert router.snapshot()["o3"]["healthy"] is True
+    assert names(router.plan()) == ["o3", "o4-mini", "nova"]
+
+
+async def test_old_errors_are_forgotten(router, backends, clock):
+    backends[0].error = RuntimeError("upstream failed")
+    for _ in range(3):
+        await router.call([backends[0], backends[1]], call)
+    clock.advance(600)
+
+    assert router.snapshot()["o3"]["samples"] == 0
+    assert names(router.plan())[0] == "o3"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ToolError("rejected"),
+        QuotaExceededError("agent-a", "rate", 10),
+        OverloadedError("upstream concurrency limit", 30),
+    ],
+)
+async def test_local_rejections_pass_through_without_demoting(router, backends, error):
+    backends[0].error = error
+
+    with pytest.raises(type(error)) as raised:
+        await router.call(router.plan(), call)
+
+    assert raised.value is error
+    assert backends[1].calls == 0
+    assert router.snapshot()["o3"]["samples"] == 0
+    if isinstance(error, QuotaExceededError):
+        assert json.loads(str(error))["error"] == "quota_exceeded"
@@ -0,0 +1,151 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+from src.backends import BackendAnswer, Citation
+from src.shaping import (
+    estimate_confidence,
+    estimate_tokens,
+    gzip_payload,
+    number_citations,
+    shape_answer,
+    truncate,
+)
+
+MCP_URL = "https://modelcontextprotocol.io/?utm_source=openai"
+DOCS_URL = "https://docs.example.com/mcp"
+ANSWER = BackendAnswer(
+    text=(
+        f"MCP is a protocol ([modelcontextprotocol.io]({MCP_URL})). "
+        f"It connects tools to models ([docs.example.com]({DOCS_URL}))."
+    ),
+    citations=[Citation(MCP_URL, "MCP"), Citation(DOCS_URL)],
+)
+CITATIONS = [{"url": MCP_URL, "title": "MCP"}, {"url": DOCS_URL}]
+
+
+@pytest.mark.parametrize(
+    ("text", "tokens"),
+    [("", 0), ("abcd", 1), ("abcde", 2), ("日本語", 3), ("MCPは", 2)],
+)
+def test_estimate_tokens(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+@pytest.mark.parametrize(
+    ("text", "max_chars", "max_tokens", "expected"),
+    [
+        ("short", None, None, ("short", False)),
+        ("exactly 10", 10, None, ("exactly 10", False)),
+        ("exactly 10", None, 3, ("exactly 10", False)),
+        # Cut at the last sentence end within the budget, leaving room for the mark.
+        ("First sentence. Second sentence.", 20, None, ("First sentence.…", True)),
+        ("abcdefghij", 5, None, ("abcd…", True)),
+        # A sentence end in the first half of the budget is not worth the loss.
+        ("Hi. " + "x" * 30, 20, None, ("Hi. " + "x" * 15 + "…", True)),
+        ("a" * 40, None, 5, ("a" * 16 + "…", True)),
+        ("日本語の文です。次の文です。", None, 10, ("日本語の文です。…", True)),
+        # The smaller of the two budgets applies.
+        ("a" * 40, 8, 5, ("a" * 7 + "…", True)),
+        ("a" * 40, 30, 2, ("a" * 4 + "…", True)),
+    ],
+)
+def test_truncate(text, max_chars, max_tokens, expected):
+    shaped = truncate(text, max_chars, max_tokens)
+
+    assert shaped == expected
+    if max_chars is not None:
+        assert len(shaped[0]) <= max_chars
+    if max_tokens is not None:
+        assert estimate_tokens(shaped[0]) <= max_tokens
+
+
+def test_number_citations_replaces_known_links():
+    text = f"{ANSWER.text} Other ([other.example.com](https://other.example.com))."
+
+    assert number_citations(text, ANSWER.citations) == (
+        "MCP is a protocol [1]. It connects tools to models [2]. "
+        "Other ([other.example.com](https://other.example.com))."
+    )
+
+
+@pytest.mark.parametrize(
+    ("urls", "confidence"),
+    [
+        ([], 0.3),
+        (["https://a.example.com/1"], 0.65),
+        (["https://a.example.com/1", "https://a.example.com/2"], 0.65),
+        (["https://a.example.com", "https://b.example.com"], 0.8),
+        ([f"https://{name}.example.com" for name in "abcd"], 0.95),
+    ],
+)
+def test_estimate_confidence(urls, confidence):
+    citations = [Citation(url) for url in urls]
+
+    assert estimate_confidence(citations) == pytest.approx(confidence)
+
+
+@pytest.mark.parametrize(
+    ("response_format", "max_chars", "expected"),
+    [
+        ("text", None, ANSWER.text),
+        ("text", 10, "MCP is a…"),
+        (
+            "structured",
+            None,
+            {
+                "answer": "MCP is a protocol [1]. It connects tools to models [2].",
+                "citations": CITATIONS,
+                "confidence": 0.8,
+                "truncated": False,
+            },
+        ),
+        (
+            "structured",
+            30,
+            {
+                "answer": "MCP is a protocol [1].…",
+                "citations": CITATIONS,
+                "confidence": 0.8,
+                "truncated": True,
+            },
+        ),
+        # Only the sources, which the budget does not apply to.
+        ("citations", 10, {"citations": CITATIONS, "confidence": 0.8}),
+    ],
+)
+def test_shape_answer(response_format, max_chars, expected):
+    shaped = shape_answer(ANSWER, response_format, max_chars=max_chars)
+
+    assert (shaped if response_format == "text" else json.loads(shaped)) == expected
+
+
+def test_shape_answer_token_budget():
+    shaped = json.loads(shape_answer(ANSWER, "structured", max_tokens=8))
+
+    assert shaped["answer"] == "MCP is a protocol [1].…"
+    assert shaped["truncated"] is True
+
+
+@pytest.mark.parametrize(
+    ("payload", "response_format", "min_bytes", "uri"),
+    [
+        ("x" * 99, "text", 100, None),
+        ("x" * 100, "text", 100, "search://answer.txt.gz"),
+        ('{"answer": "x"}', "structured", 15, "search://answer.json.gz"),
+        ('{"answer": "x"}', "citations", 16, None),
+        # The threshold counts UTF-8 bytes, not characters.
+        ("日本語", "text", 9, "search://answer.txt.gz"),
+    ],
+)
+def test_gzip_payload_threshold(payload, response_format, min_bytes, uri):
+    shaped = gzip_payload(payload, response_format, min_bytes)
+
+    if uri is None:
+        assert shaped == payload
+        return
+    assert str(shaped.resource.uri) == uri
+    assert shaped.resource.mimeType == "application/gzip"
+    assert gzip.decompress(base64.b64decode(shaped.resource.blob)).decode() == payload
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from src.singleflight import SingleFlight, TooManyWaitersError
+
+
+async def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "answer"
+
+    waiters = [asyncio.create_task(flight.do("q", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert flight.in_flight() == 1
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["answer"] * 3
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+
+async def test_different_keys_do_not_share():
+    flight = SingleFlight()
+
+    async def fetch(value):
+        return value
+
+    assert await asyncio.gather(
+        flight.do("a", lambda: fetch(1)), flight.do("b", lambda: fetch(2))
+    ) == [1, 2]
+
+
+async def test_exception_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise RuntimeError("upstream failed")
+
+    waiters = [asyncio.create_task(flight.do("q", fail)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert [str(result) for result in results] == ["upstream failed"] * 2
+
+    async def succeed():
+        return "answer"
+
+    assert await flight.do("q", succeed) == "answer"
+
+
+async def test_cancelled_waiter_leaves_call_running_for_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "answer"
+
+    first = asyncio.create_task(flight.do("q", fetch))
+    second = asyncio.create_task(flight.do("q", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "answer"
+    assert first.cancelled()
+
+
+async def test_call_is_cancelled_when_last_waiter_leaves():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("q", fetch))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.in_flight() == 0
+
+
+async def test_rejects_callers_over_max_waiters():
+    flight = SingleFlight(max_waiters=1)
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "answer"
+
+    first = asyncio.create_task(flight.do("q", fetch))
+    await asyncio.sleep(0)
+
+    with pytest.raises(TooManyWaitersError):
+        await flight.do("q", fetch)
+    release.set()
+    assert await first == "answer"
@@ -0,0 +1,159 @@
+import json
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import src.mcp_server as server
+from src.threads import (
+    InMemoryThreadStore,
+    SQLiteThreadStore,
+    ThreadTable,
+    create_thread_table,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def table(request, tmp_path, clock):
+    if request.param == "memory":
+        store = InMemoryThreadStore(max_threads=2)
+    else:
+        store = SQLiteThreadStore(str(tmp_path / "threads.db"), max_threads=2)
+    table = ThreadTable(store, ttl=60, clock=clock)
+    yield table
+    await table.close()
+
+
+async def test_advance_moves_thread_to_newest_answer(table, clock):
+    thread_id = await table.start("resp_0")
+    clock.advance(30)
+    await table.advance(thread_id, await table.get(thread_id), "resp_1")
+
+    thread = await table.get(thread_id)
+    assert (thread.response_id, thread.turns) == ("resp_1", 2)
+    assert thread.expires_at == clock() + 60
+
+
+async def test_thread_expires_after_ttl_since_last_use(table, clock):
+    thread_id = await table.start("resp_0")
+    clock.advance(59)
+    assert await table.get(thread_id) is not None
+
+    clock.advance(1)
+    assert await table.get(thread_id) is None
+    assert await table.get("unknown") is None
+
+
+async def test_least_recently_used_thread_is_evicted(table, clock):
+    first = await table.start("resp_0")
+    clock.advance(1)
+    second = await table.start("resp_1")
+    clock.advance(1)
+    await table.advance(first, await table.get(first), "resp_2")
+    clock.advance(1)
+    third = await table.start("resp_3")
+
+    assert await table.get(second) is None
+    assert await table.get(first) is not None
+    assert await table.get(third) is not None
+    assert await table.stats() == {
+        "threads": 2,
+        "started": 3,
+        "continued": 1,
+        "expired": 0,
+        "evicted": 1,
+    }
+
+
+async def test_sqlite_store_is_shared_between_workers(tmp_path, clock):
+    path = str(tmp_path / "threads.db")
+    worker_a = ThreadTable(SQLiteThreadStore(path), clock=clock)
+    worker_b = ThreadTable(SQLiteThreadStore(path), clock=clock)
+
+    thread_id = await worker_a.start("resp_0")
+    await worker_b.advance(thread_id, await worker_b.get(thread_id), "resp_1")
+
+    assert (await worker_a.get(thread_id)).response_id == "resp_1"
+    await worker_a.close()
+    await worker_b.close()
+
+
+def test_create_thread_table(monkeypatch, tmp_path):
+    monkeypatch.setenv("THREAD_MAX", "0")
+    assert create_thread_table() is None
+
+    monkeypatch.setenv("THREAD_MAX", "100")
+    monkeypatch.setenv("SERVER_WORKERS", "4")
+    monkeypatch.setenv("THREAD_SQLITE_PATH", str(tmp_path / "threads.db"))
+    assert isinstance(create_thread_table().store, SQLiteThreadStore)
+
+    monkeypatch.setenv("THREAD_STORE", "memory")
+    with pytest.raises(ValueError, match="cannot be shared"):
+        create_thread_table()
+
+
+@pytest.fixture
+def threads(fake_openai, monkeypatch, clock) -> ThreadTable:
+    """Keep the server's threads for 60 seconds, in memory."""
+    table = ThreadTable(InMemoryThreadStore(), ttl=60, clock=clock)
+    monkeypatch.setattr(server, "thread_table", table)
+    return table
+
+
+def connect():
+    # Opened inside each test: the session's task group must exit in the same task.
+    return create_connected_server_and_client_session(server.mcp._mcp_server)
+
+
+async def search(client, question: str, thread_id: str | None = None):
+    arguments = {"question": question}
+    if thread_id is not None:
+        arguments["thread_id"] = thread_id
+    return await client.call_tool("openai_o3_web_search", arguments)
+
+
+def returned_thread_id(result) -> str:
+    note = result.content[-1].text
+    assert note.startswith("thread_id: ")
+    return note.removeprefix("thread_id: ")
+
+
+async def test_follow_ups_are_chained_to_the_latest_answer(threads, fake_openai):
+    async with connect() as client:
+        thread_id = returned_thread_id(await search(client, "what is MCP?"))
+        second = await search(client, "who maintains it?", thread_id)
+        third = await search(client, "since when?", thread_id)
+
+    assert returned_thread_id(second) == thread_id
+    assert returned_thread_id(third) == thread_id
+    assert [
+        request.get("previous_response_id") for request in fake_openai.requests
+    ] == [
+        None,
+        "resp_0",
+        "resp_1",
+    ]
+    thread = await threads.get(thread_id)
+    assert (thread.response_id, thread.turns) == ("resp_2", 3)
+
+
+async def test_unknown_thread_is_rejected(threads, fake_openai):
+    async with connect() as client:
+        result = await search(client, "who maintains it?", "no-such-thread")
+
+    assert result.isError
+    assert json.loads(result.content[0].text.partition(": ")[2]) == {
+        "error": "unknown_thread",
+        "thread_id": "no-such-thread",
+    }
+    assert fake_openai.requests == []
+
+
+async def test_expired_thread_is_rejected(threads, fake_openai, clock):
+    async with connect() as client:
+        thread_id = returned_thread_id(await search(client, "what is MCP?"))
+        clock.advance(60)
+        result = await search(client, "who maintains it?", thread_id)
+
+    assert result.isError
+    assert "unknown_thread" in result.content[0].text
+    assert len(fake_openai.requests) == 1
@@ -0,0 +1,40 @@
+import importlib.util
+from pathlib import Path
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import src.mcp_server as server
+
+CLIENT_TOOL_CACHE = Path(__file__).parents[2] / "mcp_client" / "src" / "tool_cache.py"
+
+
+def load_client_tool_cache():
+    spec = importlib.util.spec_from_file_location(
+        "client_tool_cache", CLIENT_TOOL_CACHE
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def test_client_computes_the_advertised_version(monkeypatch):
+    """The client skips `tools/list` only if it hashes the tools like the server."""
+    version = await server.tool_set_version()
+    monkeypatch.setattr(server.mcp._mcp_server, "version", version)
+
+    async with create_connected_server_and_client_session(
+        server.mcp._mcp_server
+    ) as client:
+        initialized = await client.initialize()
+        tools = (await client.list_tools()).tools
+
+    assert initialized.serverInfo.version == version
+    assert load_client_tool_cache().tools_version(tools) == version
+
+
+async def test_version_changes_with_tool_definitions(monkeypatch):
+    version = await server.tool_set_version()
+    tool = server.mcp._tool_manager.list_tools()[0]
+    monkeypatch.setattr(tool, "description", f"{tool.description} Changed.")
+
+    assert await server.tool_set_version() != version
@@ -1,27 +1,29 @@
 import json
 import os
-import time
+import sys
 
-import boto3
 from boto3.session import Session
 from dotenv import load_dotenv
 
+from waiters import wait_until
 
-def create_agentcore_role(agent_name: str) -> dict:
-    """Create an IAM role for the agent core.
+POLICY_NAME = "AgentCorePolicy"
+
+
+def agentcore_role_policies(
+    agent_name: str, region: str, account_id: str
+) -> tuple[dict, dict]:
+    """Build the trust policy and the permissions policy of the AgentCore role.
 
     Args:
         agent_name (str): The name of the agent.
+        region (str): AWS region of the runtime.
+        account_id (str): AWS account ID.
 
     Returns:
-        dict: The response from the IAM create_role API call.
+        tuple[dict, dict]: The assume role policy document and the inline policy
+            document.
     """
-    client = boto3.client("iam")
-    agentcore_role_name = f"agentcore-{agent_name}-role"
-    boto_session = Session()
-    region = boto_session.region_name
-    account_id = boto3.client("sts").get_caller_identity()["Account"]
-
     role_policy = {
         "Version": "2012-10-17",
         "Statement": [
@@ -119,68 +121,97 @@ def create_agentcore_role(agent_name: str) -> dict:
         ],
     }
 
-    assume_role_policy_document_json = json.dumps(assume_role_policy_document)
-    role_policy_document = json.dumps(role_policy)
-    # Create IAM Role for the AgentCore
-    try:
-        agentcore_iam_role = client.create_role(
-            RoleName=agentcore_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json,
-        )
+    return assume_role_policy_document, role_policy
+
+
+def ensure_agentcore_role(
+    agent_name: str, session: Session | None = None, dry_run: bool = False
+) -> dict:
+    """Create or update the IAM role for the agent core so it matches the policies.
+
+    Only what differs from the desired state is changed: a missing role is created, and
+    the trust policy and the inline policy are replaced only when they differ. Running
+    it again against an up-to-date role makes no API calls that modify anything.
+
+    Args:
+        agent_name (str): The name of the agent.
+        session (Session | None): boto3 session to use; a new one by default.
+        dry_run (bool): Only report the changes that would be made.
 
-        # Pause to make sure role is created
-        time.sleep(10)
-    except client.exceptions.EntityAlreadyExistsException:
-        print("Role already exists -- deleting and creating it again")
+    Returns:
+        dict: A dictionary containing:
+            - role_arn: The ARN of the role
+            - changes: Descriptions of the changes made (or planned, if dry_run)
+    """
+    session = session or Session()
+    client = session.client("iam")
+    role_name = f"agentcore-{agent_name}-role"
+    account_id = session.client("sts").get_caller_identity()["Account"]
+    assume_role_policy, role_policy = agentcore_role_policies(
+        agent_name, session.region_name, account_id
+    )
+    changes = []
 
-        # Check and detach inline policies
-        inline_policies = client.list_role_policies(
-            RoleName=agentcore_role_name, MaxItems=100
+    try:
+        role = client.get_role(RoleName=role_name)["Role"]
+    except client.exceptions.NoSuchEntityException:
+        role = None
+
+    if role is None:
+        changes.append(f"create role {role_name}")
+        if dry_run:
+            return {
+                "role_arn": f"arn:aws:iam::{account_id}:role/{role_name}",
+                "changes": changes + [f"put role policy {POLICY_NAME}"],
+            }
+        client.create_role(
+            RoleName=role_name,
+            AssumeRolePolicyDocument=json.dumps(assume_role_policy),
+        )
+        # IAM is eventually consistent; wait until the new role is visible.
+        role = wait_until(
+            lambda: _get_role(client, role_name), f"role {role_name} to exist"
         )
-        print("inline policies:", inline_policies)
-        for policy_name in inline_policies["PolicyNames"]:
-            client.delete_role_policy(
-                RoleName=agentcore_role_name, PolicyName=policy_name
+    elif role["AssumeRolePolicyDocument"] != assume_role_policy:
+        changes.append(f"update trust policy of {role_name}")
+        if not dry_run:
+            client.update_assume_role_policy(
+                RoleName=role_name, PolicyDocument=json.dumps(assume_role_policy)
             )
 
-        # Check and detach managed policies
-        managed_policies = client.list_attached_role_policies(
-            RoleName=agentcore_role_name, MaxItems=100
-        )
-        print("managed policies:", managed_policies)
-        for policy in managed_policies["AttachedPolicies"]:
-            client.detach_role_policy(
-                RoleName=agentcore_role_name, PolicyArn=policy["PolicyArn"]
+    try:
+        current_policy = client.get_role_policy(
+            RoleName=role_name, PolicyName=POLICY_NAME
+        )["PolicyDocument"]
+    except client.exceptions.NoSuchEntityException:
+        current_policy = None
+    if current_policy != role_policy:
+        changes.append(f"put role policy {POLICY_NAME}")
+        if not dry_run:
+            client.put_role_policy(
+                RoleName=role_name,
+                PolicyName=POLICY_NAME,
+                PolicyDocument=json.dumps(role_policy),
             )
 
-        print(f"deleting {agentcore_role_name}")
-        client.delete_role(RoleName=agentcore_role_name)
-        print(f"recreating {agentcore_role_name}")
-        agentcore_iam_role = client.create_role(
-            RoleName=agentcore_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json,
-        )
+    return {"role_arn": role["Arn"], "changes": changes}
 
-    # Attach the AgentCore policy
-    print(f"attaching role policy {agentcore_role_name}")
-    try:
-        client.put_role_policy(
-            PolicyDocument=role_policy_document,
-            PolicyName="AgentCorePolicy",
-            RoleName=agentcore_role_name,
-        )
-    except Exception as e:
-        print(e)
 
-    return agentcore_iam_role
+def _get_role(client, role_name: str) -> dict | None:
+    try:
+        return client.get_role(RoleName=role_name)["Role"]
+    except client.exceptions.NoSuchEntityException:
+        return None
 
 
 def main() -> None:
     load_dotenv()
     agent_name = os.getenv("AGENT_NAME", "default-agent")
 
-    role = create_agentcore_role(agent_name)
-    print(f"Created role: {role['Role']['Arn']}")
+    result = ensure_agentcore_role(agent_name, dry_run="--dry-run" in sys.argv[1:])
+    for change in result["changes"] or ["no changes"]:
+        print(f"- {change}")
+    print(f"Role ARN: {result['role_arn']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+"""Bring up every AWS resource the MCP server needs, creating only what is missing.
+
+    uv run src/setup_all.py --dry-run      # show what would change
+    uv run src/setup_all.py --env-file ../.env
+
+The IAM role, the Cognito User Pool, app client and user, and the ECR repository
+do not depend on each other, so they are checked and created concurrently. Each
+step compares the existing resources with the desired state, so running it again
+against an up-to-date account changes nothing.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.session import Session
+from dotenv import load_dotenv, set_key
+
+from create_role import ensure_agentcore_role
+from setup_cognito import setup_cognito_user_pool
+
+
+def ecr_repository_name(agent_name: str) -> str:
+    """Name of the repository the starter toolkit would create for the agent."""
+    return f"bedrock-agentcore-{agent_name}".lower()
+
+
+def ensure_ecr_repository(
+    agent_name: str, session: Session | None = None, dry_run: bool = False
+) -> dict:
+    """Create the ECR repository of the agent's container image if it is missing.
+
+    Args:
+        agent_name (str): The name of the agent.
+        session (Session | None): boto3 session to use; a new one by default.
+        dry_run (bool): Only report the changes that would be made.
+
+    Returns:
+        dict: A dictionary containing:
+            - repository_uri: The URI of the repository (None if it would be created)
+            - changes: Descriptions of the changes made (or planned, if dry_run)
+    """
+    session = session or Session()
+    client = session.client("ecr")
+    name = ecr_repository_name(agent_name)
+    try:
+        repository = client.describe_repositories(repositoryNames=[name])[
+            "repositories"
+        ][0]
+        return {"repository_uri": repository["repositoryUri"], "changes": []}
+    except client.exceptions.RepositoryNotFoundException:
+        pass
+    changes = [f"create ECR repository {name}"]
+    if dry_run:
+        return {"repository_uri": None, "changes": changes}
+    repository = client.create_repository(repositoryName=name)["repository"]
+    return {"repository_uri": repository["repositoryUri"], "changes": changes}
+
+
+def run_setup(
+    agent_name: str,
+    username: str,
+    temp_password: str,
+    password: str,
+    region: str,
+    dry_run: bool = False,
+) -> dict[str, dict]:
+    """Run the setup steps concurrently and collect their results.
+
+    Each step gets its own boto3 session, since sessions are not thread-safe. All
+    steps run to completion even if one fails, so a rerun only has the failed steps
+    left to do.
+
+    Returns:
+        dict[str, dict]: Result of each step by name, with its duration in seconds
+            under "seconds".
+
+    Raises:
+        RuntimeError: If any step failed, after all steps finished.
+    """
+
+    def timed(step, *args, **kwargs) -> dict:
+        start = time.perf_counter()
+        result = step(
+            *args, session=Session(region_name=region), dry_run=dry_run, **kwargs
+        )
+        return {**result, "seconds": time.perf_counter() - start}
+
+    steps = {
+        "iam": (ensure_agentcore_role, (agent_name,), {}),
+        "cognito": (
+            setup_cognito_user_pool,
+            (username, temp_password, password),
+            {"region": region},
+        ),
+        "ecr": (ensure_ecr_repository, (agent_name,), {}),
+    }
+    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+        futures = {
+            name: executor.submit(timed, step, *args, **kwargs)
+            for name, (step, args, kwargs) in steps.items()
+        }
+    results, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+    if errors:
+        summary = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        raise RuntimeError(f"Setup failed ({summary})")
+    return results
+
+
+def env_values(results: dict[str, dict]) -> dict[str, str]:
+    """Map the setup results to the environment variables the other scripts read."""
+    values = {
+        "ROLE_ARN": results["iam"]["role_arn"],
+        "COGNITO_CLIENT_ID": results["cognito"]["client_id"],
+        "COGNITO_DISCOVERY_URL": results["cognito"]["discovery_url"],
+        "COGNITO_ACCESS_TOKEN": results["cognito"]["bearer_token"],
+        "ECR_REPOSITORY": results["ecr"]["repository_uri"],
+    }
+    return {key: value for key, value in values.items() if value}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only show what would change"
+    )
+    parser.add_argument(
+        "--env-file", help="Write the resulting values into this .env file"
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    agent_name = os.getenv("AGENT_NAME", "default-agent")
+    username = os.getenv("COGNITO_USERNAME", "testuser")
+    temp_password = os.getenv("COGNITO_TMP_PASSWORD", "Temp123!")
+    password = os.getenv("COGNITO_PASSWORD", "MyPassword123!")
+    region = Session().region_name or "us-west-2"
+
+    start = time.perf_counter()
+    results = run_setup(
+        agent_name, username, temp_password, password, region, args.dry_run
+    )
+    for name, result in results.items():
+        print(f"{name} ({result['seconds']:.1f}s)")
+        for change in result["changes"] or ["no changes"]:
+            print(f"  - {change}")
+    action = "planned" if args.dry_run else "completed"
+    print(f"Setup {action} in {time.perf_counter() - start:.1f}s\n")
+
+    values = env_values(results)
+    for key, value in values.items():
+        print(f"{key}={value}")
+    if args.env_file and not args.dry_run:
+        for key, value in values.items():
+            set_key(args.env_file, key, value, quote_mode="never")
+        print(f"\nWrote {len(values)} values to {args.env_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,75 @@
 import os
+import sys
 
-import boto3
+from boto3.session import Session
 from dotenv import load_dotenv
 
+POOL_NAME = "MCPServerPool"
+CLIENT_NAME = "MCPServerPoolClient"
+AUTH_FLOWS = ["ALLOW_USER_PASSWORD_AUTH", "ALLOW_REFRESH_TOKEN_AUTH"]
+
+
+def find_user_pool(cognito_client, pool_name: str) -> str | None:
+    """Return the ID of the first User Pool named `pool_name`, or None."""
+    paginator = cognito_client.get_paginator("list_user_pools")
+    for page in paginator.paginate(PaginationConfig={"PageSize": 60}):
+        for pool in page["UserPools"]:
+            if pool["Name"] == pool_name:
+                return pool["Id"]
+    return None
+
+
+def find_user_pool_client(
+    cognito_client, pool_id: str, client_name: str
+) -> dict | None:
+    """Return the description of the app client named `client_name`, or None."""
+    paginator = cognito_client.get_paginator("list_user_pool_clients")
+    for page in paginator.paginate(
+        UserPoolId=pool_id, PaginationConfig={"PageSize": 60}
+    ):
+        for client in page["UserPoolClients"]:
+            if client["ClientName"] == client_name:
+                return cognito_client.describe_user_pool_client(
+                    UserPoolId=pool_id, ClientId=client["ClientId"]
+                )["UserPoolClient"]
+    return None
+
+
+def client_update(cognito_client, app_client: dict, auth_flows: list[str]) -> dict:
+    """Arguments of update_user_pool_client that add `auth_flows` to an app client.
+
+    UpdateUserPoolClient resets every setting it is not given to its default, so all
+    updatable settings of the described client are passed back unchanged.
+    """
+    operation = cognito_client.meta.service_model.operation_model(
+        "UpdateUserPoolClient"
+    )
+    update = {
+        key: value
+        for key, value in app_client.items()
+        if key in operation.input_shape.members
+    }
+    flows = app_client.get("ExplicitAuthFlows", [])
+    update["ExplicitAuthFlows"] = flows + [
+        flow for flow in auth_flows if flow not in flows
+    ]
+    return update
+
 
 def setup_cognito_user_pool(
-    username: str, temp_password: str, password: str, region: str = "us-west-2"
+    username: str,
+    temp_password: str,
+    password: str,
+    region: str = "us-west-2",
+    session: Session | None = None,
+    dry_run: bool = False,
 ) -> dict:
     """
-    Set up a new AWS Cognito User Pool with a test user and app client.
+    Set up an AWS Cognito User Pool with a test user and app client.
 
-    This function creates a complete Cognito setup including:
-    - A new User Pool with password policy
+    Existing resources are reused, so running it again returns the same pool and client
+    instead of creating new ones. It makes sure of:
+    - A User Pool named MCPServerPool with password policy
     - An app client configured for user/password authentication
     - A test user with permanent password
     - Initial authentication to obtain an access token
@@ -21,72 +79,123 @@ def setup_cognito_user_pool(
         temp_password: The temporary password for initial user creation
         password: The permanent password to set for the user
         region: AWS region where the User Pool will be created (default: us-west-2)
+        session: boto3 session to use (default: a new session)
+        dry_run: Only report the changes that would be made
 
     Returns:
         dict: A dictionary containing:
-            - pool_id: The ID of the created User Pool
-            - client_id: The ID of the created app client
+            - pool_id: The ID of the User Pool (None if it would be created)
+            - client_id: The ID of the app client (None if it would be created)
             - bearer_token: The access token from initial authentication
+              (None if dry_run)
             - discovery_url: The OpenID Connect discovery URL for the User Pool
+            - changes: Descriptions of the changes made (or planned, if dry_run)
     """
-    # Initialize Cognito client
-    cognito_client = boto3.client("cognito-idp", region_name=region)
+    session = session or Session()
+    cognito_client = session.client("cognito-idp", region_name=region)
+    changes = []
 
     try:
-        # Create User Pool
-        user_pool_response = cognito_client.create_user_pool(
-            PoolName="MCPServerPool", Policies={"PasswordPolicy": {"MinimumLength": 8}}
-        )
-        pool_id = user_pool_response["UserPool"]["Id"]
-
-        # Create App Client
-        app_client_response = cognito_client.create_user_pool_client(
-            UserPoolId=pool_id,
-            ClientName="MCPServerPoolClient",
-            GenerateSecret=False,
-            ExplicitAuthFlows=["ALLOW_USER_PASSWORD_AUTH", "ALLOW_REFRESH_TOKEN_AUTH"],
-        )
-        client_id = app_client_response["UserPoolClient"]["ClientId"]
-
-        # Create User
-        cognito_client.admin_create_user(
-            UserPoolId=pool_id,
-            Username=username,
-            TemporaryPassword=temp_password,
-            MessageAction="SUPPRESS",
-        )
-
-        # Set Permanent Password
-        cognito_client.admin_set_user_password(
-            UserPoolId=pool_id,
-            Username=username,
-            Password=password,
-            Permanent=True,
-        )
-
-        # Authenticate User and get Access Token
-        auth_response = cognito_client.initiate_auth(
-            ClientId=client_id,
-            AuthFlow="USER_PASSWORD_AUTH",
-            AuthParameters={
-                "USERNAME": username,
-                "PASSWORD": password,
-            },
-        )
-        bearer_token = auth_response["AuthenticationResult"]["AccessToken"]
-
-        # Return values if needed for further processing
+        pool_id = find_user_pool(cognito_client, POOL_NAME)
+        if pool_id is None:
+            changes.append(f"create user pool {POOL_NAME}")
+            if dry_run:
+                return _planned(
+                    changes + [f"create app client {CLIENT_NAME}"], username
+                )
+            pool_id = cognito_client.create_user_pool(
+                PoolName=POOL_NAME, Policies={"PasswordPolicy": {"MinimumLength": 8}}
+            )["UserPool"]["Id"]
+
+        app_client = find_user_pool_client(cognito_client, pool_id, CLIENT_NAME)
+        if app_client is None:
+            changes.append(f"create app client {CLIENT_NAME}")
+            if dry_run:
+                return _planned(changes, username, pool_id, region)
+            app_client = cognito_client.create_user_pool_client(
+                UserPoolId=pool_id,
+                ClientName=CLIENT_NAME,
+                GenerateSecret=False,
+                ExplicitAuthFlows=AUTH_FLOWS,
+            )["UserPoolClient"]
+        elif not set(AUTH_FLOWS) <= set(app_client.get("ExplicitAuthFlows", [])):
+            changes.append(f"enable {', '.join(AUTH_FLOWS)} on {CLIENT_NAME}")
+            if not dry_run:
+                cognito_client.update_user_pool_client(
+                    **client_update(cognito_client, app_client, AUTH_FLOWS)
+                )
+        client_id = app_client["ClientId"]
+
+        try:
+            user_status = cognito_client.admin_get_user(
+                UserPoolId=pool_id, Username=username
+            )["UserStatus"]
+        except cognito_client.exceptions.UserNotFoundException:
+            user_status = None
+        if user_status is None:
+            changes.append(f"create user {username}")
+            if not dry_run:
+                cognito_client.admin_create_user(
+                    UserPoolId=pool_id,
+                    Username=username,
+                    TemporaryPassword=temp_password,
+                    MessageAction="SUPPRESS",
+                )
+        if user_status != "CONFIRMED":
+            changes.append(f"set permanent password of {username}")
+            if not dry_run:
+                cognito_client.admin_set_user_password(
+                    UserPoolId=pool_id,
+                    Username=username,
+                    Password=password,
+                    Permanent=True,
+                )
+
+        bearer_token = None
+        if not dry_run:
+            # Authenticate User and get Access Token
+            auth_response = cognito_client.initiate_auth(
+                ClientId=client_id,
+                AuthFlow="USER_PASSWORD_AUTH",
+                AuthParameters={
+                    "USERNAME": username,
+                    "PASSWORD": password,
+                },
+            )
+            bearer_token = auth_response["AuthenticationResult"]["AccessToken"]
+
         return {
             "pool_id": pool_id,
             "client_id": client_id,
             "bearer_token": bearer_token,
-            "discovery_url": f"https://cognito-idp.{region}.amazonaws.com/{pool_id}/.well-known/openid-configuration",
+            "discovery_url": discovery_url(pool_id, region),
+            "changes": changes,
         }
 
     except Exception as e:
         raise RuntimeError(f"Failed to set up Cognito User Pool: {e}")
 
 
+def discovery_url(pool_id: str, region: str) -> str:
+    return f"https://cognito-idp.{region}.amazonaws.com/{pool_id}/.well-known/openid-configuration"
+
+
+def _planned(
+    changes: list[str],
+    username: str,
+    pool_id: str | None = None,
+    region: str | None = None,
+) -> dict:
+    return {
+        "pool_id": pool_id,
+        "client_id": None,
+        "bearer_token": None,
+        "discovery_url": discovery_url(pool_id, region) if pool_id else None,
+        "changes": changes
+        + [f"create user {username}", f"set permanent password of {username}"],
+    }
+
+
 def main() -> None:
     load_dotenv()
     username = os.getenv("COGNITO_USERNAME", "testuser")
@@ -95,7 +204,11 @@ def main() -> None:
     if not (username and temp_password and password):
         raise ValueError("Cognito credentials are not set in environment variables.")
 
-    response = setup_cognito_user_pool(username, temp_password, password)
+    response = setup_cognito_user_pool(
+        username, temp_password, password, dry_run="--dry-run" in sys.argv[1:]
+    )
+    for change in response["changes"] or ["no changes"]:
+        print(f"- {change}")
     # Output the required values
     print(f"Pool id: {response.get('pool_id')}")
     print(f"Client ID: {response.get('client_id')}")
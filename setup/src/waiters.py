@@ -0,0 +1,44 @@
+import random
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def wait_until(
+    check: Callable[[], T | None],
+    description: str,
+    timeout: float = 120,
+    base_delay: float = 0.5,
+    max_delay: float = 10,
+) -> T:
+    """Poll `check` with exponential backoff until it returns a truthy value.
+
+    AWS resources are eventually consistent, so a resource that was just created may
+    not be visible yet. Polling returns as soon as it is, instead of sleeping for a
+    fixed time that is either too short or wasted.
+
+    Args:
+        check (Callable[[], T | None]): Returns the value to wait for, or a falsy value
+            while it is not ready.
+        description (str): What is being waited for, used in the timeout error.
+        timeout (float): Seconds to wait before giving up.
+        base_delay (float): Delay before the second check, doubled after every check.
+        max_delay (float): Upper bound of the delay between checks.
+
+    Returns:
+        T: The truthy value returned by `check`.
+    """
+    deadline = time.monotonic() + timeout
+    delay = base_delay
+    while True:
+        value = check()
+        if value:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+        # Full jitter keeps concurrent waiters from polling in lockstep.
+        time.sleep(min(remaining, random.uniform(0, delay)))
+        delay = min(max_delay, delay * 2)
@@ -0,0 +1,19 @@
+import pytest
+from boto3.session import Session
+from moto import mock_aws
+
+REGION = "us-west-2"
+
+
+@pytest.fixture(autouse=True)
+def aws_credentials(monkeypatch):
+    """Keep the tests away from any real account configured on the machine."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+
+
+@pytest.fixture
+def session():
+    with mock_aws():
+        yield Session(region_name=REGION)
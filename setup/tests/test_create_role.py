@@ -0,0 +1,53 @@
+import json
+
+from create_role import POLICY_NAME, ensure_agentcore_role
+
+ROLE_NAME = "agentcore-test-agent-role"
+
+
+def test_first_run_creates_role_and_policy(session):
+    result = ensure_agentcore_role("test-agent", session=session)
+
+    assert result["changes"] == [
+        f"create role {ROLE_NAME}",
+        f"put role policy {POLICY_NAME}",
+    ]
+    iam = session.client("iam")
+    assert iam.get_role(RoleName=ROLE_NAME)["Role"]["Arn"] == result["role_arn"]
+    assert iam.list_role_policies(RoleName=ROLE_NAME)["PolicyNames"] == [POLICY_NAME]
+
+
+def test_second_run_reports_no_changes(session):
+    first = ensure_agentcore_role("test-agent", session=session)
+    second = ensure_agentcore_role("test-agent", session=session)
+
+    assert second == {"role_arn": first["role_arn"], "changes": []}
+
+
+def test_changed_policy_is_put_again(session):
+    ensure_agentcore_role("test-agent", session=session)
+    session.client("iam").put_role_policy(
+        RoleName=ROLE_NAME,
+        PolicyName=POLICY_NAME,
+        PolicyDocument=json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [{"Effect": "Allow", "Action": "s3:*", "Resource": "*"}],
+            }
+        ),
+    )
+
+    result = ensure_agentcore_role("test-agent", session=session)
+
+    assert result["changes"] == [f"put role policy {POLICY_NAME}"]
+
+
+def test_dry_run_creates_nothing(session):
+    result = ensure_agentcore_role("test-agent", session=session, dry_run=True)
+
+    assert result["changes"] == [
+        f"create role {ROLE_NAME}",
+        f"put role policy {POLICY_NAME}",
+    ]
+    assert result["role_arn"].endswith(f":role/{ROLE_NAME}")
+    assert session.client("iam").list_roles()["Roles"] == []
@@ -0,0 +1,30 @@
+from setup_all import ecr_repository_name, ensure_ecr_repository
+
+
+def test_first_run_creates_repository(session):
+    result = ensure_ecr_repository("Test-Agent", session=session)
+
+    name = ecr_repository_name("Test-Agent")
+    assert name == "bedrock-agentcore-test-agent"
+    assert result["changes"] == [f"create ECR repository {name}"]
+    repositories = session.client("ecr").describe_repositories()["repositories"]
+    assert [repository["repositoryUri"] for repository in repositories] == [
+        result["repository_uri"]
+    ]
+
+
+def test_second_run_reports_no_changes(session):
+    first = ensure_ecr_repository("test-agent", session=session)
+    second = ensure_ecr_repository("test-agent", session=session)
+
+    assert second == {"repository_uri": first["repository_uri"], "changes": []}
+
+
+def test_dry_run_creates_nothing(session):
+    result = ensure_ecr_repository("test-agent", session=session, dry_run=True)
+
+    assert result == {
+        "repository_uri": None,
+        "changes": ["create ECR repository bedrock-agentcore-test-agent"],
+    }
+    assert session.client("ecr").describe_repositories()["repositories"] == []
@@ -0,0 +1,97 @@
+from setup_cognito import CLIENT_NAME, POOL_NAME, setup_cognito_user_pool
+
+CREDENTIALS = ("testuser", "Temp123!", "MyPassword123!")
+
+
+def setup(session, dry_run=False):
+    return setup_cognito_user_pool(
+        *CREDENTIALS, region=session.region_name, session=session, dry_run=dry_run
+    )
+
+
+def test_first_run_creates_pool_client_and_user(session):
+    result = setup(session)
+
+    assert result["changes"] == [
+        f"create user pool {POOL_NAME}",
+        f"create app client {CLIENT_NAME}",
+        "create user testuser",
+        "set permanent password of testuser",
+    ]
+    assert result["bearer_token"]
+    assert result["discovery_url"].endswith(
+        f"/{result['pool_id']}/.well-known/openid-configuration"
+    )
+    cognito = session.client("cognito-idp", region_name=session.region_name)
+    user = cognito.admin_get_user(UserPoolId=result["pool_id"], Username="testuser")
+    assert user["UserStatus"] == "CONFIRMED"
+
+
+def test_second_run_reuses_resources(session):
+    first = setup(session)
+    second = setup(session)
+
+    assert second["changes"] == []
+    assert second["pool_id"] == first["pool_id"]
+    assert second["client_id"] == first["client_id"]
+    assert second["bearer_token"]
+    cognito = session.client("cognito-idp", region_name=session.region_name)
+    assert len(cognito.list_user_pools(MaxResults=60)["UserPools"]) == 1
+
+
+def test_dry_run_creates_nothing(session):
+    result = setup(session, dry_run=True)
+
+    assert result["changes"] == [
+        f"create user pool {POOL_NAME}",
+        f"create app client {CLIENT_NAME}",
+        "create user testuser",
+        "set permanent password of testuser",
+    ]
+    assert result["pool_id"] is None
+    assert result["bearer_token"] is None
+    cognito = session.client("cognito-idp", region_name=session.region_name)
+    assert cognito.list_user_pools(MaxResults=60)["UserPools"] == []
+
+
+def test_enabling_auth_flows_keeps_other_client_settings(session):
+    cognito = session.client("cognito-idp", region_name=session.region_name)
+    pool_id = cognito.create_user_pool(PoolName=POOL_NAME)["UserPool"]["Id"]
+    client_id = cognito.create_user_pool_client(
+        UserPoolId=pool_id,
+        ClientName=CLIENT_NAME,
+        ExplicitAuthFlows=["ALLOW_USER_SRP_AUTH"],
+        RefreshTokenValidity=7,
+        AccessTokenValidity=2,
+        TokenValidityUnits={"AccessToken": "hours", "RefreshToken": "days"},
+        CallbackURLs=["https://app.example.com/callback"],
+        AllowedOAuthFlows=["code"],
+        AllowedOAuthScopes=["openid"],
+        AllowedOAuthFlowsUserPoolClient=True,
+        SupportedIdentityProviders=["COGNITO"],
+    )["UserPoolClient"]["ClientId"]
+
+    result = setup(session)
+
+    assert result["changes"][0] == (
+        f"enable ALLOW_USER_PASSWORD_AUTH, ALLOW_REFRESH_TOKEN_AUTH on {CLIENT_NAME}"
+    )
+    assert result["client_id"] == client_id
+    client = cognito.describe_user_pool_client(UserPoolId=pool_id, ClientId=client_id)[
+        "UserPoolClient"
+    ]
+    assert client["ExplicitAuthFlows"] == [
+        "ALLOW_USER_SRP_AUTH",
+        "ALLOW_USER_PASSWORD_AUTH",
+        "ALLOW_REFRESH_TOKEN_AUTH",
+    ]
+    assert client["RefreshTokenValidity"] == 7
+    assert client["AccessTokenValidity"] == 2
+    assert client["TokenValidityUnits"] == {
+        "AccessToken": "hours",
+        "RefreshToken": "days",
+    }
+    assert client["CallbackURLs"] == ["https://app.example.com/callback"]
+    assert client["AllowedOAuthFlows"] == ["code"]
+    assert client["AllowedOAuthScopes"] == ["openid"]
+    assert client["SupportedIdentityProviders"] == ["COGNITO"]
@@ -0,0 +1,57 @@
+import pytest
+
+import waiters
+from waiters import wait_until
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep; sleeping advances the clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(waiters.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(waiters.time, "sleep", clock.sleep)
+    # Take the upper bound of the jitter so that the delays are predictable.
+    monkeypatch.setattr(waiters.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def test_returns_first_truthy_value(clock):
+    values = iter([None, "", "ready"])
+
+    assert wait_until(lambda: next(values), "value") == "ready"
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_does_not_sleep_when_ready(clock):
+    assert wait_until(lambda: 1, "value") == 1
+    assert clock.sleeps == []
+
+
+def test_backoff_doubles_up_to_max_delay(clock):
+    values = iter([None] * 6 + [True])
+
+    wait_until(lambda: next(values), "value", base_delay=1, max_delay=5)
+
+    assert clock.sleeps == [1, 2, 4, 5, 5, 5]
+
+
+def test_times_out_without_sleeping_past_deadline(clock):
+    with pytest.raises(TimeoutError, match="waiting for role to exist"):
+        wait_until(lambda: None, "role to exist", timeout=10, base_delay=1)
+
+    assert clock.sleeps == [1, 2, 4, 3]
+    assert clock.now == 10